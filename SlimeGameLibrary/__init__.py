@@ -1,2 +1,7 @@
-from .nodes import *
 from .customNodes import *
+from .lib import Graph as Graph
+from .lib import LoadData as LoadData
+from .lib import SaveData as SaveData
+from .nodes import *
+from .utils import RandomIds as RandomIds
+from .utils import SeededIds as SeededIds
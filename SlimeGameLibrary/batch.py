@@ -0,0 +1,284 @@
+"""
+Evaluates a bot against many game states at once with NumPy. Every node is
+computed once for all states: floats and bools are arrays of length N,
+Vector3s are N x 3 arrays. Literals stay 0-d (or length 3) arrays and are
+broadcast, so constant parts of the graph cost nothing per state.
+
+The results match `evaluation.evaluateGraph` state by state.
+"""
+
+import numpy as np
+
+from .data import (
+    boolSensors,
+    compareBoolModes,
+    compareFloatModes,
+    floatSensors,
+    operands,
+    operationModes,
+    relativePositionModes,
+    transformSensors,
+    vector3Sensors,
+)
+from .evaluation import (
+    boolModifier,
+    defaultInputs,
+    floatModifier,
+    modeModifier,
+    relativePositions,
+    sensorTransforms,
+)
+from .lib import Graph, Node, nodeTypeNames
+
+
+def component(v, axis: int):
+    return v[..., axis]
+
+
+def dot(a, b):
+    return (
+        component(a, 0) * component(b, 0)
+        + component(a, 1) * component(b, 1)
+        + component(a, 2) * component(b, 2)
+    )
+
+
+def magnitude(v):
+    return np.sqrt(dot(v, v))
+
+
+def normalize(v):
+    length = magnitude(v)[..., None]
+    return np.where(length > 1e-5, v / np.where(length > 1e-5, length, 1.0), 0.0)
+
+
+def vector(x, y, z):
+    return np.stack(np.broadcast_arrays(x, y, z), axis=-1)
+
+
+def scale(v, s):
+    return v * np.asarray(s)[..., None]
+
+
+def conditional(condition, expected: bool, a, b, isVector: bool):
+    select = np.asarray(condition) == expected
+    if isVector:
+        select = select[..., None]
+    return np.where(select, a, b)
+
+
+def clamp(value, low, high):
+    return np.where(value < low, low, np.where(value > high, high, value))
+
+
+operations = {
+    "abs": np.abs,
+    # np.round rounds half to even, like the reference
+    "round": np.round,
+    "floor": np.floor,
+    "ceil": np.ceil,
+    "sin": np.sin,
+    "cos": np.cos,
+    "tan": np.tan,
+    "asin": np.arcsin,
+    "acos": np.arccos,
+    "atan": np.arctan,
+    "sqrt": np.sqrt,
+    "sign": lambda x: np.where(x >= 0, 1.0, -1.0),
+    "ln": np.log,
+    "log10": np.log10,
+    "e^": np.exp,
+    "10^": lambda x: np.power(10.0, x),
+}
+
+compareFloats = {
+    "==": np.equal,
+    "<": np.less,
+    ">": np.greater,
+    "<=": np.less_equal,
+    ">=": np.greater_equal,
+}
+
+compareBools = {
+    "and": np.logical_and,
+    "or": np.logical_or,
+    "equal to": np.equal,
+    "xor": np.not_equal,
+    "nor": lambda a, b: ~np.logical_or(a, b),
+    "nand": lambda a, b: ~np.logical_and(a, b),
+    "xnor": np.equal,
+}
+
+# node name -> function(modifier, *inputs) on arrays, like `pureNodes`
+batchNodes = {
+    "Float": lambda modifier: np.float64(floatModifier(modifier)),
+    "Bool": lambda modifier: np.bool_(boolModifier(modifier)),
+    "AddFloats": lambda modifier, a, b: a + b,
+    "SubtractFloats": lambda modifier, a, b: a - b,
+    "MultiplyFloats": lambda modifier, a, b: a * b,
+    "DivideFloats": lambda modifier, a, b: np.divide(a, b),
+    "Modulo": lambda modifier, a, b: np.fmod(a, b),
+    "Operation": lambda modifier, x: operations[modeModifier(modifier, operationModes)](
+        x
+    ),
+    "ClampFloat": lambda modifier, value, low, high: clamp(value, low, high),
+    "CompareFloats": lambda modifier, a, b: compareFloats[
+        modeModifier(modifier, compareFloatModes)
+    ](a, b),
+    "CompareBool": lambda modifier, a, b: compareBools[
+        modeModifier(modifier, compareBoolModes)
+    ](a, b),
+    "Not": lambda modifier, a: np.logical_not(a),
+    "ConditionalSetFloatV2": lambda modifier, condition, a, b: conditional(
+        condition, boolModifier(modifier), a, b, False
+    ),
+    "ConditionalSetVector3": lambda modifier, condition, a, b: conditional(
+        condition, boolModifier(modifier), a, b, True
+    ),
+    "ConstructVector3": lambda modifier, x, y, z: vector(x, y, z),
+    "Vector3Split": lambda modifier, v: v,
+    "AddVector3": lambda modifier, a, b: a + b,
+    "SubtractVector3": lambda modifier, a, b: a - b,
+    "ScaleVector3": lambda modifier, v, s: scale(v, s),
+    "CrossProduct": lambda modifier, a, b: vector(
+        component(a, 1) * component(b, 2) - component(a, 2) * component(b, 1),
+        component(a, 2) * component(b, 0) - component(a, 0) * component(b, 2),
+        component(a, 0) * component(b, 1) - component(a, 1) * component(b, 0),
+    ),
+    "DotProduct": lambda modifier, a, b: dot(a, b),
+    "Distance": lambda modifier, a, b: magnitude(a - b),
+    "Magnitude": lambda modifier, v: magnitude(v),
+    "Normalize": lambda modifier, v: normalize(v),
+}
+
+
+def batchSize(states: dict) -> int:
+    sizes = set()
+    for value in states.values():
+        arrays = value.values() if isinstance(value, dict) else [value]
+        sizes.update(len(array) for array in arrays)
+    if len(sizes) != 1:
+        raise ValueError(f"states have different lengths: {sorted(sizes)}")
+    return sizes.pop()
+
+
+def sensor(states: dict, name: str, dtype):
+    if name == "Pi" and name not in states:
+        return np.float64(np.pi)
+    if name not in states:
+        raise KeyError(f"game states have no {name!r}")
+    return np.asarray(states[name], dtype=dtype)
+
+
+def transform(states: dict, name: str) -> dict:
+    """A transform sensor as N x 3 arrays, see `evaluation.transform`."""
+    value = states.get(name)
+    if value is None:
+        if name not in sensorTransforms:
+            raise KeyError(f"game states have no {name!r}")
+        value = {"position": states[sensorTransforms[name]]}
+    return {
+        "position": np.zeros(3),
+        "forward": np.array([0.0, 0.0, 1.0]),
+        "right": np.array([1.0, 0.0, 0.0]),
+        "up": np.array([0.0, 1.0, 0.0]),
+        **{axis: np.asarray(array, dtype=np.float64) for axis, array in value.items()},
+    }
+
+
+def relativePosition(value: dict, mode: str):
+    withPosition, axis, sign = relativePositions[mode]
+    result = value["position"] if withPosition else np.zeros(3)
+    if axis is not None:
+        result = result + sign * value[axis]
+    return result
+
+
+def broadcast(node: Node | None, value, size: int):
+    """Expands a literal output to one value per state."""
+    if node is None or isinstance(value, dict):
+        return value
+    if node.type == "Vector3":
+        return np.broadcast_to(value, (size, 3))
+    if node.type in (float, bool):
+        return np.broadcast_to(value, (size,))
+    return value
+
+
+def evaluateBatch(graph: Graph, states: dict, rng=None, parameters=None) -> dict:
+    """
+    `evaluation.evaluateGraph` for N game states at once. `states` maps
+    sensor names to arrays: N x 3 for the Vector3 sensors, N for the float
+    and bool sensors, and dicts of N x 3 arrays for transforms. RandomFloat
+    draws from the NumPy generator `rng`. `parameters` maps the indexes of
+    Float literals to N values used instead of their modifier, so every
+    state can run its own variant of the bot.
+
+    Returns {"target": N x 3 array, "jump": N bool array} from the
+    SlimeController, None without one, and "debug": the arrays of every
+    Debug node in graph order.
+    """
+    size = batchSize(states)
+    rng = np.random.default_rng() if rng is None else rng
+    values = {}
+    result = {"target": None, "jump": None, "debug": []}
+    debugValues = {}
+
+    with np.errstate(all="ignore"):
+        for index in graph.topologicalOrder():
+            name = nodeTypeNames[graph.nodeTypes[index]]
+            modifier = graph.nodeModifiers[index]
+            inputs = []
+            for portId, node in zip(operands[name], graph.inputNodes(index)):
+                if node is not None:
+                    inputs.append(values[node.key])
+                    continue
+                # port ids are the port type followed by one digit
+                default = defaultInputs.get(portId[:-1])
+                inputs.append(None if default is None else np.asarray(default))
+
+            if parameters is not None and index in parameters:
+                value = np.asarray(parameters[index], dtype=np.float64)
+            elif name in batchNodes:
+                value = batchNodes[name](modifier, *inputs)
+            else:
+                match name:
+                    case "VolleyballGetFloat":
+                        mode = modeModifier(modifier, floatSensors)
+                        value = sensor(states, mode, np.float64)
+                    case "VolleyballGetBool":
+                        mode = modeModifier(modifier, boolSensors)
+                        value = sensor(states, mode, np.bool_)
+                    case "SlimeGetVector3":
+                        mode = modeModifier(modifier, vector3Sensors)
+                        value = sensor(states, mode, np.float64)
+                    case "VolleyballGetTransform":
+                        value = transform(
+                            states, modeModifier(modifier, transformSensors)
+                        )
+                    case "RelativePosition":
+                        mode = modeModifier(modifier, relativePositionModes)
+                        value = relativePosition(inputs[0], mode)
+                    case "RandomFloat":
+                        low, high, _ = np.broadcast_arrays(*inputs, np.zeros(size))
+                        value = rng.uniform(low, high)
+                    case "SlimeController":
+                        target, jump = inputs
+                        result["target"] = np.broadcast_to(target, (size, 3))
+                        result["jump"] = np.broadcast_to(jump, (size,))
+                        continue
+                    case "Debug":
+                        (source,) = graph.inputNodes(index)
+                        debugValues[index] = broadcast(source, inputs[0], size)
+                        continue
+                    case _:
+                        value = modifier
+
+            if name == "Vector3Split":
+                for outputIndex in (1, 2, 3):
+                    values[(index, outputIndex)] = component(value, outputIndex - 1)
+            else:
+                values[(index, 1)] = value
+
+    result["debug"] = [debugValues[index] for index in sorted(debugValues)]
+    return result
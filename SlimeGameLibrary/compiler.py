@@ -0,0 +1,245 @@
+"""
+Compiles a bot into one flat Python function for fast single-state
+evaluation. Every node output becomes a local variable, literals are
+inlined and the Vector3 nodes are expanded into tuple expressions. The
+function returns the same dict as `evaluation.evaluateGraph`.
+"""
+
+import hashlib
+import math
+import random
+
+from .data import (
+    boolSensors,
+    compareBoolModes,
+    compareFloatModes,
+    floatSensors,
+    operands,
+    operationModes,
+    relativePositionModes,
+    transformSensors,
+    vector3Sensors,
+)
+from .evaluation import (
+    boolModifier,
+    clamp,
+    defaultInputs,
+    divide,
+    floatModifier,
+    magnitude,
+    modeModifier,
+    modulo,
+    normalize,
+    operations,
+    relativePosition,
+    transform,
+)
+from .lib import Graph, MemoStore, nodeTypeNames
+
+# globals of the generated code, operation modes are operation0, operation1...
+namespace = {
+    "clamp": clamp,
+    "divide": divide,
+    "magnitude": magnitude,
+    "modulo": modulo,
+    "normalize": normalize,
+    "random": random,
+    "relativePosition": relativePosition,
+    "transform": transform,
+    **{
+        f"operation{index}": operations[mode]
+        for index, mode in enumerate(operationModes)
+    },
+}
+
+# hash of the generated source -> code object, for the most recent bots
+compiledCode = MemoStore(maxSize=256)
+
+compareBoolExpressions = {
+    "and": lambda a, b: f"({a} and {b})",
+    "or": lambda a, b: f"({a} or {b})",
+    "equal to": lambda a, b: f"({a} == {b})",
+    "xor": lambda a, b: f"({a} != {b})",
+    "nor": lambda a, b: f"(not ({a} or {b}))",
+    "nand": lambda a, b: f"(not ({a} and {b}))",
+    "xnor": lambda a, b: f"({a} == {b})",
+}
+
+
+def literalSource(value) -> str:
+    if isinstance(value, float) and not math.isfinite(value):
+        return f"float({str(value)!r})"
+    return repr(value)
+
+
+def components(component) -> str:
+    """A tuple of component(i) for the x, y and z components."""
+    return f"({', '.join(component(i) for i in range(3))})"
+
+
+def nodeSource(name: str, modifier, inputs: list) -> str | None:
+    """The expression of a node's value, None for nodes without one."""
+    match name:
+        case "Float":
+            return literalSource(floatModifier(modifier))
+        case "Bool":
+            return repr(boolModifier(modifier))
+        case "AddFloats":
+            a, b = inputs
+            return f"({a} + {b})"
+        case "SubtractFloats":
+            a, b = inputs
+            return f"({a} - {b})"
+        case "MultiplyFloats":
+            a, b = inputs
+            return f"({a} * {b})"
+        case "DivideFloats":
+            a, b = inputs
+            return f"divide({a}, {b})"
+        case "Modulo":
+            a, b = inputs
+            return f"modulo({a}, {b})"
+        case "Operation":
+            return f"operation{int(modifier)}({inputs[0]})"
+        case "ClampFloat":
+            value, low, high = inputs
+            return f"clamp({value}, {low}, {high})"
+        case "CompareFloats":
+            mode = modeModifier(modifier, compareFloatModes)
+            return f"({inputs[0]} {mode} {inputs[1]})"
+        case "CompareBool":
+            mode = modeModifier(modifier, compareBoolModes)
+            return compareBoolExpressions[mode](*inputs)
+        case "Not":
+            return f"(not {inputs[0]})"
+        case "ConditionalSetFloatV2" | "ConditionalSetVector3":
+            condition, node0, node1 = inputs
+            if not boolModifier(modifier):
+                node0, node1 = node1, node0
+            return f"({node0} if {condition} else {node1})"
+        case "ConstructVector3":
+            x, y, z = inputs
+            return f"({x}, {y}, {z})"
+        case "Vector3Split":
+            return inputs[0]
+        case "AddVector3":
+            a, b = inputs
+            return components(lambda i: f"{a}[{i}] + {b}[{i}]")
+        case "SubtractVector3":
+            a, b = inputs
+            return components(lambda i: f"{a}[{i}] - {b}[{i}]")
+        case "ScaleVector3":
+            v, scale = inputs
+            return components(lambda i: f"{v}[{i}] * {scale}")
+        case "CrossProduct":
+            a, b = inputs
+            return (
+                f"({a}[1] * {b}[2] - {a}[2] * {b}[1], "
+                f"{a}[2] * {b}[0] - {a}[0] * {b}[2], "
+                f"{a}[0] * {b}[1] - {a}[1] * {b}[0])"
+            )
+        case "DotProduct":
+            a, b = inputs
+            return f"({a}[0] * {b}[0] + {a}[1] * {b}[1] + {a}[2] * {b}[2])"
+        case "Distance":
+            a, b = inputs
+            return f"magnitude({components(lambda i: f'{a}[{i}] - {b}[{i}]')})"
+        case "Magnitude":
+            return f"magnitude({inputs[0]})"
+        case "Normalize":
+            return f"normalize({inputs[0]})"
+        case "VolleyballGetFloat":
+            sensor = modeModifier(modifier, floatSensors)
+            if sensor == "Pi":
+                return f"float(state.get('Pi', {math.pi!r}))"
+            return f"float(state[{sensor!r}])"
+        case "VolleyballGetBool":
+            return f"bool(state[{modeModifier(modifier, boolSensors)!r}])"
+        case "SlimeGetVector3":
+            return f"tuple(state[{modeModifier(modifier, vector3Sensors)!r}])"
+        case "VolleyballGetTransform":
+            return f"transform(state, {modeModifier(modifier, transformSensors)!r})"
+        case "RelativePosition":
+            mode = modeModifier(modifier, relativePositionModes)
+            return f"relativePosition({inputs[0]}, {mode!r})"
+        case "RandomFloat":
+            low, high = inputs
+            return f"rng.uniform({low}, {high})"
+        case "SlimeController" | "Debug" | "ConstructSlimeProperties":
+            return None
+        case "DebugDrawLine" | "DebugDrawDisc":
+            return None
+    # colors, countries, stats and comments
+    return repr(modifier)
+
+
+def graphSource(graph: Graph) -> str:
+    """
+    The Python source of a bot's function. Locals are named after the
+    position of their node in topological order, so bots with the same
+    structure get the same source whatever their indexes and sIDs. Float
+    and Bool literals are inlined where they are used.
+    """
+    lines = ["def bot(state, rng=random):"]
+    # (index, output index) -> local name
+    names = {}
+    target = jump = "None"
+    debugs = []
+
+    for position, index in enumerate(graph.topologicalOrder()):
+        name = nodeTypeNames[graph.nodeTypes[index]]
+        inputs = [
+            (
+                literalSource(defaultInputs.get(portId[:-1]))
+                if node is None
+                else names[node.key]
+            )
+            for portId, node in zip(operands[name], graph.inputNodes(index))
+        ]
+        if name == "SlimeController":
+            target, jump = inputs
+            continue
+        if name == "Debug":
+            debugs.append((index, inputs[0]))
+            continue
+
+        expression = nodeSource(name, graph.nodeModifiers[index], inputs)
+        if expression is None:
+            continue
+        # literals are inlined as constants into the expressions that use them
+        if name in ("Float", "Bool"):
+            names[(index, 1)] = expression
+            continue
+        local = f"v{position}"
+        if name == "Vector3Split":
+            outputs = [f"{local}_{axis}" for axis in "xyz"]
+            lines.append(f"    {', '.join(outputs)} = {expression}")
+            for outputIndex, output in enumerate(outputs, 1):
+                names[(index, outputIndex)] = output
+            continue
+        lines.append(f"    {local} = {expression}")
+        names[(index, 1)] = local
+
+    debugList = ", ".join(source for _, source in sorted(debugs))
+    lines.append(
+        f'    return {{"target": {target}, "jump": {jump}, "debug": [{debugList}]}}'
+    )
+    return "\n".join(lines) + "\n"
+
+
+def compileGraph(graph: Graph):
+    """
+    The bot as a function(state, rng=random) that returns the same as
+    `evaluation.evaluateGraph(graph, state, rng)`. The code objects of the
+    most recently compiled bots are cached by a hash of the generated
+    source, so compiling the same bot again only walks the graph.
+    """
+    source = graphSource(graph)
+    key = hashlib.sha256(source.encode()).hexdigest()
+    code = compiledCode.get(key)
+    if code is None:
+        code = compile(source, f"<bot {key[:12]}>", "exec")
+        compiledCode.put(key, code)
+    scope = dict(namespace)
+    exec(code, scope)
+    return scope["bot"]
@@ -1,3 +1,4 @@
+from .lib import isNumber, operators
 from .nodes import *
 
 
@@ -16,8 +17,129 @@ def QuadraticFormula(a: Node, b: Node, c: Node):
     return d >= 0, root1, root2
 
 
+def binaryChain(n: int) -> list[int]:
+    """The square-and-multiply chain of n, from its bits after the first."""
+    chain = [1]
+    for bit in bin(n)[3:]:
+        chain.append(chain[-1] * 2)
+        if bit == "1":
+            chain.append(chain[-1] + 1)
+    return chain
+
+
+def additionChain(n: int) -> list[int]:
+    """
+    Shortest list of exponents starting at 1 and ending at n where every
+    entry is the sum of two earlier ones, found by iterative deepening.
+    Beyond `maxChainExponent` the search is too slow and the square-and-
+    multiply chain is used instead.
+    """
+    if n in additionChains:
+        return additionChains[n]
+    if n > maxChainExponent:
+        return binaryChain(n)
+
+    def extend(chain, depth):
+        last = chain[-1]
+        if last == n:
+            return chain
+        if len(chain) > depth or last << (depth + 1 - len(chain)) < n:
+            return None
+        candidates = {a + b for a in chain for b in chain if last < a + b <= n}
+        for candidate in sorted(candidates, reverse=True):
+            found = extend(chain + [candidate], depth)
+            if found:
+                return found
+        return None
+
+    depth = n.bit_length() - 1
+    while not (chain := extend([1], depth)):
+        depth += 1
+    additionChains[n] = chain
+    return chain
+
+
+additionChains = {}
+# largest exponent whose shortest chain is searched for
+maxChainExponent = 64
+# most nodes a constant power may be reduced to; e^(y*ln(x)) takes 3 nodes
+# but is nan for negative x
+maxPowerNodes = 12
+
+
+def chainLength(n: int) -> int:
+    """The number of MultiplyFloats that multiplyChain builds for n."""
+    if n > maxChainExponent:
+        return n.bit_length() + n.bit_count() - 2
+    return len(additionChain(n)) - 1
+
+
+def multiplyChain(node: Node, n: int) -> Node:
+    """node^n for a positive integer n, with as few MultiplyFloats as possible"""
+    chain = additionChain(n)
+    powers = {1: node}
+    for exponent in chain[1:]:
+        half = next(a for a in chain if exponent - a in powers and a in powers)
+        powers[exponent] = MultiplyFloats(powers[half], powers[exponent - half])
+    return powers[n]
+
+
+def constantExponent(node) -> float | None:
+    if isNumber(node) and not isinstance(node, bool):
+        return float(node)
+    # tunable literals keep the general form, their value changes
+    if isinstance(node, Node) and node.nodeName == "Float" and not isTunable(node):
+        try:
+            return float(node.modifier)
+        except ValueError:
+            return None
+    return None
+
+
+def powerNodes(exponent: float) -> int:
+    """The number of nodes Power builds for an integer or half-integer exponent."""
+    whole = int(abs(exponent))
+    half = abs(exponent) != whole
+    nodes = chainLength(whole) if whole else 0
+    # a Sqrt, multiplied with the chain if there is one
+    if half:
+        nodes += 2 if whole else 1
+    return nodes + (exponent < 0)
+
+
+def isReducibleExponent(exponent: float) -> bool:
+    """
+    Whether x^exponent can be built from at most maxPowerNodes MultiplyFloats,
+    a Sqrt and a division.
+    """
+    return (2 * exponent).is_integer() and powerNodes(exponent) <= maxPowerNodes
+
+
 def Power(node0: Node, node1: Node):
     """
-    custom x^y node using x^y = e^(y*ln(x))
+    custom x^y node. Integer and half-integer constant exponents become
+    MultiplyFloats chains (and a Sqrt), negative ones a reciprocal, as long
+    as that takes at most maxPowerNodes nodes. Other exponents use
+    x^y = e^(y*ln(x)), which is nan for negative x
     """
-    return Exp(node1 * Ln(node0))
+    exponent = constantExponent(node1)
+    if exponent is None or not isReducibleExponent(exponent):
+        return Exp(node1 * Ln(node0))
+
+    node0 = parseLiteral(node0)
+    whole = int(abs(exponent))
+    if exponent == 0:
+        return Float(1)
+    if abs(exponent) == whole:
+        result = multiplyChain(node0, whole)
+    elif whole == 0:
+        result = Sqrt(node0)
+    else:
+        result = MultiplyFloats(multiplyChain(node0, whole), Sqrt(node0))
+
+    if exponent < 0:
+        return DivideFloats(1, result)
+    return result
+
+
+operators[("pow", float, float)] = Power
@@ -1,3 +1,4 @@
+import math
 from typing import Literal
 
 from .utils import Color, Position2, Position3
@@ -1199,6 +1200,131 @@ ports = {
     ],
 }
 
+# modifiers of nodes with a mode are indexes into these lists
+compareBoolModes = ["and", "or", "equal to", "xor", "nor", "nand", "xnor"]
+compareFloatModes = ["==", "<", ">", "<=", ">="]
+operationModes = [
+    "abs",
+    "round",
+    "floor",
+    "ceil",
+    "sin",
+    "cos",
+    "tan",
+    "asin",
+    "acos",
+    "atan",
+    "sqrt",
+    "sign",
+    "ln",
+    "log10",
+    "e^",
+    "10^",
+]
+relativePositionModes = [
+    "Self",
+    "Self + Forward",
+    "Self + Backward",
+    "Self + Left",
+    "Self + Right",
+    "Self + Up",
+    "Self + Down",
+    "Forward",
+    "Backward",
+    "Left",
+    "Right",
+    "Up",
+    "Down",
+]
+boolSensors = ["Self Can Jump", "Opponent Can Jump", "Ball Is Self Side"]
+floatSensors = [
+    "Delta time",
+    "Fixed delta time",
+    "Gravity",
+    "Pi",
+    "Simulation duration",
+    "Team score",
+    "Opponent score",
+    "Ball touches remaining",
+]
+# (lowest, highest) value of each float sensor. Touches assume the usual
+# three touches per side, Pi covers both its float and double spellings
+floatSensorRanges = {
+    "Delta time": (0.0, math.inf),
+    "Fixed delta time": (0.0, math.inf),
+    "Gravity": (-math.inf, math.inf),
+    "Pi": (3.1415925, 3.1415930),
+    "Simulation duration": (0.0, math.inf),
+    "Team score": (0.0, math.inf),
+    "Opponent score": (0.0, math.inf),
+    "Ball touches remaining": (0.0, 3.0),
+}
+transformSensors = [
+    "Self",
+    "Opponent",
+    "Ball",
+    "Self Team Spawn",
+    "Opponent Team Spawn",
+]
+vector3Sensors = [
+    "Self Position",
+    "Self Velocity",
+    "Ball Position",
+    "Ball Velocity",
+    "Opponent Position",
+    "Opponent Velocity",
+]
+
+# input port ids of each node type, in the order its constructor takes them
+operands = {
+    "AddVector3": ["Vector31", "Vector32"],
+    "AddFloats": ["Float1", "Float2"],
+    "Bool": [],
+    "ClampFloat": ["Float1", "Float2", "Float3"],
+    "Color": [],
+    "ConstructVector3": ["Float1", "Float2", "Float3"],
+    "CompareBool": ["Bool1", "Bool2"],
+    "CompareFloats": ["Float1", "Float2"],
+    "ConditionalSetFloatV2": ["Bool1", "Float1", "Float2"],
+    "ConditionalSetVector3": ["Bool1", "Vector31", "Vector32"],
+    "ConstructSlimeProperties": [
+        "String1",
+        "Color1",
+        "Country1",
+        "Stat1",
+        "Stat2",
+        "Stat3",
+    ],
+    "SlimeController": ["Vector31", "Bool1"],
+    "Country": [],
+    "CrossProduct": ["Vector31", "Vector32"],
+    "Debug": ["Any1"],
+    "DebugDrawLine": ["Vector31", "Vector32", "Float1", "Color1"],
+    "DebugDrawDisc": ["Vector31", "Float1", "Float2", "Color1"],
+    "Distance": ["Vector31", "Vector32"],
+    "DivideFloats": ["Float1", "Float2"],
+    "DotProduct": ["Vector31", "Vector32"],
+    "Float": [],
+    "VolleyballGetBool": [],
+    "VolleyballGetFloat": [],
+    "VolleyballGetTransform": [],
+    "SlimeGetVector3": [],
+    "Magnitude": ["Vector31"],
+    "Modulo": ["Float1", "Float2"],
+    "MultiplyFloats": ["Float1", "Float2"],
+    "Not": ["Bool1"],
+    "Normalize": ["Vector31"],
+    "Operation": ["Float1"],
+    "RelativePosition": ["Transform1"],
+    "RandomFloat": ["Float1", "Float2"],
+    "ScaleVector3": ["Vector31", "Float1"],
+    "Vector3Split": ["Vector31"],
+    "Stat": [],
+    "String": [],
+    "SubtractFloats": ["Float1", "Float2"],
+    "SubtractVector3": ["Vector31", "Vector32"],
+}
+
 colorNames = Literal[
     "Black",
     "Blue",
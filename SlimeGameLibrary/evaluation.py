@@ -0,0 +1,324 @@
+import math
+import random
+
+from .data import (
+    boolSensors,
+    compareBoolModes,
+    compareFloatModes,
+    floatSensors,
+    operands,
+    operationModes,
+    relativePositionModes,
+    transformSensors,
+    vector3Sensors,
+)
+from .lib import Graph, nodeTypeNames
+
+
+def floatModifier(modifier) -> float:
+    return float(modifier)
+
+
+def isNumberModifier(modifier) -> bool:
+    """Whether a Float modifier is a number, unlike the "True" of Float(True)."""
+    try:
+        float(modifier)
+    except ValueError:
+        return False
+    return True
+
+
+def boolModifier(modifier) -> bool:
+    # Bool and ConditionalSet nodes store True as "0" and False as "1"
+    return str(modifier) == "0"
+
+
+def modeModifier(modifier, modes: list) -> str:
+    return modes[int(modifier)]
+
+
+def divide(a, b):
+    if b == 0:
+        if a == 0 or math.isnan(a):
+            return math.nan
+        return math.copysign(math.inf, a) * math.copysign(1, b)
+    return a / b
+
+
+def modulo(a, b):
+    if b == 0 or math.isinf(a):
+        return math.nan
+    return math.fmod(a, b)
+
+
+def guarded(function):
+    """Maps math domain errors to nan and overflows to inf, like floats do."""
+
+    def wrapper(x):
+        try:
+            return function(x)
+        except ValueError:
+            return math.nan
+        except OverflowError:
+            return math.inf
+
+    return wrapper
+
+
+def logarithm(function):
+    def wrapper(x):
+        if x == 0:
+            return -math.inf
+        return function(x)
+
+    return guarded(wrapper)
+
+
+def rounding(function):
+    """Rounding keeps infinities and nan as they are."""
+
+    def wrapper(x):
+        if math.isinf(x) or math.isnan(x):
+            return x
+        return float(function(x))
+
+    return wrapper
+
+
+roundHalfEven = rounding(round)
+
+
+operations = {
+    "abs": abs,
+    "round": roundHalfEven,
+    "floor": rounding(math.floor),
+    "ceil": rounding(math.ceil),
+    "sin": guarded(math.sin),
+    "cos": guarded(math.cos),
+    "tan": guarded(math.tan),
+    "asin": guarded(math.asin),
+    "acos": guarded(math.acos),
+    "atan": math.atan,
+    "sqrt": guarded(math.sqrt),
+    "sign": lambda x: 1.0 if x >= 0 else -1.0,
+    "ln": logarithm(math.log),
+    "log10": logarithm(math.log10),
+    "e^": guarded(math.exp),
+    "10^": guarded(lambda x: 10.0**x),
+}
+
+compareFloats = {
+    "==": lambda a, b: a == b,
+    "<": lambda a, b: a < b,
+    ">": lambda a, b: a > b,
+    "<=": lambda a, b: a <= b,
+    ">=": lambda a, b: a >= b,
+}
+
+compareBools = {
+    "and": lambda a, b: a and b,
+    "or": lambda a, b: a or b,
+    "equal to": lambda a, b: a == b,
+    "xor": lambda a, b: a != b,
+    "nor": lambda a, b: not (a or b),
+    "nand": lambda a, b: not (a and b),
+    "xnor": lambda a, b: a == b,
+}
+
+
+def magnitude(v):
+    return math.sqrt(v[0] * v[0] + v[1] * v[1] + v[2] * v[2])
+
+
+def normalize(v):
+    length = magnitude(v)
+    if length > 1e-5:
+        return (v[0] / length, v[1] / length, v[2] / length)
+    return (0.0, 0.0, 0.0)
+
+
+def clamp(value, low, high):
+    if value < low:
+        return low
+    if value > high:
+        return high
+    return value
+
+
+# node name -> function(modifier, *inputs) for every node whose outputs only
+# depend on its modifier and inputs. Vectors are (x, y, z) tuples and
+# Vector3Split returns the tuple of its three outputs.
+pureNodes = {
+    "Float": lambda modifier: floatModifier(modifier),
+    "Bool": lambda modifier: boolModifier(modifier),
+    "AddFloats": lambda modifier, a, b: a + b,
+    "SubtractFloats": lambda modifier, a, b: a - b,
+    "MultiplyFloats": lambda modifier, a, b: a * b,
+    "DivideFloats": lambda modifier, a, b: divide(a, b),
+    "Modulo": lambda modifier, a, b: modulo(a, b),
+    "Operation": lambda modifier, x: operations[modeModifier(modifier, operationModes)](
+        x
+    ),
+    "ClampFloat": lambda modifier, value, low, high: clamp(value, low, high),
+    "CompareFloats": lambda modifier, a, b: compareFloats[
+        modeModifier(modifier, compareFloatModes)
+    ](a, b),
+    "CompareBool": lambda modifier, a, b: compareBools[
+        modeModifier(modifier, compareBoolModes)
+    ](a, b),
+    "Not": lambda modifier, a: not a,
+    "ConditionalSetFloatV2": lambda modifier, condition, a, b: (
+        a if condition == boolModifier(modifier) else b
+    ),
+    "ConditionalSetVector3": lambda modifier, condition, a, b: (
+        a if condition == boolModifier(modifier) else b
+    ),
+    "ConstructVector3": lambda modifier, x, y, z: (x, y, z),
+    "Vector3Split": lambda modifier, v: v,
+    "AddVector3": lambda modifier, a, b: (a[0] + b[0], a[1] + b[1], a[2] + b[2]),
+    "SubtractVector3": lambda modifier, a, b: (
+        a[0] - b[0],
+        a[1] - b[1],
+        a[2] - b[2],
+    ),
+    "ScaleVector3": lambda modifier, v, s: (v[0] * s, v[1] * s, v[2] * s),
+    "CrossProduct": lambda modifier, a, b: (
+        a[1] * b[2] - a[2] * b[1],
+        a[2] * b[0] - a[0] * b[2],
+        a[0] * b[1] - a[1] * b[0],
+    ),
+    "DotProduct": lambda modifier, a, b: a[0] * b[0] + a[1] * b[1] + a[2] * b[2],
+    "Distance": lambda modifier, a, b: magnitude(
+        (a[0] - b[0], a[1] - b[1], a[2] - b[2])
+    ),
+    "Magnitude": lambda modifier, v: magnitude(v),
+    "Normalize": lambda modifier, v: normalize(v),
+}
+
+
+# value of an unconnected input, by port type
+defaultInputs = {"Float": 0.0, "Bool": False, "Vector3": (0.0, 0.0, 0.0)}
+
+# the object each vector3 sensor belongs to, for transforms left out of a state
+sensorTransforms = {
+    "Self": "Self Position",
+    "Opponent": "Opponent Position",
+    "Ball": "Ball Position",
+}
+
+# RelativePosition mode -> (include the position, axis, sign)
+relativePositions = {
+    "Self": (True, None, 1),
+    "Self + Forward": (True, "forward", 1),
+    "Self + Backward": (True, "forward", -1),
+    "Self + Left": (True, "right", -1),
+    "Self + Right": (True, "right", 1),
+    "Self + Up": (True, "up", 1),
+    "Self + Down": (True, "up", -1),
+    "Forward": (False, "forward", 1),
+    "Backward": (False, "forward", -1),
+    "Left": (False, "right", -1),
+    "Right": (False, "right", 1),
+    "Up": (False, "up", 1),
+    "Down": (False, "up", -1),
+}
+
+
+def transform(state: dict, name: str) -> dict:
+    """
+    A transform sensor as {"position", "forward", "right", "up"}. Missing
+    axes are the unrotated ones, and Self/Opponent/Ball default to the
+    unrotated transform at their position sensor.
+    """
+    value = state.get(name)
+    if value is None:
+        if name not in sensorTransforms:
+            raise KeyError(f"game state has no {name!r}")
+        value = {"position": state[sensorTransforms[name]]}
+    return {
+        "position": (0.0, 0.0, 0.0),
+        "forward": (0.0, 0.0, 1.0),
+        "right": (1.0, 0.0, 0.0),
+        "up": (0.0, 1.0, 0.0),
+        **value,
+    }
+
+
+def relativePosition(value: dict, mode: str):
+    withPosition, axis, sign = relativePositions[mode]
+    result = value["position"] if withPosition else (0.0, 0.0, 0.0)
+    if axis is not None:
+        result = tuple(a + sign * b for a, b in zip(result, value[axis]))
+    return result
+
+
+def sensor(state: dict, name: str):
+    if name == "Pi" and name not in state:
+        return math.pi
+    if name not in state:
+        raise KeyError(f"game state has no {name!r}")
+    return state[name]
+
+
+def evaluateGraph(graph: Graph, state: dict, rng=None) -> dict:
+    """
+    Evaluates a bot against one game state, the way the game would for one
+    frame, but in double precision. `state` maps sensor names to values:
+    (x, y, z) tuples for the Vector3 sensors ("Ball Position", ...), numbers
+    for the float sensors ("Delta time", "Gravity", ...), bools for the bool
+    sensors ("Self Can Jump", ...) and transform dicts, see `transform`.
+
+    Returns {"target": (x, y, z), "jump": bool} from the SlimeController,
+    None without one, and "debug": the value of every Debug node in graph
+    order. Saves can be evaluated after `LoadData` into a graph. RandomFloat
+    draws from `rng`, the random module by default.
+    """
+    rng = random if rng is None else rng
+    values = {}
+    result = {"target": None, "jump": None, "debug": []}
+    debugValues = {}
+
+    for index in graph.topologicalOrder():
+        name = nodeTypeNames[graph.nodeTypes[index]]
+        modifier = graph.nodeModifiers[index]
+        # port ids are the port type followed by one digit
+        inputs = [
+            (defaultInputs.get(portId[:-1]) if node is None else values[node.key])
+            for portId, node in zip(operands[name], graph.inputNodes(index))
+        ]
+
+        if name in pureNodes:
+            value = pureNodes[name](modifier, *inputs)
+        else:
+            match name:
+                case "VolleyballGetFloat":
+                    value = float(sensor(state, modeModifier(modifier, floatSensors)))
+                case "VolleyballGetBool":
+                    value = bool(sensor(state, modeModifier(modifier, boolSensors)))
+                case "SlimeGetVector3":
+                    value = tuple(sensor(state, modeModifier(modifier, vector3Sensors)))
+                case "VolleyballGetTransform":
+                    value = transform(state, modeModifier(modifier, transformSensors))
+                case "RelativePosition":
+                    mode = modeModifier(modifier, relativePositionModes)
+                    value = relativePosition(inputs[0], mode)
+                case "RandomFloat":
+                    value = rng.uniform(*inputs)
+                case "SlimeController":
+                    result["target"], result["jump"] = inputs
+                    continue
+                case "Debug":
+                    debugValues[index] = inputs[0]
+                    continue
+                case _:
+                    # properties, colors and comments
+                    value = modifier
+
+        if name == "Vector3Split":
+            for outputIndex, component in enumerate(value, 1):
+                values[(index, outputIndex)] = component
+        else:
+            values[(index, 1)] = value
+
+    result["debug"] = [debugValues[index] for index in sorted(debugValues)]
+    return result
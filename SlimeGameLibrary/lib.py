@@ -1,32 +1,218 @@
+import gc
 import json
 import math
 import numbers
-import random
-from collections import deque
+import threading
+from array import array
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from itertools import repeat
 from typing import Literal
 
-from .data import colors, outputs, ports, sizes
-from .utils import Color, Position2, Position3, generateId
-
-data = {"serializableNodes": [], "serializableConnections": []}
+from .data import colors, operands, outputs, ports, sizes
+from .utils import Color, Position2, Position3, RandomIds
 
 
 def isNumber(value):
     return isinstance(value, numbers.Number) and not isinstance(value, bool)
 
 
-class Node:
-    def __init__(self, data: dict, outputIndex=1):
-        self.data = data
-        self.outputIndex = outputIndex
-        self.type = outputs[data["id"]]
+@contextmanager
+def pausedGarbageCollection():
+    """
+    Loading a save allocates millions of dicts and lists without cycles, and
+    the collector would keep rescanning them all while they are created.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+# node type codes are indexes into this list
+nodeTypeNames = list(outputs)
+nodeTypeCodes = {nodeName: code for code, nodeName in enumerate(nodeTypeNames)}
+nodeTypeOutputs = [outputs[nodeName] for nodeName in nodeTypeNames]
+
+
+class NodeTemplate:
+    """
+    The parts of a node type that are the same for every instance, built once
+    from `ports`, `sizes` and `colors`. The save-file dicts of an instance are
+    shallow copies with only sID, nodeSID, nodeInstanceID and localPosition
+    filled in.
+    """
+
+    __slots__ = (
+        "code",
+        "inputPorts",
+        "nodeData",
+        "nodeName",
+        "operandOffsets",
+        "outputOffsets",
+        "outputPortIds",
+        "outputPorts",
+        "portCount",
+        "portData",
+        "rectTransform",
+    )
+
+    def __init__(self, nodeName: str):
+        self.nodeName = nodeName
+        self.code = nodeTypeCodes[nodeName]
+        self.portCount = len(ports[nodeName])
+        # port id -> offset of the port within the node
         self.inputPorts = {}
         self.outputPorts = {}
-        for port in data["serializablePorts"]:
-            if port["polarity"] == 0:
-                self.inputPorts[port["id"]] = port
+        self.outputPortIds = []
+        # offset of the port behind each output index, starting at 1
+        self.outputOffsets = [None]
+        for offset, portData in enumerate(ports[nodeName]):
+            if portData["polarity"] == 0:
+                self.inputPorts[portData["id"]] = offset
             else:
-                self.outputPorts[port["id"]] = port
+                self.outputPorts[portData["id"]] = offset
+                self.outputPortIds.append(portData["id"])
+                self.outputOffsets.append(offset)
+        # offsets of the input ports in constructor argument order
+        self.operandOffsets = [self.inputPorts[portId] for portId in operands[nodeName]]
+
+        self.rectTransform = {
+            "position": Position3(0, 0),
+            "localPosition": None,
+            "anchorMin": Position2(0, 1),
+            "anchorMax": Position2(0, 1),
+            "sizeDelta": sizes[nodeName],
+            "scale": Position3(1, 1, 1),
+        }
+        self.nodeData = {
+            "serializableRectTransform": None,
+            "id": nodeName,
+            "sID": None,
+            "enableSelfConnection": False,
+            "enableDrag": True,
+            "enableHover": False,
+            "enableSelect": True,
+            "disableClick": False,
+            "modifier": None,
+            "defaultColor": colors[nodeName],
+            "outlineSelectedColor": Color(1, 0.58, 0.04),
+            "outlineHoverColor": Color(1, 0.81, 0.3),
+            "serializablePorts": None,
+        }
+        self.portData = [
+            {
+                "serializableRectTransform": {
+                    "position": Position3(0, 0),
+                    "localPosition": portData["position"],
+                    "anchorMin": Position2(0, 1),
+                    "anchorMax": Position2(0, 1),
+                    "sizeDelta": Position2(40, 40),
+                    "scale": Position3(1, 1, 1),
+                },
+                "id": portData["id"],
+                "sID": None,
+                "polarity": portData["polarity"],
+                "maxConnections": portData["maxConnections"],
+                "iconColorDefault": portData["iconColorDefault"],
+                "iconColorHover": portData["iconColorHover"],
+                "iconColorSelected": portData["iconColorSelected"],
+                "iconColorConnected": Color(1, 1, 1),
+                "enableDrag": True,
+                "enableHover": True,
+                "disableClick": False,
+                "controlPointSerializableRectTransform": {
+                    "position": Position3(0, 0),
+                    "localPosition": portData["controlPointPosition"],
+                    "anchorMin": Position2(0.5, 0.5),
+                    "anchorMax": Position2(0.5, 0.5),
+                    "sizeDelta": Position2(0, 0),
+                    "scale": Position3(2.21, 2.21, 2.21),
+                },
+                "nodeInstanceID": None,
+                "nodeSID": None,
+            }
+            for portData in ports[nodeName]
+        ]
+
+
+# indexed by node type code
+nodeTemplates = [NodeTemplate(nodeName) for nodeName in nodeTypeNames]
+
+connectionTemplate = {
+    "id": None,
+    "sID": None,
+    "port0InstanceID": None,
+    "port1InstanceID": None,
+    "port0SID": None,
+    "port1SID": None,
+    "selectedColor": Color(1.0, 0.58, 0.04),
+    "hoverColor": Color(1.0, 0.81, 0.3),
+    "defaultColor": Color(0.98, 0.94, 0.84),
+    "curveStyle": 2,
+    "label": "",
+    "line": None,
+    "enableDrag": True,
+    "enableHover": True,
+    "enableSelect": True,
+    "disableClick": False,
+}
+lineTemplate = {
+    "capStart": {
+        "active": False,
+        "shape": 3,
+        "size": 5.0,
+        "color": Color(1.0, 0.81, 0.3),
+        "angleOffset": 0.0,
+    },
+    "capEnd": {
+        "active": False,
+        "shape": 3,
+        "size": 5.0,
+        "color": Color(1.0, 0.81, 0.3),
+        "angleOffset": 0.0,
+    },
+    "ID": "",
+    "startWidth": 3.0,
+    "endWidth": 3.0,
+    "dashDistance": 5.0,
+    "color": Color(0.98, 0.94, 0.84),
+    "points": None,
+    "lineStyle": 0,
+    "length": 0,
+    "animation": None,
+}
+animationTemplate = {
+    "isActive": False,
+    "pointsDistance": 90.0,
+    "size": 10.0,
+    "color": None,
+    "shape": 1,
+    "speed": 0.0,
+}
+
+
+class Node:
+    """Handle to one output of a node stored in a `Graph`."""
+
+    __slots__ = ("graph", "index", "outputIndex", "type")
+
+    def __init__(self, graph: "Graph", index: int, outputIndex=1):
+        self.graph = graph
+        self.index = index
+        self.outputIndex = outputIndex
+        self.type = nodeTypeOutputs[graph.nodeTypes[index]]
+
+    @property
+    def nodeName(self) -> str:
+        return nodeTypeNames[self.graph.nodeTypes[self.index]]
+
+    @property
+    def modifier(self):
+        return self.graph.nodeModifiers[self.index]
 
     @property
     def x(self):
@@ -53,748 +239,1034 @@ class Node:
         raise AttributeError("'Node' object has no attribute 'z'")
 
     def __repr__(self):
-        return f"Node(type='{self.type}', id='{self.data['sID']}')"
+        return f"Node(type='{self.type}', id='{self.graph.nodeSIDs[self.index]}')"
 
     def __hash__(self):
-        return int(self.data["sID"].replace("-", ""), 16) + self.outputIndex
+        return hash((id(self.graph), self.index, self.outputIndex))
 
-    def __add__(self, other) -> "Node":
-        if isinstance(other, Node):
-            if self.type == float and other.type == float:
-                from .nodes import AddFloats
+    @property
+    def key(self) -> tuple[int, int]:
+        """Identity of this output within its graph."""
+        return (self.index, self.outputIndex)
 
-                return AddFloats(self, other)
-            if self.type == "Vector3" and other.type == "Vector3":
-                from .nodes import AddVector3
+    @property
+    def data(self) -> dict:
+        """The node's save-file dict, built on demand. Changes are not kept."""
+        return self.graph.nodeData(self.index)
 
-                return AddVector3(self, other)
+    @property
+    def inputPorts(self) -> dict:
+        """Port id -> save-file dict of each input port, built on demand."""
+        return self.serializedPorts(0)
 
-        elif isNumber(other) and self.type == float:
-            from .nodes import AddFloats
+    @property
+    def outputPorts(self) -> dict:
+        """Port id -> save-file dict of each output port, built on demand."""
+        return self.serializedPorts(1)
 
-            return AddFloats(self, other)
+    def serializedPorts(self, polarity: int) -> dict:
+        return {
+            port["id"]: port
+            for port in self.data["serializablePorts"]
+            if port["polarity"] == polarity
+        }
 
-        return NotImplemented
+    def __add__(self, other) -> "Node":
+        return self.apply("add", other)
 
     def __radd__(self, other) -> "Node":
-        return self.__add__(other)
+        return self.applyReflected("add", other)
 
     def __sub__(self, other) -> "Node":
-        if isinstance(other, Node):
-            if self.type == float and other.type == float:
-                from .nodes import SubtractFloats
-
-                return SubtractFloats(self, other)
-            if self.type == "Vector3" and other.type == "Vector3":
-                from .nodes import SubtractVector3
-
-                return SubtractVector3(self, other)
-
-        elif isNumber(other) and self.type == float:
-            from .nodes import SubtractFloats
-
-            return SubtractFloats(self, other)
-
-        return NotImplemented
+        return self.apply("sub", other)
 
     def __rsub__(self, other) -> "Node":
-        if isNumber(other) and self.type == float:
-            from .nodes import SubtractFloats
-
-            return SubtractFloats(other, self)
-
-        return NotImplemented
+        return self.applyReflected("sub", other)
 
     def __mul__(self, other) -> "Node":
-        if isinstance(other, Node):
-            if self.type == float and other.type == float:
-                from .nodes import MultiplyFloats
-
-                return MultiplyFloats(self, other)
-            if self.type == "Vector3" and other.type == float:
-                from .nodes import ScaleVector3
-
-                return ScaleVector3(self, other)
-            if self.type == float and other.type == "Vector3":
-                from .nodes import ScaleVector3
-
-                return ScaleVector3(other, self)
-
-        elif isNumber(other):
-            if self.type == float:
-                from .nodes import MultiplyFloats
-
-                return MultiplyFloats(self, other)
-            if self.type == "Vector3":
-                from .nodes import ScaleVector3
-
-                return ScaleVector3(self, other)
-
-        return NotImplemented
+        return self.apply("mul", other)
 
     def __rmul__(self, other) -> "Node":
-        return self.__mul__(other)
+        return self.applyReflected("mul", other)
 
     def __truediv__(self, other) -> "Node":
-        if isinstance(other, Node):
-            if self.type == float and other.type == float:
-                from .nodes import DivideFloats
-
-                return DivideFloats(self, other)
-
-        elif isNumber(other) and self.type == float:
-            from .nodes import DivideFloats
-
-            return DivideFloats(self, other)
-
-        return NotImplemented
+        return self.apply("truediv", other)
 
     def __rtruediv__(self, other) -> "Node":
-        if isNumber(other) and self.type == float:
-            from .nodes import DivideFloats
-
-            return DivideFloats(other, self)
-
-        return NotImplemented
+        return self.applyReflected("truediv", other)
 
     def __floordiv__(self, other) -> "Node":
-        result = self.__truediv__(other)
-        if result is NotImplemented:
-            return result
-        from .nodes import Operation
-
-        return Operation(result, "floor")
+        return self.apply("floordiv", other)
 
     def __rfloordiv__(self, other) -> "Node":
-        if isNumber(other) and self.type == float:
-            from .nodes import DivideFloats
-
-            div_result = DivideFloats(other, self)
-            from .nodes import Operation
-
-            return Operation(div_result, "floor")
-
-        return NotImplemented
+        return self.applyReflected("floordiv", other)
 
     def __mod__(self, other) -> "Node":
-        if isinstance(other, Node):
-            if self.type == float and other.type == float:
-                from .nodes import Modulo
-
-                return Modulo(self, other)
-
-        elif isNumber(other) and self.type == float:
-            from .nodes import Modulo
-
-            return Modulo(self, other)
-
-        return NotImplemented
+        return self.apply("mod", other)
 
     def __rmod__(self, other) -> "Node":
-        if isNumber(other) and self.type == float:
-            from .nodes import Modulo
-
-            return Modulo(other, self)
-
-        return NotImplemented
+        return self.applyReflected("mod", other)
 
     def __pow__(self, other) -> "Node":
-        if isinstance(other, Node):
-            if self.type == float and other.type == float:
-                from .customNodes import Power
-
-                return Power(self, other)
-
-        elif isNumber(other) and self.type == float:
-            if other == 2:
-                from .nodes import MultiplyFloats
-
-                return MultiplyFloats(self, self)
-
-            from .customNodes import Power
-
-            return Power(self, other)
-
-        return NotImplemented
+        return self.apply("pow", other)
 
     def __rpow__(self, other) -> "Node":
-        if isNumber(other) and self.type == float:
-            from .customNodes import Power
-
-            return Power(other, self)
-
-        return NotImplemented
+        return self.applyReflected("pow", other)
 
     def __neg__(self) -> "Node":
-        if self.type == float:
-            from .nodes import MultiplyFloats
-
-            return MultiplyFloats(self, -1)
-
-        return NotImplemented
+        return self.apply("neg", None)
 
     def __pos__(self) -> "Node":
         return self
 
     def __abs__(self) -> "Node":
-        if self.type == float:
-            from .nodes import Operation
-
-            return Operation(self, "abs")
-
-        return NotImplemented
+        return self.apply("abs", None)
 
     def __invert__(self) -> "Node":
-        if self.type == bool:
-            from .nodes import Not
-
-            return Not(self)
-
-        return NotImplemented
+        return self.apply("invert", None)
 
     def __eq__(self, other) -> "Node":
-        if isinstance(other, Node):
-            if self.type == float and other.type == float:
-                from .nodes import CompareFloats
-
-                return CompareFloats(self, other)
-            if self.type == bool and other.type == bool:
-                from .nodes import CompareBool
-
-                return CompareBool(self, other)
-
-        elif isNumber(other) and self.type == float:
-            from .nodes import CompareFloats
-
-            return CompareFloats(self, other)
-
-        elif isinstance(other, bool) and self.type == bool:
-            from .nodes import CompareBool
-
-            return CompareBool(self, other)
-
-        return NotImplemented
+        return self.apply("eq", other)
 
     def __ne__(self, other) -> "Node":
-        result = self.__eq__(other)
-        if result is NotImplemented:
-            return result
-        from .nodes import Not
-
-        return Not(result)
+        return self.apply("ne", other)
 
     def __lt__(self, other) -> "Node":
-        if isinstance(other, Node):
-            if self.type == float and other.type == float:
-                from .nodes import CompareFloats
-
-                return CompareFloats(self, other, "<")
-
-        elif isNumber(other) and self.type == float:
-            from .nodes import CompareFloats
-
-            return CompareFloats(self, other, "<")
-
-        return NotImplemented
+        return self.apply("lt", other)
 
     def __le__(self, other) -> "Node":
-        if isinstance(other, Node):
-            if self.type == float and other.type == float:
-                from .nodes import CompareFloats
-
-                return CompareFloats(self, other, "<=")
-
-        elif isNumber(other) and self.type == float:
-            from .nodes import CompareFloats
-
-            return CompareFloats(self, other, "<=")
-
-        return NotImplemented
+        return self.apply("le", other)
 
     def __gt__(self, other) -> "Node":
-        if isinstance(other, Node):
-            if self.type == float and other.type == float:
-                from .nodes import CompareFloats
-
-                return CompareFloats(self, other, ">")
-
-        elif isNumber(other) and self.type == float:
-            from .nodes import CompareFloats
-
-            return CompareFloats(self, other, ">")
-
-        return NotImplemented
+        return self.apply("gt", other)
 
     def __ge__(self, other) -> "Node":
-        if isinstance(other, Node):
-            if self.type == float and other.type == float:
-                from .nodes import CompareFloats
-
-                return CompareFloats(self, other, ">=")
-
-        elif isNumber(other) and self.type == float:
-            from .nodes import CompareFloats
-
-            return CompareFloats(self, other, ">=")
-
-        return NotImplemented
+        return self.apply("ge", other)
 
     def __and__(self, other) -> "Node":
-        if isinstance(other, Node):
-            if self.type == bool and other.type == bool:
-                from .nodes import CompareBool
-
-                return CompareBool(self, other, "and")
-
-        elif isinstance(other, bool) and self.type == bool:
-            from .nodes import CompareBool
-
-            return CompareBool(self, other, "and")
-
-        return NotImplemented
+        return self.apply("and", other)
 
     def __rand__(self, other) -> "Node":
-        if isinstance(other, bool) and self.type == bool:
-            from .nodes import CompareBool
-
-            return CompareBool(other, self, "and")
-
-        return NotImplemented
+        return self.applyReflected("and", other)
 
     def __or__(self, other) -> "Node":
-        if isinstance(other, Node):
-            if self.type == bool and other.type == bool:
-                from .nodes import CompareBool
-
-                return CompareBool(self, other, "or")
-
-        elif isinstance(other, bool) and self.type == bool:
-            from .nodes import CompareBool
-
-            return CompareBool(self, other, "or")
-
-        return NotImplemented
+        return self.apply("or", other)
 
     def __ror__(self, other) -> "Node":
-        if isinstance(other, bool) and self.type == bool:
-            from .nodes import CompareBool
-
-            return CompareBool(other, self, "or")
-
-        return NotImplemented
+        return self.applyReflected("or", other)
 
     def __xor__(self, other) -> "Node":
-        if isinstance(other, Node):
-            from .nodes import CompareBool
-
-            if self.type == bool and other.type == bool:
-                return CompareBool(self, other, "xor")
-
-        elif isinstance(other, bool) and self.type == bool:
-            from .nodes import CompareBool
-
-            return CompareBool(self, other, "xor")
-
-        return NotImplemented
+        return self.apply("xor", other)
 
     def __rxor__(self, other) -> "Node":
-        if isinstance(other, bool) and self.type == bool:
-            from .nodes import CompareBool
-
-            return CompareBool(other, self, "xor")
-
-        return NotImplemented
+        return self.applyReflected("xor", other)
 
     def __matmul__(self, other) -> "Node":
-        if isinstance(other, Node):
-            if self.type == "Vector3" and other.type == "Vector3":
-                from .nodes import DotProduct
+        return self.apply("matmul", other)
 
-                return DotProduct(self, other)
+    def __rmatmul__(self, other) -> "Node":
+        return self.applyReflected("matmul", other)
+
+    def apply(self, operator: str, other) -> "Node":
+        constructor = operators.get((operator, self.type, operandType(other)))
+        if constructor is None:
+            return NotImplemented
+        return constructor(self, other)
+
+    def applyReflected(self, operator: str, other) -> "Node":
+        constructor = operators.get((operator, operandType(other), self.type))
+        if constructor is None:
+            return NotImplemented
+        return constructor(other, self)
+
+
+def operandType(value):
+    """The type an operand dispatches on: literals count as Float or Bool nodes."""
+    if isinstance(value, Node):
+        return value.type
+    if isinstance(value, bool):
+        return bool
+    if isNumber(value):
+        return float
+    return None
 
-        return NotImplemented
 
-    def __rmatmul__(self, other) -> "Node":
-        return self.__matmul__(other)
-
-
-def AddNode(nodeName, nodeValue="", includePorts=True, position=None):
-    node = {}
-
-    if position is None:
-        position = Position3(0, 0)
-
-    nodeId = generateId()
-    instanceId = random.randint(0, 999999)
-
-    node["serializableRectTransform"] = {}
-    node["serializableRectTransform"]["position"] = Position3(0, 0)
-    node["serializableRectTransform"]["localPosition"] = position
-    node["serializableRectTransform"]["anchorMin"] = Position2(0, 1)
-    node["serializableRectTransform"]["anchorMax"] = Position2(0, 1)
-    node["serializableRectTransform"]["sizeDelta"] = sizes[nodeName]
-    node["serializableRectTransform"]["scale"] = Position3(1, 1, 1)
-    node["id"] = nodeName
-    node["sID"] = nodeId
-    node["enableSelfConnection"] = False
-    node["enableDrag"] = True
-    node["enableHover"] = False
-    node["enableSelect"] = True
-    node["disableClick"] = False
-    node["modifier"] = nodeValue
-    node["defaultColor"] = colors[nodeName]
-    node["outlineSelectedColor"] = Color(1, 0.58, 0.04)
-    node["outlineHoverColor"] = Color(1, 0.81, 0.3)
-    node["serializablePorts"] = []
-    if includePorts:
-        for portData in ports[nodeName]:
-            node["serializablePorts"].append(
-                {
-                    "serializableRectTransform": {
-                        "position": Position3(0, 0),
-                        "localPosition": portData["position"],
-                        "anchorMin": Position2(0, 1),
-                        "anchorMax": Position2(0, 1),
-                        "sizeDelta": Position2(40, 40),
-                        "scale": Position3(1, 1, 1),
-                    },
-                    "id": portData["id"],
-                    "sID": generateId(),
-                    "polarity": portData["polarity"],
-                    "maxConnections": portData["maxConnections"],
-                    "iconColorDefault": portData["iconColorDefault"],
-                    "iconColorHover": portData["iconColorHover"],
-                    "iconColorSelected": portData["iconColorSelected"],
-                    "iconColorConnected": Color(1, 1, 1),
-                    "enableDrag": True,
-                    "enableHover": True,
-                    "disableClick": False,
-                    "controlPointSerializableRectTransform": {
-                        "position": Position3(0, 0),
-                        "localPosition": portData["controlPointPosition"],
-                        "anchorMin": Position2(0.5, 0.5),
-                        "anchorMax": Position2(0.5, 0.5),
-                        "sizeDelta": Position2(0, 0),
-                        "scale": Position3(2.21, 2.21, 2.21),
-                    },
-                    "nodeInstanceID": instanceId,
-                    "nodeSID": nodeId,
-                }
-            )
+# (operator, left type, right type) -> constructor(left, right), filled in by
+# nodes.py and customNodes.py. Unary operators have None as the right type.
+operators = {}
+
+
+class MemoStore:
+    """
+    Memo table of one node constructor in a graph. With `maxSize` it keeps
+    only the most recently used entries; an evicted entry is rebuilt as a
+    new node the next time it is asked for.
+    """
+
+    __slots__ = ("entries", "evictions", "hits", "maxSize", "misses")
+
+    def __init__(self, maxSize: int | None = None):
+        self.entries = OrderedDict()
+        self.maxSize = maxSize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, default=None):
+        if key not in self.entries:
+            self.misses += 1
+            return default
+        self.hits += 1
+        if self.maxSize is not None:
+            self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def peek(self, key, default=None):
+        """Like `get`, without counting the lookup or refreshing the entry."""
+        return self.entries.get(key, default)
+
+    def put(self, key, value):
+        self.entries[key] = value
+        if self.maxSize is not None and len(self.entries) > self.maxSize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class Identifiers:
+    """The sIDs and instance ids that one save file is written with."""
+
+    __slots__ = ("connectionSIDs", "nodeInstanceIDs", "nodeSIDs", "portSIDs")
+
+    def __init__(self, nodeSIDs, nodeInstanceIDs, portSIDs, connectionSIDs):
+        self.nodeSIDs = nodeSIDs
+        self.nodeInstanceIDs = nodeInstanceIDs
+        self.portSIDs = portSIDs
+        self.connectionSIDs = connectionSIDs
+
+
+class Graph:
+    """
+    Owns the nodes, connections, memo caches and debug counters of one bot.
+
+    Use it as a context manager to build into it:
+
+        with Graph() as graph:
+            SlimeController(Ball.Position, Self.CanJump)
+            graph.SaveData("bot.txt")
+
+    Code outside of any `with Graph()` block builds into the default graph.
+
+    Nodes, ports and connections are stored in parallel arrays indexed by
+    integer ids. The game's save-file dicts are only built by `serialize`.
+    `AddNode` and `ConnectPorts` keep per-node adjacency lists and sID
+    indexes up to date, so pruning, layout and lookups never scan the graph.
+
+    `ids` generates sIDs and instance ids, `RandomIds` by default. Pass
+    `SeededIds(seed)` to get the same file every time the same bot is built.
+    `cacheSize` bounds each constructor's memo table, see `MemoStore`.
+    """
+
+    def __init__(self, ids=None, cacheSize: int | None = None):
+        self.ids = RandomIds() if ids is None else ids
+        self.cacheSize = cacheSize
+        # nodes
+        self.nodeTypes = array("H")
+        self.nodeModifiers = []
+        self.nodeSIDs = []
+        self.nodeInstanceIDs = array("l")
+        self.nodePositions = []
+        self.nodePortStarts = array("l")
+        self.nodePortCounts = array("H")
+        self.nodeRemoved = bytearray()
+        self.hiddenNodes = set()
+        # connection ids going into and out of each node
+        self.nodeInputs = []
+        self.nodeOutputs = []
+        # outgoing connections whose target is not removed
+        self.nodeUses = array("l")
+        # ports
+        self.portNodes = array("l")
+        self.portSIDs = []
+        self.hiddenPorts = set()
+        # connections, from an output port to an input port
+        self.connectionSources = array("l")
+        self.connectionTargets = array("l")
+        self.connectionSIDs = []
+        self.hiddenConnections = set()
+        # sID -> node / port id
+        self.nodeIndex = {}
+        self.portIndex = {}
+
+        self.caches = {}
+        self.debugCounter = 0
+        # name -> literal marked with Tunable or TunableStat
+        self.tunables = {}
+        # what the passes of the last SaveData(optimize=...) did
+        self.optimizationReport = None
+
+    def __enter__(self):
+        if not hasattr(graphStack, "graphs"):
+            graphStack.graphs = []
+        graphStack.graphs.append(self)
+        return self
 
-    data["serializableNodes"].append(node)
-
-    return Node(node)
-
-
-def ConnectPorts(portType: tuple | str, node0: Node, node1: Node):
-    if isinstance(portType, tuple):
-        port0 = node0.outputPorts[portType[0]]
-        port1 = node1.inputPorts[portType[1]]
-    else:
-        port0 = node0.outputPorts[portType]
-        port1 = node1.inputPorts[portType]
-    connection = {}
-    connection["id"] = f"Connection ({port0["id"]} - {port1["id"]})"
-    connection["sID"] = generateId()
-    connection["port0InstanceID"] = port0["nodeInstanceID"]
-    connection["port1InstanceID"] = port1["nodeInstanceID"]
-    connection["port0SID"] = port0["sID"]
-    connection["port1SID"] = port1["sID"]
-    connection["selectedColor"] = Color(1.0, 0.58, 0.04)
-    connection["hoverColor"] = Color(1.0, 0.81, 0.3)
-    connection["defaultColor"] = Color(0.98, 0.94, 0.84)
-    connection["curveStyle"] = 2
-    connection["label"] = ""
-    connection["line"] = {
-        "capStart": {
-            "active": False,
-            "shape": 3,
-            "size": 5.0,
-            "color": Color(1.0, 0.81, 0.3),
-            "angleOffset": 0.0,
-        },
-        "capEnd": {
-            "active": False,
-            "shape": 3,
-            "size": 5.0,
-            "color": Color(1.0, 0.81, 0.3),
-            "angleOffset": 0.0,
-        },
-        "ID": "",
-        "startWidth": 3.0,
-        "endWidth": 3.0,
-        "dashDistance": 5.0,
-        "color": Color(0.98, 0.94, 0.84),
-        "points": [
-            port0["serializableRectTransform"]["localPosition"],
-            port0["controlPointSerializableRectTransform"]["localPosition"],
-            port1["serializableRectTransform"]["localPosition"],
-            port1["controlPointSerializableRectTransform"]["localPosition"],
-        ],
-        "lineStyle": 0,
-        "length": 0,
-        "animation": {
-            "isActive": False,
-            "pointsDistance": 90.0,
-            "size": 10.0,
-            "color": port0["iconColorDefault"],
-            "shape": 1,
-            "speed": 0.0,
-        },
-    }
-    connection["enableDrag"] = True
-    connection["enableHover"] = True
-    connection["enableSelect"] = True
-    connection["disableClick"] = False
-
-    data["serializableConnections"].append(connection)
-    return connection
-
-
-def findNodeByPortSID(portSID):
-    for node in data["serializableNodes"]:
-        for port in node["serializablePorts"]:
-            if port["sID"] == portSID:
-                return node
-    return None
+    def __exit__(self, excType, excValue, traceback):
+        graphStack.graphs.pop()
+
+    def __len__(self):
+        return len(self.nodeTypes)
+
+    def memoStore(self, name: str) -> MemoStore:
+        store = self.caches.get(name)
+        if store is None:
+            store = self.caches[name] = MemoStore(self.cacheSize)
+        return store
+
+    def cacheStats(self) -> dict:
+        """Hits, misses, evictions and size of every memo table."""
+        return {name: store.stats() for name, store in self.caches.items()}
+
+    def resetCaches(self):
+        """Forgets every memoized node, e.g. before building the next bot."""
+        self.caches = {}
+
+    def reset(self):
+        """Empties the graph so it can be reused for the next build."""
+        self.__init__(self.ids, self.cacheSize)
+
+    def AddNode(self, nodeName, nodeValue="", includePorts=True, position=None):
+        index = len(self.nodeTypes)
+        template = nodeTemplates[nodeTypeCodes[nodeName]]
+        portCount = template.portCount if includePorts else 0
+        nodeId = self.ids.sID()
+
+        self.nodeTypes.append(template.code)
+        self.nodeModifiers.append(nodeValue)
+        self.nodeSIDs.append(nodeId)
+        self.nodeInstanceIDs.append(self.ids.instanceId())
+        self.nodePositions.append(position)
+        self.nodePortStarts.append(len(self.portNodes))
+        self.nodePortCounts.append(portCount)
+        self.nodeRemoved.append(0)
+        self.nodeInputs.append([])
+        self.nodeOutputs.append([])
+        self.nodeUses.append(0)
+        self.nodeIndex[nodeId] = index
+        self.portNodes.extend(repeat(index, portCount))
+        # port sIDs are only generated once the port is serialized
+        self.portSIDs.extend(repeat(None, portCount))
+
+        return Node(self, index)
+
+    def findPort(self, index: int, portId: str, polarity: int) -> int:
+        template = nodeTemplates[self.nodeTypes[index]]
+        offsets = template.inputPorts if polarity == 0 else template.outputPorts
+        offset = offsets[portId]
+        if offset >= self.nodePortCounts[index]:
+            raise KeyError(portId)
+        return self.nodePortStarts[index] + offset
+
+    def portIds(self, index: int, polarity: int) -> list[str]:
+        if self.nodePortCounts[index] == 0:
+            return []
+        template = nodeTemplates[self.nodeTypes[index]]
+        if polarity == 0:
+            return list(template.inputPorts)
+        return template.outputPortIds
+
+    def findPortBySID(self, portSID: str) -> int | None:
+        return self.portIndex.get(portSID)
+
+    def findNodeByPortSID(self, portSID: str) -> Node | None:
+        port = self.portIndex.get(portSID)
+        if port is None:
+            return None
+        return Node(self, self.portNodes[port])
+
+    def ConnectPorts(self, portType: tuple | str, node0: Node, node1: Node) -> int:
+        for node in (node0, node1):
+            if node.graph is not self:
+                raise ValueError(f"{node!r} belongs to a different graph")
+
+        if isinstance(portType, tuple):
+            port0 = self.findPort(node0.index, portType[0], 1)
+            port1 = self.findPort(node1.index, portType[1], 0)
+        else:
+            port0 = self.findPort(node0.index, portType, 1)
+            port1 = self.findPort(node1.index, portType, 0)
+
+        # a memoized node can be reused after pruning removed it
+        self.restoreNode(node0.index)
+        self.restoreNode(node1.index)
+
+        connection = len(self.connectionSIDs)
+        self.connectionSources.append(port0)
+        self.connectionTargets.append(port1)
+        self.connectionSIDs.append(self.ids.sID())
+        self.nodeOutputs[node0.index].append(connection)
+        self.nodeInputs[node1.index].append(connection)
+        self.nodeUses[node0.index] += 1
+        return connection
+
+    def connectionNodes(self, connection: int) -> tuple[int, int]:
+        return (
+            self.portNodes[self.connectionSources[connection]],
+            self.portNodes[self.connectionTargets[connection]],
+        )
 
+    def isLive(self, connection: int) -> bool:
+        source, target = self.connectionNodes(connection)
+        return not (self.nodeRemoved[source] or self.nodeRemoved[target])
 
-def gridLayout(offsetX=350, offsetY=-215):
-    x = 1263
-    y = -278
-    nodesPerRow = max(1, int(math.sqrt(len(data["serializableNodes"]))))
+    def liveNodes(self) -> list[int]:
+        return [index for index, removed in enumerate(self.nodeRemoved) if not removed]
 
-    for i, node in enumerate(data["serializableNodes"]):
-        transform = node["serializableRectTransform"]
-        if transform["localPosition"] != Position3(0, 0):
-            continue
-        transform["localPosition"] = Position3(x, y)
-        x += offsetX
-        if (i + 1) % nodesPerRow == 0:
-            x = 1263
-            y += offsetY
+    def tunable(self, index: int) -> dict | None:
+        """The parameter of a Tunable or TunableStat literal, else None."""
+        for parameter in self.tunables.values():
+            if parameter["index"] == index:
+                return parameter
+        return None
 
+    def isSink(self, index: int) -> bool:
+        """Nodes without outputs, and String comments, are kept unconnected."""
+        return nodeTypeOutputs[self.nodeTypes[index]] in (None, str)
 
-def autoLayout(offsetX=350, offsetY=-215):
-    adj = {}
-    inDegree = {}
+    def outputPort(self, node: Node) -> int:
+        template = nodeTemplates[self.nodeTypes[node.index]]
+        return (
+            self.nodePortStarts[node.index] + template.outputOffsets[node.outputIndex]
+        )
 
-    for node in data["serializableNodes"]:
-        adj[node["sID"]] = []
-        inDegree[node["sID"]] = 0
+    def portOutput(self, port: int) -> Node:
+        """The node output that an output port belongs to."""
+        index = self.portNodes[port]
+        template = nodeTemplates[self.nodeTypes[index]]
+        offset = port - self.nodePortStarts[index]
+        return Node(self, index, template.outputOffsets.index(offset))
+
+    def inputNodes(self, index: int) -> list[Node | None]:
+        """
+        The outputs connected to a node's inputs, in constructor argument
+        order, with None for unconnected inputs.
+        """
+        template = nodeTemplates[self.nodeTypes[index]]
+        start = self.nodePortStarts[index]
+        sources = {}
+        for connection in self.nodeInputs[index]:
+            source = self.connectionSources[connection]
+            if not self.nodeRemoved[self.portNodes[source]]:
+                sources[self.connectionTargets[connection] - start] = source
+        return [
+            self.portOutput(sources[offset]) if offset in sources else None
+            for offset in template.operandOffsets
+        ]
+
+    def consumers(self, node: Node) -> list[int]:
+        """Live connections going out of one node output."""
+        port = self.outputPort(node)
+        return [
+            connection
+            for connection in self.nodeOutputs[node.index]
+            if self.connectionSources[connection] == port
+            and not self.nodeRemoved[self.portNodes[self.connectionTargets[connection]]]
+        ]
+
+    def replaceUses(self, old: Node, new: Node) -> int:
+        """Reconnects everything fed by `old` to `new`."""
+        if old.index == new.index and old.outputIndex == new.outputIndex:
+            return 0
+        self.restoreNode(new.index)
+        port = self.outputPort(new)
+        moved = self.consumers(old)
+        for connection in moved:
+            self.connectionSources[connection] = port
+            self.nodeOutputs[new.index].append(connection)
+        self.nodeUses[old.index] -= len(moved)
+        self.nodeUses[new.index] += len(moved)
+        if moved:
+            movedSet = set(moved)
+            self.nodeOutputs[old.index] = [
+                connection
+                for connection in self.nodeOutputs[old.index]
+                if connection not in movedSet
+            ]
+        return len(moved)
+
+    def removeDeadNodes(self, candidates) -> int:
+        """
+        Removes the candidates that no longer feed anything, then whatever
+        only fed them. Returns how many nodes were removed.
+        """
+        removed = 0
+        stack = list(candidates)
+        while stack:
+            index = stack.pop()
+            if self.nodeRemoved[index] or self.isSink(index) or self.nodeUses[index]:
+                continue
+            self.removeNode(index)
+            removed += 1
+            for connection in self.nodeInputs[index]:
+                stack.append(self.portNodes[self.connectionSources[connection]])
+        return removed
+
+    def topologicalOrder(self) -> list[int]:
+        """Live nodes ordered so that every node comes after its inputs."""
+        nodes = self.liveNodes()
+        inDegree = {}
+        for index in nodes:
+            inDegree[index] = sum(
+                1
+                for connection in self.nodeInputs[index]
+                if not self.nodeRemoved[
+                    self.portNodes[self.connectionSources[connection]]
+                ]
+            )
+        queue = deque(index for index in nodes if inDegree[index] == 0)
+        order = []
+        while queue:
+            index = queue.popleft()
+            order.append(index)
+            for connection in self.nodeOutputs[index]:
+                target = self.portNodes[self.connectionTargets[connection]]
+                if self.nodeRemoved[target]:
+                    continue
+                inDegree[target] -= 1
+                if inDegree[target] == 0:
+                    queue.append(target)
+        if len(order) < len(nodes):
+            raise ValueError("graph has a cycle")
+        return order
+
+    def removeNode(self, index: int):
+        if self.nodeRemoved[index]:
+            return
+        self.nodeRemoved[index] = 1
+        for connection in self.nodeInputs[index]:
+            self.nodeUses[self.portNodes[self.connectionSources[connection]]] -= 1
+
+    def restoreNode(self, index: int):
+        """Undoes the removal of a node and of everything that feeds it."""
+        stack = [index]
+        while stack:
+            index = stack.pop()
+            if not self.nodeRemoved[index]:
+                continue
+            self.nodeRemoved[index] = 0
+            for connection in self.nodeInputs[index]:
+                source = self.portNodes[self.connectionSources[connection]]
+                self.nodeUses[source] += 1
+                stack.append(source)
+
+    def hasPosition(self, index: int) -> bool:
+        position = self.nodePositions[index]
+        return position is not None and position != Position3(0, 0)
+
+    def gridLayout(self, offsetX=350, offsetY=-215):
+        x = 1263
+        y = -278
+        nodes = self.liveNodes()
+        nodesPerRow = max(1, int(math.sqrt(len(nodes))))
+
+        for i, index in enumerate(nodes):
+            if self.hasPosition(index):
+                continue
+            self.nodePositions[index] = Position3(x, y)
+            x += offsetX
+            if (i + 1) % nodesPerRow == 0:
+                x = 1263
+                y += offsetY
+
+    def autoLayout(self, offsetX=350, offsetY=-215):
+        nodes = self.liveNodes()
+        adj = {index: [] for index in nodes}
+        inDegree = {index: 0 for index in nodes}
+
+        for index in nodes:
+            for connection in self.nodeOutputs[index]:
+                destNode = self.portNodes[self.connectionTargets[connection]]
+                if destNode != index and not self.nodeRemoved[destNode]:
+                    adj[index].append(destNode)
+                    inDegree[destNode] += 1
+
+        queue = deque(index for index in nodes if inDegree[index] == 0)
+
+        nodeLevels = {index: 0 for index in nodes}
+        visitedCount = 0
+
+        while queue:
+            u = queue.popleft()
+            visitedCount += 1
+
+            for v in adj[u]:
+                nodeLevels[v] = max(nodeLevels[v], nodeLevels[u] + 1)
+                inDegree[v] -= 1
+                if inDegree[v] == 0:
+                    queue.append(v)
+
+        if visitedCount < len(nodes):
+            self.gridLayout(offsetX, offsetY)
+            return
+
+        columns = {}
+        for index, level in nodeLevels.items():
+            if level not in columns:
+                columns[level] = []
+            columns[level].append(index)
+
+        sortedColumns = sorted(columns.items())
+
+        currentX = 1263
+        for level, nodesInColumn in sortedColumns:
+            totalHeight = (len(nodesInColumn) - 1) * offsetY
+            currentY = -totalHeight / 2.0 - 278
+
+            for index in nodesInColumn:
+                if self.hasPosition(index):
+                    continue
+                self.nodePositions[index] = Position3(currentX, currentY)
+                currentY += offsetY
+
+            currentX += offsetX
+
+    def removeUnusedNodes(self):
+        nodes = self.liveNodes()
+        stringCode = nodeTypeCodes["String"]
+        nodeIsString = {index: self.nodeTypes[index] == stringCode for index in nodes}
+        connectionGraph = {}
+        inputConnected = {}
+        outputConnected = {}
+
+        for index in nodes:
+            connectionGraph[index] = {"inputs": set(), "outputs": set()}
+            inputConnected[index] = False
+            outputConnected[index] = False
+
+        for index in nodes:
+            for connection in self.nodeOutputs[index]:
+                destinationNode = self.portNodes[self.connectionTargets[connection]]
+                if destinationNode == index or self.nodeRemoved[destinationNode]:
+                    continue
+                connectionGraph[index]["outputs"].add(destinationNode)
+                connectionGraph[destinationNode]["inputs"].add(index)
+                outputConnected[index] = True
+                inputConnected[destinationNode] = True
 
-    for conn in data["serializableConnections"]:
-        sourceNode = findNodeByPortSID(conn["port0SID"])
-        destNode = findNodeByPortSID(conn["port1SID"])
+        # nodesToRemove are the BFS starting points
+        nodesToRemove = set()
+        queue = deque()
 
-        if sourceNode and destNode and sourceNode["sID"] != destNode["sID"]:
-            adj[sourceNode["sID"]].append(destNode["sID"])
-            inDegree[destNode["sID"]] += 1
+        for index in nodes:
+            if nodeIsString[index] or self.nodePortCounts[index] == 0:
+                continue
 
-    queue = deque()
-    for nodeSID, degree in inDegree.items():
-        if degree == 0:
-            queue.append(nodeSID)
+            template = nodeTemplates[self.nodeTypes[index]]
+            hasInputPorts = len(template.inputPorts) > 0
+            hasOutputPorts = len(template.outputPorts) > 0
 
-    nodeRegistry = {node["sID"]: node for node in data["serializableNodes"]}
+            if (hasInputPorts and not inputConnected[index]) or (
+                hasOutputPorts and not outputConnected[index]
+            ):
+                nodesToRemove.add(index)
+                queue.append(index)
 
-    nodeLevels = {nodeSID: 0 for nodeSID in nodeRegistry.keys()}
-    visitedCount = 0
+        # BFS to find all nodes that become disconnected
+        while queue:
+            currentNode = queue.popleft()
 
-    while queue:
-        u = queue.popleft()
-        visitedCount += 1
+            for dependentNode in connectionGraph[currentNode]["outputs"]:
+                if dependentNode in nodesToRemove or nodeIsString[dependentNode]:
+                    continue
 
-        for v in adj[u]:
-            nodeLevels[v] = max(nodeLevels[v], nodeLevels[u] + 1)
-            inDegree[v] -= 1
-            if inDegree[v] == 0:
-                queue.append(v)
+                if all(
+                    src in nodesToRemove
+                    for src in connectionGraph[dependentNode]["inputs"]
+                ):
+                    nodesToRemove.add(dependentNode)
+                    queue.append(dependentNode)
 
-    if visitedCount < len(data["serializableNodes"]):
-        gridLayout(offsetX, offsetY)
-        return
+            for sourceNode in connectionGraph[currentNode]["inputs"]:
+                if sourceNode in nodesToRemove or nodeIsString[sourceNode]:
+                    continue
 
-    columns = {}
-    for nodeSID, level in nodeLevels.items():
-        if level not in columns:
-            columns[level] = []
-        columns[level].append(nodeRegistry[nodeSID])
+                if all(
+                    dst in nodesToRemove
+                    for dst in connectionGraph[sourceNode]["outputs"]
+                ):
+                    nodesToRemove.add(sourceNode)
+                    queue.append(sourceNode)
+
+        for index in nodesToRemove:
+            self.removeNode(index)
+
+    def removeUnreachableNodes(self):
+        """
+        Removes every node that no sink (SlimeController,
+        ConstructSlimeProperties, Debug, DebugDraw* or a String comment)
+        depends on, in a single sweep over the graph.
+        """
+        nodes = self.liveNodes()
+        reachable = bytearray(len(self.nodeTypes))
+        stack = [index for index in nodes if self.isSink(index)]
+        for index in stack:
+            reachable[index] = 1
+
+        while stack:
+            index = stack.pop()
+            for connection in self.nodeInputs[index]:
+                source = self.portNodes[self.connectionSources[connection]]
+                if not reachable[source] and not self.nodeRemoved[source]:
+                    reachable[source] = 1
+                    stack.append(source)
+
+        for index in nodes:
+            if not reachable[index]:
+                self.removeNode(index)
+
+    def identifiers(self, ids=None) -> Identifiers:
+        """
+        The ids to write to a save file. Without `ids` these are the graph's
+        own, with port sIDs generated on first use. With `ids`, a fresh set is
+        drawn from it in node, port, connection order, which leaves the graph
+        untouched and makes the file independent of how the graph was built.
+        """
+        if ids is None:
+            for port, sID in enumerate(self.portSIDs):
+                if sID is None:
+                    sID = self.portSIDs[port] = self.ids.sID()
+                    self.portIndex[sID] = port
+            return Identifiers(
+                self.nodeSIDs,
+                self.nodeInstanceIDs,
+                self.portSIDs,
+                self.connectionSIDs,
+            )
 
-    sortedColumns = sorted(columns.items())
+        nodeSIDs = []
+        nodeInstanceIDs = []
+        for _ in range(len(self.nodeTypes)):
+            nodeSIDs.append(ids.sID())
+            nodeInstanceIDs.append(ids.instanceId())
+        return Identifiers(
+            nodeSIDs,
+            nodeInstanceIDs,
+            [ids.sID() for _ in range(len(self.portNodes))],
+            [ids.sID() for _ in range(len(self.connectionSIDs))],
+        )
 
-    currentX = 1263
-    for level, nodesInColumn in sortedColumns:
-        totalHeight = (len(nodesInColumn) - 1) * offsetY
-        currentY = -totalHeight / 2.0 - 278
+    def serializePort(self, port: int, identifiers: Identifiers) -> dict:
+        index = self.portNodes[port]
+        template = nodeTemplates[self.nodeTypes[index]]
+        serialized = dict(template.portData[port - self.nodePortStarts[index]])
+        serialized["sID"] = identifiers.portSIDs[port]
+        serialized["nodeInstanceID"] = identifiers.nodeInstanceIDs[index]
+        serialized["nodeSID"] = identifiers.nodeSIDs[index]
+        if port in self.hiddenPorts:
+            serialized["serializableRectTransform"] = {
+                **serialized["serializableRectTransform"],
+                "scale": Position3(0, 0),
+            }
+        return serialized
+
+    def serializeNode(
+        self, index: int, serializedPorts: list, identifiers: Identifiers
+    ) -> dict:
+        template = nodeTemplates[self.nodeTypes[index]]
+        position = self.nodePositions[index]
+        node = dict(template.nodeData)
+        node["serializableRectTransform"] = dict(template.rectTransform)
+        node["serializableRectTransform"]["localPosition"] = (
+            Position3(0, 0) if position is None else dict(position)
+        )
+        if index in self.hiddenNodes:
+            node["serializableRectTransform"]["scale"] = Position3(0, 0)
+        node["sID"] = identifiers.nodeSIDs[index]
+        node["modifier"] = self.nodeModifiers[index]
+        node["serializablePorts"] = serializedPorts
+        return node
+
+    def serializeConnection(
+        self, connection: int, port0: dict, port1: dict, identifiers: Identifiers
+    ) -> dict:
+        serialized = dict(connectionTemplate)
+        serialized["id"] = f"Connection ({port0["id"]} - {port1["id"]})"
+        serialized["sID"] = identifiers.connectionSIDs[connection]
+        serialized["port0InstanceID"] = port0["nodeInstanceID"]
+        serialized["port1InstanceID"] = port1["nodeInstanceID"]
+        serialized["port0SID"] = port0["sID"]
+        serialized["port1SID"] = port1["sID"]
+        serialized["line"] = dict(lineTemplate)
+        if connection in self.hiddenConnections:
+            serialized["line"]["startWidth"] = 0
+        serialized["line"]["points"] = [
+            port0["serializableRectTransform"]["localPosition"],
+            port0["controlPointSerializableRectTransform"]["localPosition"],
+            port1["serializableRectTransform"]["localPosition"],
+            port1["controlPointSerializableRectTransform"]["localPosition"],
+        ]
+        serialized["line"]["animation"] = dict(animationTemplate)
+        serialized["line"]["animation"]["color"] = port0["iconColorDefault"]
+        return serialized
+
+    def nodeData(self, index: int) -> dict:
+        """One node's save-file dict with its ports, as `serialize` writes it."""
+        identifiers = self.identifiers()
+        start = self.nodePortStarts[index]
+        serializedPorts = [
+            self.serializePort(port, identifiers)
+            for port in range(start, start + self.nodePortCounts[index])
+        ]
+        return self.serializeNode(index, serializedPorts, identifiers)
 
-        for node in nodesInColumn:
-            transform = node["serializableRectTransform"]
-            if transform["localPosition"] != Position3(0, 0):
-                continue
-            transform["localPosition"] = Position3(currentX, currentY)
-            currentY += offsetY
-
-        currentX += offsetX
-
-
-def updateConnectionLinePoints():
-    for connection in data["serializableConnections"]:
-        port0 = None
-        port1 = None
-
-        for node in data["serializableNodes"]:
-            for port in node["serializablePorts"]:
-                if port["sID"] == connection["port0SID"]:
-                    port0 = port
-                elif port["sID"] == connection["port1SID"]:
-                    port1 = port
-
-        if port0 and port1:
-            connection["line"]["points"] = [
-                port0["serializableRectTransform"]["localPosition"],
-                port0["controlPointSerializableRectTransform"]["localPosition"],
-                port1["serializableRectTransform"]["localPosition"],
-                port1["controlPointSerializableRectTransform"]["localPosition"],
-            ]
+    @property
+    def data(self) -> dict:
+        """
+        The save-file dict graphs used to build up as nodes were added, now
+        built on demand by `serialize`. Changes to it are not kept.
+        """
+        return self.serialize()
+
+    def serialize(self, ids=None) -> dict:
+        """
+        Expands the graph into the game's save-file dict, leaving out removed
+        nodes and their connections. Line points come straight from the port
+        templates, so they never need a separate refresh.
+        """
+        identifiers = self.identifiers(ids)
+        serializedPorts = {}
+        serializedNodes = []
+
+        for index in self.liveNodes():
+            start = self.nodePortStarts[index]
+            nodePorts = []
+            for port in range(start, start + self.nodePortCounts[index]):
+                serializedPorts[port] = self.serializePort(port, identifiers)
+                nodePorts.append(serializedPorts[port])
+            serializedNodes.append(self.serializeNode(index, nodePorts, identifiers))
+
+        serializedConnections = [
+            self.serializeConnection(
+                connection,
+                serializedPorts[self.connectionSources[connection]],
+                serializedPorts[self.connectionTargets[connection]],
+                identifiers,
+            )
+            for connection in range(len(self.connectionSIDs))
+            if self.isLive(connection)
+        ]
+
+        return {
+            "serializableNodes": serializedNodes,
+            "serializableConnections": serializedConnections,
+        }
+
+    def SaveData(
+        self,
+        filePath,
+        layout: Literal["auto", "grid", "single", "hidden", None] = "auto",
+        pruneUnusedNodes: bool | Literal["reachable"] = True,
+        keepPosition=True,
+        ids=None,
+        optimize: Literal[0, 1, 2, 3] = 0,
+    ):
+        if optimize:
+            from .optimize import optimizeGraph
+
+            self.optimizationReport = optimizeGraph(self, optimize)
+
+        if pruneUnusedNodes == "reachable":
+            self.removeUnreachableNodes()
+        elif pruneUnusedNodes:
+            self.removeUnusedNodes()
+
+        match layout:
+            case "auto":
+                self.autoLayout()
+            case "grid":
+                self.gridLayout()
+            case "single":
+                for index in self.liveNodes():
+                    if self.hasPosition(index) and keepPosition:
+                        continue
+                    self.nodePositions[index] = None
+            case "hidden":
+                for index in self.liveNodes():
+                    if self.hasPosition(index) and keepPosition:
+                        continue
+                    self.nodePositions[index] = Position3(9999, 9999)
+                    self.hiddenNodes.add(index)
+
+        # json.dumps goes through the C encoder, json.dump does not
+        text = json.dumps(self.serialize(ids), separators=(",", ":"))
+        with open(filePath, "w") as f:
+            f.write(text)
+
+    def loadSave(self, save: dict) -> list[Node]:
+        """
+        Adds the nodes and connections of a save-file dict to the graph,
+        keeping their sIDs, instance ids, positions and hidden flags, so
+        saving again writes the same bot. Connections to ports that are not
+        in the save are skipped. Returns a Node for every loaded node, in
+        file order.
+
+        Indexing takes time linear in the size of the save and is bound by
+        reading the freshly parsed dicts: a 100k node save takes about 3s on
+        a slow single-core box, a third of the time `json.loads` takes to
+        parse it. benchmarks/loading.py measures both.
+        """
+        with pausedGarbageCollection():
+            hiddenScale = Position3(0, 0)
+            first = len(self.nodeTypes)
+            debugCode = nodeTypeCodes["Debug"]
+            # port sID -> polarity, to tell sources from targets
+            polarities = {}
+
+            for index, node in enumerate(save["serializableNodes"], first):
+                code = nodeTypeCodes.get(node["id"])
+                if code is None:
+                    raise ValueError(f"unknown node type {node['id']!r}")
+                template = nodeTemplates[code]
+                serializedPorts = node["serializablePorts"] or []
+                portCount = template.portCount if serializedPorts else 0
+                start = len(self.portNodes)
+                transform = node["serializableRectTransform"]
 
+                self.nodeTypes.append(code)
+                self.nodeModifiers.append(node["modifier"])
+                self.nodeSIDs.append(node["sID"])
+                self.nodeInstanceIDs.append(
+                    serializedPorts[0]["nodeInstanceID"]
+                    if serializedPorts
+                    else self.ids.instanceId()
+                )
+                self.nodePositions.append(transform["localPosition"])
+                self.nodePortStarts.append(start)
+                self.nodePortCounts.append(portCount)
+                self.nodeRemoved.append(0)
+                self.nodeInputs.append([])
+                self.nodeOutputs.append([])
+                self.nodeUses.append(0)
+                self.nodeIndex[node["sID"]] = index
+                self.portNodes.extend(repeat(index, portCount))
+                self.portSIDs.extend(repeat(None, portCount))
+                if transform["scale"] == hiddenScale:
+                    self.hiddenNodes.add(index)
+                if code == debugCode:
+                    self.debugCounter += 1
+
+                for port in serializedPorts:
+                    polarity = port["polarity"]
+                    offsets = (
+                        template.inputPorts if polarity == 0 else template.outputPorts
+                    )
+                    portIndex = start + offsets[port["id"]]
+                    self.portSIDs[portIndex] = port["sID"]
+                    self.portIndex[port["sID"]] = portIndex
+                    polarities[port["sID"]] = polarity
+                    if port["serializableRectTransform"]["scale"] == hiddenScale:
+                        self.hiddenPorts.add(portIndex)
+
+            for serialized in save["serializableConnections"]:
+                sID0 = serialized["port0SID"]
+                sID1 = serialized["port1SID"]
+                if sID0 not in polarities or sID1 not in polarities:
+                    continue
+                if polarities[sID0] == 0:
+                    sID0, sID1 = sID1, sID0
+                source = self.portIndex[sID0]
+                target = self.portIndex[sID1]
+                connection = len(self.connectionSIDs)
+                self.connectionSources.append(source)
+                self.connectionTargets.append(target)
+                self.connectionSIDs.append(serialized["sID"])
+                self.nodeOutputs[self.portNodes[source]].append(connection)
+                self.nodeInputs[self.portNodes[target]].append(connection)
+                self.nodeUses[self.portNodes[source]] += 1
+                if serialized["line"]["startWidth"] == 0:
+                    self.hiddenConnections.add(connection)
 
-def removeUnusedNodes():
-    portToNode = {}
-    nodeToPorts = {}
-    nodeIsString = {}
-
-    for node in data["serializableNodes"]:
-        node_sid = node["sID"]
-        nodeIsString[node_sid] = node["id"] == "String"
-        nodeToPorts[node_sid] = {"input": [], "output": []}
-
-        for port in node["serializablePorts"]:
-            portToNode[port["sID"]] = node_sid
-            if port["polarity"] == 0:
-                nodeToPorts[node_sid]["input"].append(port["sID"])
-            else:
-                nodeToPorts[node_sid]["output"].append(port["sID"])
+        return [Node(self, index) for index in range(first, len(self.nodeTypes))]
 
-    connectionGraph = {}
-    portConnections = {}
+    def LoadData(self, filePath) -> list[Node]:
+        """Adds the bot of a save file to the graph, see `loadSave`."""
+        with open(filePath) as f:
+            text = f.read()
+        with pausedGarbageCollection():
+            save = json.loads(text)
+        return self.loadSave(save)
 
-    for node in data["serializableNodes"]:
-        connectionGraph[node["sID"]] = {"inputs": set(), "outputs": set()}
 
-    for connection in data["serializableConnections"]:
-        sourceNode = portToNode.get(connection["port0SID"])
-        destinationNode = portToNode.get(connection["port1SID"])
+graphStack = threading.local()
+defaultGraph = Graph()
 
-        if sourceNode and destinationNode and sourceNode != destinationNode:
-            connectionGraph[sourceNode]["outputs"].add(destinationNode)
-            connectionGraph[destinationNode]["inputs"].add(sourceNode)
 
-            portConnections[connection["port0SID"]] = (
-                portConnections.get(connection["port0SID"], 0) + 1
-            )
-            portConnections[connection["port1SID"]] = (
-                portConnections.get(connection["port1SID"], 0) + 1
-            )
+def getGraph() -> Graph:
+    """The graph that the DSL currently builds into."""
+    graphs = getattr(graphStack, "graphs", None)
+    if graphs:
+        return graphs[-1]
+    return defaultGraph
 
-    # nodesToRemove are the BFS starting points
-    nodesToRemove = set()
-    queue = deque()
 
-    for node in data["serializableNodes"]:
-        node_sid = node["sID"]
+def __getattr__(name: str):
+    # the module-level save dict from before graphs owned their nodes
+    if name == "data":
+        return getGraph().data
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-        if nodeIsString[node_sid]:
-            continue
 
-        hasInputPorts = len(nodeToPorts[node_sid]["input"]) > 0
-        hasOutputPorts = len(nodeToPorts[node_sid]["output"]) > 0
+def AddNode(nodeName, nodeValue="", includePorts=True, position=None) -> Node:
+    return getGraph().AddNode(nodeName, nodeValue, includePorts, position)
 
-        inputConnected = any(
-            portConnections.get(pid, 0) > 0 for pid in nodeToPorts[node_sid]["input"]
-        )
 
-        outputConnected = any(
-            portConnections.get(pid, 0) > 0 for pid in nodeToPorts[node_sid]["output"]
-        )
+def ConnectPorts(portType: tuple | str, node0: Node, node1: Node) -> int:
+    return getGraph().ConnectPorts(portType, node0, node1)
 
-        if (hasInputPorts and not inputConnected) or (
-            hasOutputPorts and not outputConnected
-        ):
-            nodesToRemove.add(node_sid)
-            queue.append(node_sid)
 
-    # BFS to find all nodes that become disconnected
-    while queue:
-        currentNode = queue.popleft()
+def findNodeByPortSID(portSID: str) -> Node | None:
+    return getGraph().findNodeByPortSID(portSID)
 
-        for dependentNode in connectionGraph[currentNode]["outputs"]:
-            if dependentNode in nodesToRemove or nodeIsString[dependentNode]:
-                continue
 
-            if all(
-                src in nodesToRemove for src in connectionGraph[dependentNode]["inputs"]
-            ):
-                nodesToRemove.add(dependentNode)
-                queue.append(dependentNode)
+def gridLayout(offsetX=350, offsetY=-215):
+    getGraph().gridLayout(offsetX, offsetY)
 
-        for sourceNode in connectionGraph[currentNode]["inputs"]:
-            if sourceNode in nodesToRemove or nodeIsString[sourceNode]:
-                continue
 
-            if all(
-                dst in nodesToRemove for dst in connectionGraph[sourceNode]["outputs"]
-            ):
-                nodesToRemove.add(sourceNode)
-                queue.append(sourceNode)
+def autoLayout(offsetX=350, offsetY=-215):
+    getGraph().autoLayout(offsetX, offsetY)
+
 
-    activeConnections = []
-    for connection in data["serializableConnections"]:
-        sourceNode = portToNode.get(connection["port0SID"])
-        destinationNode = portToNode.get(connection["port1SID"])
+def removeUnusedNodes():
+    getGraph().removeUnusedNodes()
 
-        if sourceNode not in nodesToRemove and destinationNode not in nodesToRemove:
-            activeConnections.append(connection)
-    data["serializableConnections"] = activeConnections
 
-    activeNodes = []
-    for node in data["serializableNodes"]:
-        node_sid = node["sID"]
-        if node_sid not in nodesToRemove or nodeIsString[node_sid]:
-            activeNodes.append(node)
-    data["serializableNodes"] = activeNodes
+def removeUnreachableNodes():
+    getGraph().removeUnreachableNodes()
 
 
 def SaveData(
     filePath,
     layout: Literal["auto", "grid", "single", "hidden", None] = "auto",
-    pruneUnusedNodes=True,
+    pruneUnusedNodes: bool | Literal["reachable"] = True,
     keepPosition=True,
+    ids=None,
+    optimize: Literal[0, 1, 2, 3] = 0,
 ):
-    if pruneUnusedNodes:
-        removeUnusedNodes()
-
-    match layout:
-        case "auto":
-            autoLayout()
-        case "grid":
-            gridLayout()
-        case "single":
-            for node in data["serializableNodes"]:
-                transform = node["serializableRectTransform"]
-                if transform["localPosition"] != Position3(0, 0) and keepPosition:
-                    continue
-                transform["localPosition"] = Position3(0, 0)
-        case "hidden":
-            for node in data["serializableNodes"]:
-                transform = node["serializableRectTransform"]
-                if transform["localPosition"] != Position3(0, 0) and keepPosition:
-                    continue
-                transform["localPosition"] = Position3(9999, 9999)
-                transform["scale"] = Position3(0, 0)
+    getGraph().SaveData(filePath, layout, pruneUnusedNodes, keepPosition, ids, optimize)
 
-    updateConnectionLinePoints()
 
-    with open(filePath, "w") as f:
-        json.dump(data, f, separators=(",", ":"))
+def LoadData(filePath) -> list[Node]:
+    return getGraph().LoadData(filePath)
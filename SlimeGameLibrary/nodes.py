@@ -1,48 +1,186 @@
+import inspect
+import math
 import numbers
 from typing import Literal
 
-from .data import colorNames, countryNames
-from .lib import AddNode, ConnectPorts, Node, SaveData, data
+from .data import (
+    boolSensors,
+    colorNames,
+    compareBoolModes,
+    compareFloatModes,
+    countryNames,
+    floatSensors,
+    operationModes,
+    relativePositionModes,
+    transformSensors,
+    vector3Sensors,
+)
+from .lib import (
+    AddNode,
+    ConnectPorts,
+    Node,
+    getGraph,
+    operators,
+)
 from .utils import Color, Position3
 
 
-def parseLiteral(value):
-    if isinstance(value, Node):
-        return value
-
-    elif isinstance(value, bool):
-        return Bool(value)
+def literalConstructor(value):
+    """The constructor of the constant node a literal value connects from."""
+    if isinstance(value, bool):
+        return Bool
 
     elif isinstance(value, numbers.Number):
-        return Float(value)
+        return Float
 
     elif isinstance(value, str):
         if value in colorNames.__args__:
-            return Color(value)
+            return Color
         elif value in countryNames.__args__:
-            return Country(value)
+            return Country
         else:
-            return String(value)
+            return String
 
-    return value
+    return None
 
 
-def cache(function):
-    cachedNodes = {}
+def parseLiteral(value):
+    if isinstance(value, Node):
+        return value
+    constructor = literalConstructor(value)
+    return value if constructor is None else constructor(value)
 
-    def wrapper(*args, **kwargs):
-        disableCache = kwargs.pop("disableCache", False)
-        cacheArgs = tuple(hash(arg) for arg in args)
 
-        if disableCache:
-            return function(*args)
+missing = object()
 
-        if cacheArgs not in cachedNodes:
-            cachedNodes[cacheArgs] = function(*args)
 
-        return cachedNodes[cacheArgs]
+def operandKey(value):
+    """
+    Identity of a constructor argument inside a memo key: the node and output
+    for nodes, the type and value for everything else, so that neither two
+    outputs nor True and 1 can share a key.
+    """
+    if isinstance(value, Node):
+        return (0, value.index, value.outputIndex)
+    return (1, type(value).__name__, value)
+
+
+def parseOperand(value):
+    """
+    Turns a node input into the canonical `Node` it will be connected from.
+    A literal whose constant node does not exist yet stays a value, so that
+    the constructor creates the constant after its own node.
+    """
+    if isinstance(value, tuple) and isinstance(value[0], Node):
+        return Node(value[0].graph, value[0].index, value[1])
+    constructor = None if isinstance(value, Node) else literalConstructor(value)
+    if constructor is None:
+        return value
+    node = constructor.find(value)
+    return value if node is missing else node
+
+
+def sortOperands(args):
+    """Operand order of commutative nodes does not change their value."""
+    inputs = sorted(args[:2], key=operandKey)
+    return inputs + args[2:]
+
+
+mirroredComparisons = {"==": "==", "<": ">", ">": "<", "<=": ">=", ">=": "<="}
+
+
+def sortComparison(args):
+    """`a < b` is built as `b > a` when that is the canonical operand order."""
+    node0, node1, value = args
+    if operandKey(node1) < operandKey(node0):
+        return [node1, node0, mirroredComparisons[value]]
+    return args
+
+
+def floatText(value) -> str:
+    """
+    The constant-pool spelling of a Float modifier: 2, 2.0 and "2" are "2".
+    Integers are only spelled out below 2**53, where floats are exact, and
+    -0.0 keeps its sign. Bools and other text are written as before.
+    """
+    if isinstance(value, bool):
+        return str(value)
+    try:
+        number = float(value)
+    except ValueError:
+        return str(value)
+    negativeZero = number == 0 and math.copysign(1.0, number) < 0
+    if number.is_integer() and abs(number) < 2**53 and not negativeZero:
+        return str(int(number))
+    return repr(number)
+
+
+def cache(function=None, *, canonicalize=None):
+    """
+    Hash-conses node constructors in the memo store of the current graph.
+
+    Calls are keyed on the constructor and its arguments after
+    normalization: inputs (the `node*` parameters) become the nodes they
+    connect from, so literals share one constant node, and `canonicalize`
+    can reorder operands or rewrite modifiers so that equivalent calls share
+    a key. The constructor is called with the normalized arguments.
+    """
+    if function is None:
+        return lambda function: cache(function, canonicalize=canonicalize)
+
+    signature = inspect.signature(function)
+    parameters = list(signature.parameters.values())
+    defaults = [parameter.default for parameter in parameters]
+    inputPositions = [
+        position
+        for position, parameter in enumerate(parameters)
+        if parameter.name.startswith("node")
+    ]
+
+    def normalize(args, kwargs) -> tuple[list, tuple]:
+        """The arguments to call the constructor with and their memo key."""
+        if kwargs:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            args = list(bound.args)
+        else:
+            args = list(args) + defaults[len(args) :]
+            if inspect.Parameter.empty in args:
+                signature.bind(*args[: args.index(inspect.Parameter.empty)])
 
-    wrapper.cacheStore = cachedNodes
+        for position in inputPositions:
+            args[position] = parseOperand(args[position])
+        if canonicalize is not None:
+            args = canonicalize(args)
+        return args, tuple(operandKey(arg) for arg in args)
+
+    def wrapper(*args, **kwargs):
+        disableCache = kwargs.pop("disableCache", False)
+
+        if disableCache:
+            return function(*args, **kwargs)
+
+        args, cacheArgs = normalize(args, kwargs)
+        store = getGraph().memoStore(function.__name__)
+        result = store.get(cacheArgs, missing)
+        if result is missing:
+            result = function(*args)
+            if inputPositions:
+                # new literal operands have their constant nodes now
+                cacheArgs = normalize(args, {})[1]
+            store.put(cacheArgs, result)
+
+        return result
+
+    def find(*args, **kwargs):
+        """The node a call would return if it was built already, else `missing`."""
+        cacheArgs = normalize(args, kwargs)[1]
+        return getGraph().memoStore(function.__name__).peek(cacheArgs, missing)
+
+    wrapper.__name__ = function.__name__
+    wrapper.find = find
+    wrapper.__doc__ = function.__doc__
+    wrapper.__wrapped__ = function
     return wrapper
 
 
@@ -217,7 +355,7 @@ def InitializeSlime(
     )
 
 
-@cache
+@cache(canonicalize=sortOperands)
 def AddVector3(node0: Node, node1: Node):
     baseNode = AddNode("AddVector3")
     inputTypes = ["Vector3", "Vector3"]
@@ -225,7 +363,7 @@ def AddVector3(node0: Node, node1: Node):
     return baseNode
 
 
-@cache
+@cache(canonicalize=sortOperands)
 def AddFloats(node0: Node, node1: Node):
     baseNode = AddNode("AddFloats")
     inputTypes = ["Float", "Float"]
@@ -233,7 +371,7 @@ def AddFloats(node0: Node, node1: Node):
     return baseNode
 
 
-@cache
+@cache(canonicalize=lambda args: [bool(args[0])])
 def Bool(value: bool):
     return AddNode("Bool", "0" if value else "1")
 
@@ -259,24 +397,24 @@ def Vector3(node0: Node, node1: Node, node2: Node):
     return baseNode
 
 
-@cache
+@cache(canonicalize=sortOperands)
 def CompareBool(
     node0: Node,
     node1: Node,
     value: Literal["and", "or", "equal to", "xor", "nor", "nand", "xnor"] = "and",
 ):
-    value = ["and", "or", "equal to", "xor", "nor", "nand", "xnor"].index(value)
+    value = compareBoolModes.index(value)
     baseNode = AddNode("CompareBool", value)
     inputTypes = ["Bool", "Bool"]
     connectInputNodes(baseNode, inputTypes, [node0, node1])
     return baseNode
 
 
-@cache
+@cache(canonicalize=sortComparison)
 def CompareFloats(
     node0: Node, node1: Node, value: Literal["==", "<", ">", "<=", ">="] = "=="
 ):
-    value = ["==", "<", ">", "<=", ">="].index(value)
+    value = compareFloatModes.index(value)
     baseNode = AddNode("CompareFloats", value)
     inputTypes = ["Float", "Float"]
     connectInputNodes(baseNode, inputTypes, [node0, node1])
@@ -335,22 +473,17 @@ def CrossProduct(node0: Node, node1: Node):
     return baseNode
 
 
-debugCounter = 0
-
-
 def Debug(inputData, string: str = None, changePosition=True):
-    global debugCounter
+    graph = getGraph()
 
     if changePosition:
         # magic numbers for position gotten via
         # snappedX = (20 + x) * 64 - 17
         # snappedY = -(4 + y) * 64 - 22
         xPos = 1263 - 64 * 6
-        yPos = -278 - 64 * 4 * debugCounter
+        yPos = -278 - 64 * 4 * graph.debugCounter
         baseNode = AddNode("Debug", position=Position3(xPos, yPos - 55))
-        data["serializableNodes"][-1]["serializablePorts"][0][
-            "serializableRectTransform"
-        ]["scale"] = Position3(0, 0)
+        graph.hiddenPorts.add(graph.nodePortStarts[baseNode.index])
         if string is not None:
             AddNode(
                 "String", string, includePorts=False, position=Position3(xPos, yPos)
@@ -361,7 +494,7 @@ def Debug(inputData, string: str = None, changePosition=True):
         if string is not None:
             AddNode("String", string, includePorts=False)
 
-    debugCounter += 1
+    graph.debugCounter += 1
 
     if isinstance(inputData, tuple):
         inputNode = parseLiteral(inputData[0])
@@ -370,14 +503,9 @@ def Debug(inputData, string: str = None, changePosition=True):
         inputNode = parseLiteral(inputData)
         num = inputNode.outputIndex
 
-    ports = [
-        port["id"]
-        for port in inputNode.data["serializablePorts"]
-        if port["polarity"] != 0
-    ]
-    portName = ports[num - 1]
-    ConnectPorts((portName, "Any1"), inputNode, baseNode)
-    data["serializableConnections"][-1]["line"]["startWidth"] = 0  # invisible line
+    portName = graph.portIds(inputNode.index, 1)[num - 1]
+    connection = ConnectPorts((portName, "Any1"), inputNode, baseNode)
+    graph.hiddenConnections.add(connection)  # invisible line
 
     return baseNode
 
@@ -396,7 +524,7 @@ def DebugDrawDisc(node0: Node, node1: Node, node2: Node, node3: colorNames):
     return baseNode
 
 
-@cache
+@cache(canonicalize=sortOperands)
 def Distance(node0: Node, node1: Node):
     baseNode = AddNode("Distance")
     inputTypes = ["Vector3", "Vector3"]
@@ -412,7 +540,7 @@ def DivideFloats(node0: Node, node1: Node):
     return baseNode
 
 
-@cache
+@cache(canonicalize=sortOperands)
 def DotProduct(node0: Node, node1: Node):
     baseNode = AddNode("DotProduct")
     inputTypes = ["Vector3", "Vector3"]
@@ -420,14 +548,14 @@ def DotProduct(node0: Node, node1: Node):
     return baseNode
 
 
-@cache
-def Float(value: int | float | str):
-    return AddNode("Float", str(value))
+@cache(canonicalize=lambda args: [floatText(args[0])])
+def Float(value: float | str):
+    return AddNode("Float", floatText(value))
 
 
 @cache
 def GetBool(value: Literal["Self Can Jump", "Opponent Can Jump", "Ball Is Self Side"]):
-    value = ["Self Can Jump", "Opponent Can Jump", "Ball Is Self Side"].index(value)
+    value = boolSensors.index(value)
     return AddNode("VolleyballGetBool", value)
 
 
@@ -444,16 +572,7 @@ def GetFloat(
         "Ball touches remaining",
     ],
 ):
-    value = [
-        "Delta time",
-        "Fixed delta time",
-        "Gravity",
-        "Pi",
-        "Simulation duration",
-        "Team score",
-        "Opponent score",
-        "Ball touches remaining",
-    ].index(value)
+    value = floatSensors.index(value)
     return AddNode("VolleyballGetFloat", value)
 
 
@@ -463,13 +582,7 @@ def GetTransform(
         "Self", "Opponent", "Ball", "Self Team Spawn", "Opponent Team Spawn"
     ],
 ):
-    value = [
-        "Self",
-        "Opponent",
-        "Ball",
-        "Self Team Spawn",
-        "Opponent Team Spawn",
-    ].index(value)
+    value = transformSensors.index(value)
     return AddNode("VolleyballGetTransform", value)
 
 
@@ -484,14 +597,7 @@ def GetVector3(
         "Opponent Velocity",
     ],
 ):
-    value = [
-        "Self Position",
-        "Self Velocity",
-        "Ball Position",
-        "Ball Velocity",
-        "Opponent Position",
-        "Opponent Velocity",
-    ].index(value)
+    value = vector3Sensors.index(value)
     return AddNode("SlimeGetVector3", value)
 
 
@@ -511,7 +617,7 @@ def Modulo(node0: Node, node1: Node):
     return baseNode
 
 
-@cache
+@cache(canonicalize=sortOperands)
 def MultiplyFloats(node0: Node, node1: Node):
     baseNode = AddNode("MultiplyFloats")
     inputTypes = ["Float", "Float"]
@@ -557,24 +663,7 @@ def Operation(
         "10^",
     ],
 ):
-    value = [
-        "abs",
-        "round",
-        "floor",
-        "ceil",
-        "sin",
-        "cos",
-        "tan",
-        "asin",
-        "acos",
-        "atan",
-        "sqrt",
-        "sign",
-        "ln",
-        "log10",
-        "e^",
-        "10^",
-    ].index(value)
+    value = operationModes.index(value)
     baseNode = AddNode("Operation", value)
     inputTypes = ["Float"]
     connectInputNodes(baseNode, inputTypes, [node0])
@@ -600,21 +689,7 @@ def RelativePosition(
         "Down",
     ],
 ):
-    value = [
-        "Self",
-        "Self + Forward",
-        "Self + Backward",
-        "Self + Left",
-        "Self + Right",
-        "Self + Up",
-        "Self + Down",
-        "Forward",
-        "Backward",
-        "Left",
-        "Right",
-        "Up",
-        "Down",
-    ].index(value)
+    value = relativePositionModes.index(value)
     baseNode = AddNode("RelativePosition", value)
     inputTypes = ["Transform"]
     connectInputNodes(baseNode, inputTypes, [node0])
@@ -651,11 +726,19 @@ def Vector3Split(node0: Node):
     baseNode = AddNode("Vector3Split")
     inputTypes = ["Vector3"]
     connectInputNodes(baseNode, inputTypes, [node0])
-    return Vector3Components(baseNode, Node(baseNode.data, 2), Node(baseNode.data, 3))
+    return Vector3Components(
+        baseNode,
+        Node(baseNode.graph, baseNode.index, 2),
+        Node(baseNode.graph, baseNode.index, 3),
+    )
 
 
-@cache
-def Stat(value: int | str):
+@cache(
+    canonicalize=lambda args: [args[0] if isinstance(args[0], Node) else str(args[0])]
+)
+def Stat(value: int | str | Node):
+    if isinstance(value, Node):
+        return value
     return AddNode("Stat", str(value))
 
 
@@ -680,6 +763,35 @@ def SubtractVector3(node0: Node, node1: Node):
     return baseNode
 
 
+def addTunable(constructor, value, low, high, name, integer: bool) -> Node:
+    tunables = getGraph().tunables
+    name = f"parameter{len(tunables)}" if name is None else name
+    if name in tunables:
+        raise ValueError(f"there already is a tunable parameter named {name!r}")
+    if not low <= float(value) <= high:
+        raise ValueError(f"{name!r} starts outside of [{low}, {high}]")
+    node = constructor(value, disableCache=True)
+    tunables[name] = {"index": node.index, "low": low, "high": high, "integer": integer}
+    return node
+
+
+def isTunable(node: Node) -> bool:
+    return node.graph.tunable(node.index) is not None
+
+
+def Tunable(value: float, low, high, name: str | None = None) -> Node:
+    """
+    A Float literal that `tuner.tune` may change within [low, high]. Unlike
+    other literals it is never shared with an equal constant.
+    """
+    return addTunable(Float, value, low, high, name, False)
+
+
+def TunableStat(value: int, low=0, high=10, name: str | None = None) -> Node:
+    """A Stat for `InitializeSlime` that `tuner.tune` may change."""
+    return addTunable(Stat, value, low, high, name, True)
+
+
 def connectInputNodes(baseNode, inputTypes, inputs):
     counters = {}
 
@@ -710,3 +822,36 @@ def connectInputNodes(baseNode, inputTypes, inputs):
 
         if inputData is not None:
             ConnectPorts((portName1, portName2), inputNode, baseNode)
+
+
+operators.update(
+    {
+        ("add", float, float): AddFloats,
+        ("add", "Vector3", "Vector3"): AddVector3,
+        ("sub", float, float): SubtractFloats,
+        ("sub", "Vector3", "Vector3"): SubtractVector3,
+        ("mul", float, float): MultiplyFloats,
+        ("mul", "Vector3", float): ScaleVector3,
+        ("mul", float, "Vector3"): lambda node0, node1: ScaleVector3(node1, node0),
+        ("truediv", float, float): DivideFloats,
+        ("floordiv", float, float): lambda node0, node1: Operation(
+            DivideFloats(node0, node1), "floor"
+        ),
+        ("mod", float, float): Modulo,
+        ("neg", float, None): lambda node0, _: MultiplyFloats(node0, -1),
+        ("abs", float, None): lambda node0, _: Operation(node0, "abs"),
+        ("invert", bool, None): lambda node0, _: Not(node0),
+        ("eq", float, float): CompareFloats,
+        ("eq", bool, bool): CompareBool,
+        ("ne", float, float): lambda node0, node1: Not(CompareFloats(node0, node1)),
+        ("ne", bool, bool): lambda node0, node1: Not(CompareBool(node0, node1)),
+        ("lt", float, float): lambda node0, node1: CompareFloats(node0, node1, "<"),
+        ("le", float, float): lambda node0, node1: CompareFloats(node0, node1, "<="),
+        ("gt", float, float): lambda node0, node1: CompareFloats(node0, node1, ">"),
+        ("ge", float, float): lambda node0, node1: CompareFloats(node0, node1, ">="),
+        ("and", bool, bool): lambda node0, node1: CompareBool(node0, node1, "and"),
+        ("or", bool, bool): lambda node0, node1: CompareBool(node0, node1, "or"),
+        ("xor", bool, bool): lambda node0, node1: CompareBool(node0, node1, "xor"),
+        ("matmul", "Vector3", "Vector3"): DotProduct,
+    }
+)
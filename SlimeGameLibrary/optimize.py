@@ -0,0 +1,1495 @@
+import heapq
+import json
+import math
+import time
+from collections import deque
+
+from .customNodes import Power, isReducibleExponent
+from .data import (
+    compareBoolModes,
+    compareFloatModes,
+    floatSensorRanges,
+    floatSensors,
+    operationModes,
+    outputs,
+)
+from .evaluation import (
+    boolModifier,
+    floatModifier,
+    isNumberModifier,
+    modeModifier,
+    pureNodes,
+)
+from .lib import Graph, Node, nodeTypeNames
+from .nodes import (
+    AddFloats,
+    AddVector3,
+    Bool,
+    CompareBool,
+    CompareFloats,
+    DotProduct,
+    Float,
+    MultiplyFloats,
+    Not,
+    SubtractFloats,
+    SubtractVector3,
+    Vector3,
+    mirroredComparisons,
+)
+from .ranges import isInfinite, valueRanges
+
+# pass name -> function(graph) -> dict of counters. "changed" counts the
+# rewrites a pass made, 0 when it left the graph as it was
+passes = {}
+
+
+def optimizationPass(function):
+    passes[function.__name__] = function
+    return function
+
+
+def nodeName(graph: Graph, index: int) -> str:
+    return nodeTypeNames[graph.nodeTypes[index]]
+
+
+def isRepresentable(value) -> bool:
+    """Whether a value can be written back as Float/Bool/Vector3 literals."""
+    if isinstance(value, bool):
+        return True
+    if isinstance(value, tuple):
+        return all(math.isfinite(component) for component in value)
+    return math.isfinite(value)
+
+
+def isConstant(graph: Graph, index: int) -> bool:
+    """
+    Whether a node is a Float or Bool literal whose value the passes may
+    use. Tunable literals are opaque, their value can still change, and so
+    are Float modifiers that are not numbers.
+    """
+    name = nodeName(graph, index)
+    if name not in ("Float", "Bool") or graph.tunable(index) is not None:
+        return False
+    return name == "Bool" or isNumberModifier(graph.nodeModifiers[index])
+
+
+def isLiteral(graph: Graph, index: int) -> bool:
+    if nodeName(graph, index) == "ConstructVector3":
+        return all(
+            node is not None and isConstant(graph, node.index)
+            for node in graph.inputNodes(index)
+        )
+    return isConstant(graph, index)
+
+
+def constantValues(graph: Graph, order: list[int]) -> dict:
+    """
+    The value of every node output that only depends on literals, keyed by
+    (node index, output index).
+    """
+    values = {}
+    for index in order:
+        function = pureNodes.get(nodeName(graph, index))
+        if function is None or graph.tunable(index) is not None:
+            continue
+        inputs = graph.inputNodes(index)
+        if any(
+            node is None or (node.index, node.outputIndex) not in values
+            for node in inputs
+        ):
+            continue
+        try:
+            result = function(
+                graph.nodeModifiers[index],
+                *[values[(node.index, node.outputIndex)] for node in inputs],
+            )
+        except (ArithmeticError, ValueError, IndexError, KeyError):
+            continue
+        if not isRepresentable(result):
+            continue
+        if nodeName(graph, index) == "Vector3Split":
+            for outputIndex, component in enumerate(result, 1):
+                values[(index, outputIndex)] = component
+        else:
+            values[(index, 1)] = result
+    return values
+
+
+def literal(value) -> Node:
+    if isinstance(value, bool):
+        return Bool(value)
+    if isinstance(value, tuple):
+        return Vector3(*value)
+    return Float(value)
+
+
+@optimizationPass
+def foldConstants(graph: Graph) -> dict:
+    """
+    Replaces every expression that only depends on literals with a single
+    Float, Bool or Vector3 literal.
+    """
+    order = graph.topologicalOrder()
+    values = constantValues(graph, order)
+    constantNodes = {index for index, _ in values}
+
+    folded = 0
+    replaced = []
+    with graph:
+        for (index, outputIndex), value in values.items():
+            if isLiteral(graph, index):
+                continue
+            node = Node(graph, index, outputIndex)
+            consumers = graph.consumers(node)
+            # constant consumers get folded themselves
+            if all(
+                graph.portNodes[graph.connectionTargets[connection]] in constantNodes
+                for connection in consumers
+            ):
+                continue
+            graph.replaceUses(node, literal(value))
+            replaced.append(index)
+            folded += 1
+
+    removed = graph.removeDeadNodes(replaced)
+    return {"folded": folded, "removed": removed, "changed": folded}
+
+
+# node name -> rewrite rules, tried in registration order. A rule takes the
+# graph and a node index and returns None, the Node that replaces the node's
+# output, or a tuple of Nodes for nodes with several outputs. Rules must not
+# build any node unless they return a replacement.
+rules = {}
+# the Vector3 forwarding and fusion rules run by fuseVectors
+vectorRules = {}
+
+
+def rule(*nodeNames, registry=None):
+    registry = rules if registry is None else registry
+
+    def register(function):
+        for name in nodeNames:
+            registry.setdefault(name, []).append(function)
+        return function
+
+    return register
+
+
+def literalValue(graph: Graph, node: Node | None):
+    """The value of a Float, Bool or literal Vector3 output, otherwise None."""
+    if node is None or not isLiteral(graph, node.index):
+        return None
+    name = nodeName(graph, node.index)
+    modifier = graph.nodeModifiers[node.index]
+    if name == "Float":
+        return floatModifier(modifier)
+    if name == "Bool":
+        return boolModifier(modifier)
+    if name == "ConstructVector3":
+        return tuple(
+            floatModifier(graph.nodeModifiers[component.index])
+            for component in graph.inputNodes(node.index)
+        )
+    return None
+
+
+def sameOutput(node0: Node | None, node1: Node | None) -> bool:
+    # Node.__eq__ builds a comparison node, so compare the fields
+    return (
+        node0 is not None
+        and node1 is not None
+        and node0.index == node1.index
+        and node0.outputIndex == node1.outputIndex
+    )
+
+
+def isOutputOf(graph: Graph, node: Node | None, name: str) -> bool:
+    return node is not None and nodeName(graph, node.index) == name
+
+
+def otherOperand(graph: Graph, inputs: list, value) -> Node | None:
+    """The other operand when one of two operands is the literal `value`."""
+    node0, node1 = inputs
+    if node0 is None or node1 is None:
+        return None
+    if literalValue(graph, node1) == value:
+        return node0
+    if literalValue(graph, node0) == value:
+        return node1
+    return None
+
+
+def literalOperand(graph: Graph, inputs: list):
+    """(literal value, other operand) when one of two operands is a literal."""
+    node0, node1 = inputs
+    if node0 is None or node1 is None:
+        return None, None
+    value = literalValue(graph, node1)
+    if value is not None:
+        return value, node0
+    value = literalValue(graph, node0)
+    if value is not None:
+        return value, node1
+    return None, None
+
+
+def inputCone(graph: Graph, index: int) -> list[int]:
+    """A node and everything it depends on, every node after its inputs."""
+    order = []
+    seen = set()
+    stack = [(index, False)]
+    while stack:
+        index, expanded = stack.pop()
+        if expanded:
+            order.append(index)
+            continue
+        if index in seen:
+            continue
+        seen.add(index)
+        stack.append((index, True))
+        for node in graph.inputNodes(index):
+            if node is not None:
+                stack.append((node.index, False))
+    return order
+
+
+def isFinite(graph: Graph, node: Node) -> bool:
+    """Whether interval analysis proves a float or Vector3 output finite."""
+    ranges = valueRanges(graph, inputCone(graph, node.index))
+    interval = ranges.get((node.index, node.outputIndex))
+    if interval is None:
+        return False
+    components = interval if isinstance(interval[0], tuple) else (interval,)
+    return all(
+        component is not None and not isInfinite(component) for component in components
+    )
+
+
+@rule("AddFloats")
+def addZero(graph: Graph, index: int):
+    return otherOperand(graph, graph.inputNodes(index), 0.0)
+
+
+@rule("SubtractFloats")
+def subtractZero(graph: Graph, index: int):
+    node0, node1 = graph.inputNodes(index)
+    if node0 is not None and literalValue(graph, node1) == 0.0:
+        return node0
+
+
+@rule("SubtractFloats")
+def subtractSelf(graph: Graph, index: int):
+    """x - x -> 0, unless x may be infinite or nan, where it is nan"""
+    node0, node1 = graph.inputNodes(index)
+    if sameOutput(node0, node1) and isFinite(graph, node0):
+        return Float(0)
+
+
+@rule("MultiplyFloats")
+def multiplyOne(graph: Graph, index: int):
+    return otherOperand(graph, graph.inputNodes(index), 1.0)
+
+
+@rule("MultiplyFloats")
+def multiplyZero(graph: Graph, index: int):
+    """x * 0 -> 0 (up to the sign of the zero), unless x may be infinite or nan"""
+    operand = otherOperand(graph, graph.inputNodes(index), 0.0)
+    if operand is not None and isFinite(graph, operand):
+        return Float(0)
+
+
+@rule("MultiplyFloats")
+def multiplyConstants(graph: Graph, index: int):
+    """(x * a) * b -> x * (a * b), which also turns -(-x) into x * 1"""
+    outer, node = literalOperand(graph, graph.inputNodes(index))
+    if not isOutputOf(graph, node, "MultiplyFloats"):
+        return None
+    inner, operand = literalOperand(graph, graph.inputNodes(node.index))
+    if inner is None or not math.isfinite(inner * outer):
+        return None
+    return MultiplyFloats(operand, inner * outer)
+
+
+@rule("DivideFloats")
+def divideOne(graph: Graph, index: int):
+    node0, node1 = graph.inputNodes(index)
+    if node0 is not None and literalValue(graph, node1) == 1.0:
+        return node0
+
+
+@rule("ScaleVector3")
+def scaleOne(graph: Graph, index: int):
+    node0, node1 = graph.inputNodes(index)
+    if node0 is not None and literalValue(graph, node1) == 1.0:
+        return node0
+
+
+@rule("AddVector3")
+def addZeroVector(graph: Graph, index: int):
+    return otherOperand(graph, graph.inputNodes(index), (0.0, 0.0, 0.0))
+
+
+@rule("SubtractVector3")
+def subtractZeroVector(graph: Graph, index: int):
+    node0, node1 = graph.inputNodes(index)
+    if node0 is not None and literalValue(graph, node1) == (0.0, 0.0, 0.0):
+        return node0
+
+
+@rule("SubtractVector3")
+def subtractSelfVector(graph: Graph, index: int):
+    node0, node1 = graph.inputNodes(index)
+    if sameOutput(node0, node1) and isFinite(graph, node0):
+        return Vector3(0, 0, 0)
+
+
+@rule("Not")
+def doubleNot(graph: Graph, index: int):
+    (node,) = graph.inputNodes(index)
+    if isOutputOf(graph, node, "Not"):
+        return graph.inputNodes(node.index)[0]
+
+
+# mode -> (result with a True operand, result with a False operand), where
+# "x" is the other operand and "not" its negation
+compareBoolIdentities = {
+    "and": ("x", False),
+    "or": (True, "x"),
+    "equal to": ("x", "not"),
+    "xor": ("not", "x"),
+    "nor": (False, "not"),
+    "nand": ("not", True),
+    "xnor": ("x", "not"),
+}
+
+
+@rule("CompareBool")
+def compareBoolLiteral(graph: Graph, index: int):
+    value, node = literalOperand(graph, graph.inputNodes(index))
+    if value is None:
+        return None
+    mode = modeModifier(graph.nodeModifiers[index], compareBoolModes)
+    result = compareBoolIdentities[mode][0 if value else 1]
+    if result == "x":
+        return node
+    if result == "not":
+        return Not(node)
+    return Bool(result)
+
+
+@rule("CompareBool")
+def compareBoolSelf(graph: Graph, index: int):
+    node0, node1 = graph.inputNodes(index)
+    if not sameOutput(node0, node1):
+        return None
+    match modeModifier(graph.nodeModifiers[index], compareBoolModes):
+        case "and" | "or":
+            return node0
+        case "equal to" | "xnor":
+            return Bool(True)
+        case "xor":
+            return Bool(False)
+        case "nor" | "nand":
+            return Not(node0)
+
+
+@rule("ConditionalSetFloatV2", "ConditionalSetVector3")
+def conditionalLiteral(graph: Graph, index: int):
+    condition, node0, node1 = graph.inputNodes(index)
+    value = literalValue(graph, condition)
+    if value is None:
+        return None
+    return node0 if value == boolModifier(graph.nodeModifiers[index]) else node1
+
+
+@rule("ConditionalSetFloatV2", "ConditionalSetVector3")
+def conditionalSame(graph: Graph, index: int):
+    _, node0, node1 = graph.inputNodes(index)
+    if sameOutput(node0, node1):
+        return node0
+
+
+@rule("Vector3Split", registry=vectorRules)
+@rule("Vector3Split")
+def splitConstruct(graph: Graph, index: int):
+    (node,) = graph.inputNodes(index)
+    if not isOutputOf(graph, node, "ConstructVector3"):
+        return None
+    components = graph.inputNodes(node.index)
+    if any(component is None for component in components):
+        return None
+    return tuple(components)
+
+
+@rule("ConstructVector3", registry=vectorRules)
+@rule("ConstructVector3")
+def constructSplit(graph: Graph, index: int):
+    components = graph.inputNodes(index)
+    if not all(isOutputOf(graph, node, "Vector3Split") for node in components):
+        return None
+    split = components[0].index
+    if [node.index for node in components] != [split] * 3:
+        return None
+    if [node.outputIndex for node in components] != [1, 2, 3]:
+        return None
+    return graph.inputNodes(split)[0]
+
+
+@rule("Operation")
+def idempotentOperation(graph: Graph, index: int):
+    """abs(abs(x)) -> abs(x), likewise for round, floor, ceil and sign"""
+    mode = modeModifier(graph.nodeModifiers[index], operationModes)
+    if mode not in ("abs", "round", "floor", "ceil", "sign"):
+        return None
+    (node,) = graph.inputNodes(index)
+    if (
+        isOutputOf(graph, node, "Operation")
+        and graph.nodeModifiers[node.index] == graph.nodeModifiers[index]
+    ):
+        return node
+
+
+@rule("Operation")
+def expLnPower(graph: Graph, index: int):
+    """
+    e^(c*ln(x)) -> x^c as multiplications for the constant exponents that
+    Power reduces, e.g. when the exponent only became constant after folding.
+    Only for non-negative x, the logarithm of anything else is nan
+    """
+    if modeModifier(graph.nodeModifiers[index], operationModes) != "e^":
+        return None
+    (product,) = graph.inputNodes(index)
+    if not isOutputOf(graph, product, "MultiplyFloats"):
+        return None
+    exponent, logarithm = literalOperand(graph, graph.inputNodes(product.index))
+    if (
+        not isinstance(exponent, float)
+        or not isReducibleExponent(exponent)
+        or not isOutputOf(graph, logarithm, "Operation")
+        or modeModifier(graph.nodeModifiers[logarithm.index], operationModes) != "ln"
+    ):
+        return None
+    (base,) = graph.inputNodes(logarithm.index)
+    if not isNonNegative(graph, base):
+        return None
+    return Power(base, exponent)
+
+
+def rewrite(graph: Graph, registry: dict) -> dict:
+    """
+    Applies the rules of a registry until none of them matches anymore.
+    Returns how many nodes each rule removed, and under "changed" how many
+    replacements were made.
+    """
+    report = {"changed": 0}
+    worklist = deque(graph.topologicalOrder())
+    queued = set(worklist)
+
+    def push(index):
+        if index not in queued:
+            queued.add(index)
+            worklist.append(index)
+
+    with graph:
+        while worklist:
+            index = worklist.popleft()
+            queued.discard(index)
+            if graph.nodeRemoved[index] or not graph.nodeUses[index]:
+                continue
+            for function in registry.get(nodeName(graph, index), ()):
+                nodeCount = len(graph.nodeTypes)
+                replacement = function(graph, index)
+                if replacement is None:
+                    continue
+                if isinstance(replacement, Node):
+                    replacement = (replacement,)
+
+                for outputIndex, node in enumerate(replacement, 1):
+                    old = Node(graph, index, outputIndex)
+                    if sameOutput(old, node):
+                        continue
+                    report["changed"] += 1
+                    for connection in graph.consumers(old):
+                        push(graph.portNodes[graph.connectionTargets[connection]])
+                    graph.replaceUses(old, node)
+                    push(node.index)
+                for created in range(nodeCount, len(graph.nodeTypes)):
+                    push(created)
+
+                removed = graph.removeDeadNodes([index])
+                created = len(graph.nodeTypes) - nodeCount
+                name = function.__name__
+                report[name] = report.get(name, 0) + removed - created
+                break
+    return report
+
+
+@optimizationPass
+def simplify(graph: Graph) -> dict:
+    """Applies the peephole rules, returning how many nodes each removed."""
+    return rewrite(graph, rules)
+
+
+# rough per-tick cost of evaluating a node, in float operations; literals
+# are free and anything not listed costs 1
+nodeCosts = {
+    "Float": 0,
+    "Bool": 0,
+    "AddVector3": 3,
+    "SubtractVector3": 3,
+    "ScaleVector3": 3,
+    "ConstructVector3": 1,
+    "Vector3Split": 1,
+    "DotProduct": 5,
+    "CrossProduct": 9,
+    "Magnitude": 6,
+    "Distance": 9,
+    "Normalize": 10,
+}
+
+
+def nodeCost(name: str) -> int:
+    return nodeCosts.get(name, 1)
+
+
+componentOperations = {
+    "AddVector3": "AddFloats",
+    "SubtractVector3": "SubtractFloats",
+    "ScaleVector3": "MultiplyFloats",
+}
+
+
+def constructComponents(graph: Graph, node: Node | None) -> list | None:
+    """The three inputs of a ConstructVector3 output, None for anything else."""
+    if not isOutputOf(graph, node, "ConstructVector3"):
+        return None
+    components = graph.inputNodes(node.index)
+    if any(component is None for component in components):
+        return None
+    return components
+
+
+def vectorOperands(graph: Graph, index: int):
+    """
+    (constructs, component pairs) of a component-wise vector node whose
+    vector operands are all ConstructVector3 nodes, or None
+    """
+    name = nodeName(graph, index)
+    if name not in componentOperations:
+        return None
+    node0, node1 = graph.inputNodes(index)
+    left = constructComponents(graph, node0)
+    if name == "ScaleVector3":
+        constructs = [node0]
+        right = None if node1 is None else [node1] * 3
+    else:
+        constructs = [node0, node1]
+        right = constructComponents(graph, node1)
+    if left is None or right is None:
+        return None
+    return constructs, list(zip(left, right))
+
+
+def componentResult(graph: Graph, name: str, node0: Node, node1: Node):
+    """
+    What one component of a fused vector node simplifies to without building
+    anything: a float for literals, an operand for identities, else None.
+    """
+    value0, value1 = literalValue(graph, node0), literalValue(graph, node1)
+    if value0 is not None and value1 is not None:
+        result = pureNodes[componentOperations[name]]("", value0, value1)
+        return result if math.isfinite(result) else None
+    if name == "AddVector3":
+        if value0 == 0:
+            return node1
+        if value1 == 0:
+            return node0
+    elif name == "SubtractVector3":
+        if value1 == 0:
+            return node0
+        if sameOutput(node0, node1):
+            return 0.0
+    elif value0 == 0 or value1 == 0:
+        return 0.0
+    elif value0 == 1:
+        return node1
+    elif value1 == 1:
+        return node0
+    return None
+
+
+def componentCost(graph: Graph, name: str, node0: Node, node1: Node) -> int:
+    if componentResult(graph, name, node0, node1) is not None:
+        return 0
+    return nodeCost(componentOperations[name])
+
+
+def buildComponent(graph: Graph, name: str, node0: Node, node1: Node) -> Node:
+    result = componentResult(graph, name, node0, node1)
+    if isinstance(result, float):
+        return Float(result)
+    if result is not None:
+        return result
+    constructor = {
+        "AddVector3": AddFloats,
+        "SubtractVector3": SubtractFloats,
+        "ScaleVector3": MultiplyFloats,
+    }[name]
+    return constructor(node0, node1)
+
+
+def freedCost(graph: Graph, index: int, constructs: list) -> int:
+    """Cost of a vector node and of the constructs only it uses."""
+    cost = nodeCost(nodeName(graph, index))
+    seen = set()
+    for construct in constructs:
+        if construct.index not in seen and graph.nodeUses[construct.index] == 1:
+            cost += nodeCost("ConstructVector3")
+        seen.add(construct.index)
+    return cost
+
+
+@rule("AddVector3", "SubtractVector3", "ScaleVector3", registry=vectorRules)
+def fuseComponents(graph: Graph, index: int):
+    """Vector3(a, b, c) + Vector3(d, e, f) -> Vector3(a + d, b + e, c + f)"""
+    operands = vectorOperands(graph, index)
+    if operands is None:
+        return None
+    constructs, pairs = operands
+    name = nodeName(graph, index)
+    cost = nodeCost("ConstructVector3") + sum(
+        componentCost(graph, name, *pair) for pair in pairs
+    )
+    if cost >= freedCost(graph, index, constructs):
+        return None
+    return Vector3(*[buildComponent(graph, name, *pair) for pair in pairs])
+
+
+@rule("Vector3Split", registry=vectorRules)
+def splitComponents(graph: Graph, index: int):
+    """Vector3Split(Vector3(a, b, c) + Vector3(d, e, f)).x -> a + d"""
+    (vector,) = graph.inputNodes(index)
+    if vector is None or graph.nodeUses[vector.index] != 1:
+        return None
+    operands = vectorOperands(graph, vector.index)
+    if operands is None:
+        return None
+    constructs, pairs = operands
+    name = nodeName(graph, vector.index)
+    used = [
+        bool(graph.consumers(Node(graph, index, outputIndex)))
+        for outputIndex in (1, 2, 3)
+    ]
+    cost = sum(
+        componentCost(graph, name, *pair) for pair, isUsed in zip(pairs, used) if isUsed
+    )
+    if cost >= nodeCost("Vector3Split") + freedCost(graph, vector.index, constructs):
+        return None
+    return tuple(
+        (
+            buildComponent(graph, name, *pair)
+            if isUsed
+            else Node(graph, index, outputIndex)
+        )
+        for outputIndex, (pair, isUsed) in enumerate(zip(pairs, used), 1)
+    )
+
+
+@optimizationPass
+def fuseVectors(graph: Graph) -> dict:
+    """
+    Forwards components through Vector3Split/ConstructVector3 pairs and fuses
+    component-wise vector arithmetic on constructed vectors where nodeCosts
+    says it is cheaper. Returns how many nodes each rule removed.
+    """
+    return rewrite(graph, vectorRules)
+
+
+# the boolean minimization rules run by minimizeBooleans
+booleanRules = {}
+
+negatedCompareBoolModes = {
+    "and": "nand",
+    "or": "nor",
+    "equal to": "xor",
+    "xor": "xnor",
+    "nor": "or",
+    "nand": "and",
+    "xnor": "xor",
+}
+
+
+def truthTableOperations(full: int) -> dict:
+    """CompareBool modes as operations on truth tables stored as bitmasks."""
+    return {
+        "and": lambda a, b: a & b,
+        "or": lambda a, b: a | b,
+        "xor": lambda a, b: a ^ b,
+        "xnor": lambda a, b: full ^ (a ^ b),
+        "equal to": lambda a, b: full ^ (a ^ b),
+        "nor": lambda a, b: full ^ (a | b),
+        "nand": lambda a, b: full ^ (a & b),
+    }
+
+
+class BooleanSynthesis:
+    """
+    Smallest Not/CompareBool/Bool trees for every function of `inputs`
+    booleans, found level by level (level n holds the functions that need n
+    nodes) and only as far as someone asked for.
+    """
+
+    # equal to is the same function as xnor
+    modes = ("and", "or", "xor", "xnor", "nor", "nand")
+
+    def __init__(self, inputs: int):
+        self.inputs = inputs
+        self.full = (1 << (1 << inputs)) - 1
+        self.operations = truthTableOperations(self.full)
+        self.variables = [
+            sum(1 << row for row in range(1 << inputs) if row >> variable & 1)
+            for variable in range(inputs)
+        ]
+        # truth table -> (cost, expression)
+        self.best = {}
+        self.levels = [[]]
+        for variable, table in enumerate(self.variables):
+            self.add(table, 0, ("input", variable))
+
+    def add(self, table: int, cost: int, expression: tuple):
+        if table not in self.best:
+            self.best[table] = (cost, expression)
+            self.levels[cost].append(table)
+
+    def extendTo(self, cost: int):
+        while len(self.levels) <= cost and len(self.best) <= self.full:
+            level = len(self.levels)
+            self.levels.append([])
+            if level == 1:
+                self.add(0, 1, ("constant", False))
+                self.add(self.full, 1, ("constant", True))
+            for table in self.levels[level - 1]:
+                self.add(table ^ self.full, level, ("Not", table))
+            # every mode is commutative
+            for cost0 in range((level - 1) // 2 + 1):
+                for table0 in self.levels[cost0]:
+                    for table1 in self.levels[level - 1 - cost0]:
+                        for mode in self.modes:
+                            table = self.operations[mode](table0, table1)
+                            self.add(table, level, (mode, table0, table1))
+
+    def cheapest(self, table: int, maxCost: int) -> tuple | None:
+        """(cost, expression) of the smallest tree up to maxCost nodes."""
+        self.extendTo(maxCost)
+        found = self.best.get(table)
+        if found is None or found[0] > maxCost:
+            return None
+        return found
+
+
+booleanSyntheses = {}
+# how many distinct inputs a boolean cone may have to be minimized exactly,
+# and the largest replacement searched for with that many inputs
+maxConeInputs = 4
+maxSynthesisCost = {0: 8, 1: 8, 2: 8, 3: 8, 4: 6}
+
+
+def booleanSynthesis(inputs: int) -> BooleanSynthesis:
+    if inputs not in booleanSyntheses:
+        booleanSyntheses[inputs] = BooleanSynthesis(inputs)
+    return booleanSyntheses[inputs]
+
+
+def booleanCone(graph: Graph, index: int):
+    """
+    The Not/CompareBool tree rooted at a node: its size and its distinct
+    inputs, following only nodes that nothing else uses. None if the cone
+    has unconnected inputs.
+    """
+    inputs = {}
+    size = 0
+    stack = [index]
+    while stack:
+        current = stack.pop()
+        size += 1
+        for node in graph.inputNodes(current):
+            if node is None:
+                return None
+            if (
+                nodeName(graph, node.index) in ("Not", "CompareBool")
+                and graph.nodeUses[node.index] == 1
+            ):
+                stack.append(node.index)
+            else:
+                inputs.setdefault((node.index, node.outputIndex), node)
+    return size, list(inputs.values())
+
+
+def coneTruthTable(graph: Graph, index: int, tables: dict, full: int) -> int:
+    """Evaluates a cone on truth tables, with `tables` holding its inputs."""
+    operations = truthTableOperations(full)
+
+    def evaluate(node):
+        key = (node.index, node.outputIndex)
+        if key not in tables:
+            inputs = [evaluate(operand) for operand in graph.inputNodes(node.index)]
+            if nodeName(graph, node.index) == "Not":
+                tables[key] = inputs[0] ^ full
+            else:
+                mode = modeModifier(graph.nodeModifiers[node.index], compareBoolModes)
+                tables[key] = operations[mode](*inputs)
+        return tables[key]
+
+    return evaluate(Node(graph, index))
+
+
+def buildExpression(synthesis: BooleanSynthesis, table: int, inputs: list) -> Node:
+    _, expression = synthesis.best[table]
+    match expression:
+        case ("input", variable):
+            return inputs[variable]
+        case ("constant", value):
+            return Bool(value)
+        case ("Not", operand):
+            return Not(buildExpression(synthesis, operand, inputs))
+        case (mode, operand0, operand1):
+            return CompareBool(
+                buildExpression(synthesis, operand0, inputs),
+                buildExpression(synthesis, operand1, inputs),
+                mode,
+            )
+
+
+@rule("Not", "CompareBool", registry=booleanRules)
+def minimizeCone(graph: Graph, index: int):
+    """Rebuilds a small Not/CompareBool tree as the smallest equivalent one."""
+    cone = booleanCone(graph, index)
+    if cone is None:
+        return None
+    size, inputs = cone
+    # Bool literals are constants rather than inputs of the function
+    variables = [node for node in inputs if literalValue(graph, node) is None]
+    if len(variables) > maxConeInputs:
+        return None
+    synthesis = booleanSynthesis(len(variables))
+    tables = {
+        (node.index, node.outputIndex): synthesis.full * literalValue(graph, node)
+        for node in inputs
+        if literalValue(graph, node) is not None
+    }
+    for node, table in zip(variables, synthesis.variables):
+        tables[(node.index, node.outputIndex)] = table
+    table = coneTruthTable(graph, index, tables, synthesis.full)
+    found = synthesis.cheapest(table, min(size - 1, maxSynthesisCost[len(variables)]))
+    if found is None:
+        return None
+    return buildExpression(synthesis, table, variables)
+
+
+@rule("Not", registry=booleanRules)
+def negateCompareBool(graph: Graph, index: int):
+    """Not(CompareBool(a, b, and)) -> CompareBool(a, b, nand), and so on"""
+    (node,) = graph.inputNodes(index)
+    if not isOutputOf(graph, node, "CompareBool") or graph.nodeUses[node.index] != 1:
+        return None
+    mode = modeModifier(graph.nodeModifiers[node.index], compareBoolModes)
+    return CompareBool(*graph.inputNodes(node.index), negatedCompareBoolModes[mode])
+
+
+# mode -> mode with both operands negated
+deMorganModes = {
+    "and": "nor",
+    "or": "nand",
+    "equal to": "equal to",
+    "xor": "xor",
+    "nor": "and",
+    "nand": "or",
+    "xnor": "xnor",
+}
+
+
+@rule("CompareBool", registry=booleanRules)
+def absorbNegations(graph: Graph, index: int):
+    """
+    CompareBool(Not(a), Not(b), and) -> CompareBool(a, b, nor) and likewise,
+    and xor with one negated operand -> xnor
+    """
+    inputs = graph.inputNodes(index)
+    negated = [
+        isOutputOf(graph, node, "Not") and graph.nodeUses[node.index] == 1
+        for node in inputs
+    ]
+    if not any(negated):
+        return None
+    operands = [
+        graph.inputNodes(node.index)[0] if isNegated else node
+        for node, isNegated in zip(inputs, negated)
+    ]
+    if any(operand is None for operand in operands):
+        return None
+    mode = modeModifier(graph.nodeModifiers[index], compareBoolModes)
+    if all(negated):
+        return CompareBool(*operands, deMorganModes[mode])
+    if mode in ("xor", "xnor", "equal to"):
+        return CompareBool(*operands, negatedCompareBoolModes[mode])
+    return None
+
+
+def booleanNodeCount(graph: Graph) -> int:
+    return sum(
+        1
+        for index in graph.liveNodes()
+        if nodeName(graph, index) in ("Not", "CompareBool", "Bool")
+    )
+
+
+@optimizationPass
+def minimizeBooleans(graph: Graph) -> dict:
+    """
+    Replaces Not/CompareBool trees with the smallest equivalent tree: exactly
+    for trees with up to maxConeInputs inputs, by absorbing negations into
+    nand/nor/xnor otherwise. Every rewrite removes more nodes than it adds.
+    """
+    before = booleanNodeCount(graph)
+    report = rewrite(graph, booleanRules)
+    report["booleanNodes"] = (before, booleanNodeCount(graph))
+    return report
+
+
+nonNegativeSensors = {
+    floatSensors.index(name)
+    for name, (lowest, _) in floatSensorRanges.items()
+    if lowest >= 0
+}
+
+
+def isNonNegative(graph: Graph, node: Node | None) -> bool:
+    """Whether a float output can never be negative (nan is allowed)."""
+    if node is None:
+        return False
+    name = nodeName(graph, node.index)
+    inputs = graph.inputNodes(node.index)
+    match name:
+        case "Float":
+            parameter = graph.tunable(node.index)
+            if parameter is not None:
+                return parameter["low"] >= 0
+            value = literalValue(graph, node)
+            return value is not None and value >= 0
+        case "Distance" | "Magnitude":
+            return True
+        case "Operation":
+            mode = modeModifier(graph.nodeModifiers[node.index], operationModes)
+            return mode in ("abs", "sqrt", "e^", "10^")
+        case "VolleyballGetFloat":
+            return int(graph.nodeModifiers[node.index]) in nonNegativeSensors
+        case "MultiplyFloats" | "DotProduct" if sameOutput(*inputs):
+            return True
+        case "AddFloats" | "MultiplyFloats" | "DivideFloats":
+            return all(isNonNegative(graph, operand) for operand in inputs)
+        case "ClampFloat":
+            return isNonNegative(graph, inputs[1])
+    return False
+
+
+def squaredOperand(graph: Graph, node: Node | None) -> Node | None:
+    """
+    For Distance(a, b), Magnitude(v) and Sqrt(x), the node whose square root
+    they take, built as DotProduct for vectors. None for anything else.
+    """
+    if node is None:
+        return None
+    inputs = graph.inputNodes(node.index)
+    if any(operand is None for operand in inputs):
+        return None
+    match nodeName(graph, node.index):
+        case "Distance":
+            difference = SubtractVector3(*inputs)
+            return DotProduct(difference, difference)
+        case "Magnitude":
+            return DotProduct(inputs[0], inputs[0])
+        case "Operation":
+            mode = modeModifier(graph.nodeModifiers[node.index], operationModes)
+            if mode == "sqrt":
+                return inputs[0]
+    return None
+
+
+def squareRootComparison(graph: Graph, index: int):
+    """(root, bound, mode) with the square root on the left, or None."""
+    node0, node1 = graph.inputNodes(index)
+    mode = modeModifier(graph.nodeModifiers[index], compareFloatModes)
+    for root, bound, rootMode in (
+        (node0, node1, mode),
+        (node1, node0, mirroredComparisons[mode]),
+    ):
+        if root is None or bound is None:
+            continue
+        if nodeName(graph, root.index) not in ("Distance", "Magnitude", "Operation"):
+            continue
+        # a shared square root has to be computed anyway
+        if graph.nodeUses[root.index] != 1:
+            continue
+        if nodeName(graph, root.index) == "Operation":
+            rootModifier = graph.nodeModifiers[root.index]
+            if modeModifier(rootModifier, operationModes) != "sqrt":
+                continue
+            # sqrt(x) < c is false for negative x, x < c*c is not
+            if rootMode in ("<", "<="):
+                continue
+        if isNonNegative(graph, bound):
+            return root, bound, rootMode
+    return None
+
+
+@optimizationPass
+def removeSquareRoots(graph: Graph) -> dict:
+    """
+    Rewrites Distance(a, b) < r, Magnitude(v) > c and Sqrt(x) >= c against
+    non-negative bounds into comparisons of the squares, so the square root
+    is not computed. Returns how many square roots were removed.
+    """
+    removed = 0
+    rewritten = 0
+    with graph:
+        for index in graph.topologicalOrder():
+            if graph.nodeRemoved[index] or nodeName(graph, index) != "CompareFloats":
+                continue
+            match = squareRootComparison(graph, index)
+            if match is None:
+                continue
+            root, bound, mode = match
+
+            value = literalValue(graph, bound)
+            if value is not None:
+                if not math.isfinite(value * value):
+                    continue
+                squaredBound = Float(value * value)
+            else:
+                squaredBound = MultiplyFloats(bound, bound)
+            comparison = CompareFloats(squaredOperand(graph, root), squaredBound, mode)
+
+            graph.replaceUses(Node(graph, index), comparison)
+            graph.removeDeadNodes([index])
+            rewritten += 1
+            if graph.nodeRemoved[root.index]:
+                removed += 1
+    return {"removed": removed, "changed": rewritten}
+
+
+@optimizationPass
+def narrowRanges(graph: Graph) -> dict:
+    """
+    Uses the value ranges from interval analysis to replace comparisons with
+    a known result by Bool literals, ConditionalSet nodes with a known
+    condition by the chosen input and ClampFloat nodes that cannot change
+    their value by that value.
+    """
+    ranges = valueRanges(graph, graph.topologicalOrder())
+    counts = {"comparisons": 0, "conditionals": 0, "clamps": 0}
+    replaced = []
+    with graph:
+        for (index, outputIndex), interval in list(ranges.items()):
+            if outputIndex != 1 or graph.nodeRemoved[index]:
+                continue
+            if not graph.nodeUses[index]:
+                continue
+            name = nodeName(graph, index)
+            inputs = graph.inputNodes(index)
+            inputRanges = [
+                None if node is None else ranges[(node.index, node.outputIndex)]
+                for node in inputs
+            ]
+            replacement = None
+            if name in ("CompareFloats", "CompareBool", "Not"):
+                if interval[0] == interval[1]:
+                    replacement = Bool(interval[0])
+                    counts["comparisons"] += 1
+            elif name in ("ConditionalSetFloatV2", "ConditionalSetVector3"):
+                condition = inputRanges[0]
+                if condition is not None and condition[0] == condition[1]:
+                    expected = boolModifier(graph.nodeModifiers[index])
+                    replacement = inputs[1] if condition[0] == expected else inputs[2]
+                    counts["conditionals"] += 1
+            elif name == "ClampFloat" and None not in inputRanges:
+                value, low, high = inputRanges
+                if value[0] >= low[1] and value[1] <= high[0]:
+                    replacement = inputs[0]
+                elif value[1] < low[0]:
+                    replacement = inputs[1]
+                elif value[0] >= low[1] and value[0] > high[1]:
+                    replacement = inputs[2]
+                if replacement is not None:
+                    counts["clamps"] += 1
+            if replacement is None:
+                continue
+            # new literals are not in the analysis yet
+            ranges.setdefault((replacement.index, replacement.outputIndex), interval)
+            graph.replaceUses(Node(graph, index), replacement)
+            replaced.append(index)
+
+    counts["removed"] = graph.removeDeadNodes(replaced)
+    counts["changed"] = len(replaced)
+    return counts
+
+
+def nodeDepths(graph: Graph, order: list[int]) -> dict:
+    """The longest path from a node without inputs to each node, in nodes."""
+    depths = {}
+    for index in order:
+        depths[index] = 1 + max(
+            (depths[node.index] for node in graph.inputNodes(index) if node),
+            default=0,
+        )
+    return depths
+
+
+def criticalPath(graph: Graph) -> int:
+    return max(nodeDepths(graph, graph.topologicalOrder()).values(), default=0)
+
+
+def chainKind(graph: Graph, index: int):
+    """(name, and/or mode) of nodes whose operands can be regrouped, else None."""
+    name = nodeName(graph, index)
+    if name in ("AddFloats", "MultiplyFloats", "AddVector3"):
+        return name, None
+    if name == "CompareBool":
+        mode = modeModifier(graph.nodeModifiers[index], compareBoolModes)
+        if mode in ("and", "or"):
+            return name, mode
+    return None
+
+
+def isChainRoot(graph: Graph, index: int, kind) -> bool:
+    """Whether a chain node is not just the single operand of a bigger chain."""
+    if graph.nodeUses[index] != 1:
+        return True
+    (connection,) = graph.consumers(Node(graph, index))
+    target = graph.portNodes[graph.connectionTargets[connection]]
+    return chainKind(graph, target) != kind
+
+
+def chainOperands(graph: Graph, index: int, kind) -> list:
+    """
+    The operands of a chain, looking through operands of the same kind that
+    are used only by the chain.
+    """
+    operands = []
+    stack = graph.inputNodes(index)[::-1]
+    while stack:
+        node = stack.pop()
+        if (
+            node is not None
+            and graph.nodeUses[node.index] == 1
+            and chainKind(graph, node.index) == kind
+        ):
+            stack.extend(graph.inputNodes(node.index)[::-1])
+        else:
+            operands.append(node)
+    return operands
+
+
+chainConstructors = {
+    "AddFloats": AddFloats,
+    "MultiplyFloats": MultiplyFloats,
+    "AddVector3": AddVector3,
+}
+
+
+def combineOperands(kind, node0: Node, node1: Node) -> Node:
+    name, mode = kind
+    if name == "CompareBool":
+        return CompareBool(node0, node1, mode)
+    return chainConstructors[name](node0, node1)
+
+
+def balance(items: list, combine) -> tuple:
+    """
+    Combines the two shallowest (depth, node) items until one is left, which
+    gives the smallest possible depth. Returns that (depth, node).
+    """
+    heap = [(depth, order, node) for order, (depth, node) in enumerate(items)]
+    heapq.heapify(heap)
+    order = len(heap)
+    while len(heap) > 1:
+        _, _, node0 = heapq.heappop(heap)
+        depth1, _, node1 = heapq.heappop(heap)
+        heapq.heappush(heap, (depth1 + 1, order, combine(node0, node1)))
+        order += 1
+    depth, _, node = heap[0]
+    return depth, node
+
+
+@optimizationPass
+def balanceChains(graph: Graph) -> dict:
+    """
+    Rebuilds left-deep chains of AddFloats, MultiplyFloats, AddVector3 and
+    and/or CompareBool nodes as balanced trees, so their depth grows with
+    the logarithm of their length. Float sums and products may round
+    differently afterwards. Reports the critical path depth before and after.
+    """
+    order = graph.topologicalOrder()
+    depths = nodeDepths(graph, order)
+    before = max(depths.values(), default=0)
+    balanced = 0
+    replaced = []
+    with graph:
+        for index in order:
+            if graph.nodeRemoved[index]:
+                continue
+            # inputs may have been balanced already
+            depths[index] = 1 + max(
+                (depths[node.index] for node in graph.inputNodes(index) if node),
+                default=0,
+            )
+            kind = chainKind(graph, index)
+            if kind is None or not isChainRoot(graph, index, kind):
+                continue
+            operands = chainOperands(graph, index, kind)
+            if len(operands) < 3 or any(node is None for node in operands):
+                continue
+            items = [(depths[node.index], node) for node in operands]
+            depth, _ = balance(items, lambda node0, node1: None)
+            if depth >= depths[index]:
+                continue
+
+            def combine(node0: Node, node1: Node, kind=kind) -> Node:
+                node = combineOperands(kind, node0, node1)
+                depths[node.index] = 1 + max(depths[node0.index], depths[node1.index])
+                return node
+
+            _, root = balance(items, combine)
+            graph.replaceUses(Node(graph, index), root)
+            replaced.append(index)
+            balanced += 1
+
+    removed = graph.removeDeadNodes(replaced)
+    return {
+        "balanced": balanced,
+        "removed": removed,
+        "depth": (before, criticalPath(graph)),
+        "changed": balanced,
+    }
+
+
+@optimizationPass
+def pruneUnreachable(graph: Graph) -> dict:
+    """Graph.removeUnreachableNodes as a pass."""
+    before = len(graph.liveNodes())
+    graph.removeUnreachableNodes()
+    removed = before - len(graph.liveNodes())
+    return {"removed": removed, "changed": removed}
+
+
+# nodes that give a different value every time they are evaluated
+impureNodes = {"RandomFloat"}
+
+
+def isMergeable(nodeName: str) -> bool:
+    """Pure nodes with outputs. Sinks and String comments are always kept."""
+    return outputs.get(nodeName) not in (None, str) and nodeName not in impureNodes
+
+
+def eliminateCommonSubexpressions(save: dict) -> dict:
+    """
+    Merges equivalent nodes of a save-file dict in place. Nodes are numbered
+    in topological order by (type, modifier, input numbers), every node
+    whose number was already taken is removed and its outputs are rewired to
+    the first node with that number. Works on saves from any source, so
+    duplicates that were built by hand or merged from other saves are found.
+    """
+    nodes = save["serializableNodes"]
+    connections = save["serializableConnections"]
+    # port sID -> (node position, port dict)
+    ports = {}
+    for position, node in enumerate(nodes):
+        for port in node["serializablePorts"]:
+            ports[port["sID"]] = (position, port)
+
+    # node position -> {input port id: (source position, source port id)}
+    inputs = [{} for _ in nodes]
+    consumers = [[] for _ in nodes]
+    inDegree = [0] * len(nodes)
+    for connection in connections:
+        port0 = ports.get(connection["port0SID"])
+        port1 = ports.get(connection["port1SID"])
+        if port0 is None or port1 is None:
+            continue
+        if port0[1]["polarity"] == 0:
+            port0, port1 = port1, port0
+        (source, sourcePort), (target, targetPort) = port0, port1
+        inputs[target][targetPort["id"]] = (source, sourcePort["id"])
+        consumers[source].append(target)
+        inDegree[target] += 1
+
+    # nodes on cycles never get a number and are kept
+    numbers = {}
+    representatives = list(range(len(nodes)))
+    queue = deque(position for position in range(len(nodes)) if not inDegree[position])
+    while queue:
+        position = queue.popleft()
+        node = nodes[position]
+        if isMergeable(node["id"]):
+            key = (
+                node["id"],
+                repr(node["modifier"]),
+                tuple(
+                    (port["id"], *inputs[position].get(port["id"], (None, None)))
+                    for port in node["serializablePorts"]
+                    if port["polarity"] == 0
+                ),
+            )
+            # sources are numbered already, so their key uses representatives
+            representatives[position] = numbers.setdefault(key, position)
+        for target in consumers[position]:
+            inDegree[target] -= 1
+            if not inDegree[target]:
+                queue.append(target)
+        # consumers see the representative as their source
+        if representatives[position] != position:
+            for target in consumers[position]:
+                for portId, (source, sourcePort) in inputs[target].items():
+                    if source == position:
+                        inputs[target][portId] = (representatives[position], sourcePort)
+
+    # duplicate output port sID -> the matching port of its representative
+    replacements = {}
+    for position, representative in enumerate(representatives):
+        if representative == position:
+            continue
+        outputPorts = {
+            port["id"]: port
+            for port in nodes[representative]["serializablePorts"]
+            if port["polarity"] == 1
+        }
+        for port in nodes[position]["serializablePorts"]:
+            if port["polarity"] == 1:
+                replacements[port["sID"]] = outputPorts[port["id"]]
+
+    kept = []
+    for connection in connections:
+        for side in ("0", "1"):
+            port = ports.get(connection[f"port{side}SID"])
+            if port is None:
+                continue
+            position, portData = port
+            if representatives[position] == position:
+                continue
+            if portData["polarity"] == 0:
+                # inputs of a removed duplicate
+                break
+            replacement = replacements[portData["sID"]]
+            connection[f"port{side}SID"] = replacement["sID"]
+            connection[f"port{side}InstanceID"] = replacement["nodeInstanceID"]
+        else:
+            kept.append(connection)
+
+    save["serializableNodes"] = [
+        node
+        for position, node in enumerate(nodes)
+        if representatives[position] == position
+    ]
+    save["serializableConnections"] = kept
+    return {
+        "merged": len(nodes) - len(save["serializableNodes"]),
+        "nodes": (len(nodes), len(save["serializableNodes"])),
+        "connections": (len(connections), len(kept)),
+    }
+
+
+def mergeDuplicateNodes(filePath, outputPath=None) -> dict:
+    """
+    eliminateCommonSubexpressions on a save file, written back to
+    `outputPath`, or to the same file without one.
+    """
+    with open(filePath) as f:
+        save = json.load(f)
+    report = eliminateCommonSubexpressions(save)
+    with open(outputPath or filePath, "w") as f:
+        f.write(json.dumps(save, separators=(",", ":")))
+    return report
+
+
+class PassManager:
+    """
+    Runs registered passes in stages. The passes of a stage are repeated
+    until none of them reports a change in a round, or maxRounds is
+    reached. Every pass run is recorded with its time and node counts.
+    """
+
+    def __init__(self, stages: list[list[str]], maxRounds: int = 10):
+        for stage in stages:
+            for name in stage:
+                if name not in passes:
+                    raise ValueError(f"unknown optimization pass {name!r}")
+        self.stages = stages
+        self.maxRounds = maxRounds
+
+    def run(self, graph: Graph) -> dict:
+        start = time.perf_counter()
+        nodesBefore = len(graph.liveNodes())
+        runs = []
+        for stageIndex, stage in enumerate(self.stages):
+            for iteration in range(self.maxRounds):
+                changed = False
+                for name in stage:
+                    nodes = len(graph.liveNodes())
+                    passStart = time.perf_counter()
+                    result = passes[name](graph)
+                    seconds = time.perf_counter() - passStart
+                    runs.append(
+                        {
+                            "pass": name,
+                            "stage": stageIndex,
+                            "round": iteration,
+                            "seconds": seconds,
+                            "nodesBefore": nodes,
+                            "nodesAfter": len(graph.liveNodes()),
+                            "result": result,
+                        }
+                    )
+                    if result["changed"]:
+                        changed = True
+                if not changed:
+                    break
+        return {
+            "nodesBefore": nodesBefore,
+            "nodesAfter": len(graph.liveNodes()),
+            "seconds": time.perf_counter() - start,
+            "runs": runs,
+        }
+
+
+# SaveData(optimize=level) pipelines, from cheap to thorough
+optimizationLevels = {
+    0: [],
+    1: [["foldConstants", "simplify"]],
+    2: [
+        [
+            "foldConstants",
+            "simplify",
+            "narrowRanges",
+            "fuseVectors",
+            "removeSquareRoots",
+        ]
+    ],
+    3: [
+        [
+            "foldConstants",
+            "simplify",
+            "narrowRanges",
+            "fuseVectors",
+            "removeSquareRoots",
+            "minimizeBooleans",
+            "balanceChains",
+        ],
+        ["pruneUnreachable"],
+    ],
+}
+
+
+def optimizeGraph(graph: Graph, level: int = 2) -> dict:
+    """Runs the pipeline of an optimization level, returning its report."""
+    if level not in optimizationLevels:
+        raise ValueError(f"unknown optimization level {level!r}")
+    return PassManager(optimizationLevels[level]).run(graph)
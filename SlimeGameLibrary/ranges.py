@@ -0,0 +1,412 @@
+"""
+Interval analysis over a graph. Every float output gets a (lowest, highest)
+interval, every bool output a (False, True) style interval and every Vector3
+output a tuple of three intervals. None means nothing is known, including
+whether the value is nan. Infinite bounds mean the value may be infinite,
+which is where 32-bit float results beyond floatMax end up.
+"""
+
+import math
+
+from .data import (
+    compareBoolModes,
+    compareFloatModes,
+    floatSensorRanges,
+    floatSensors,
+    operationModes,
+)
+from .evaluation import (
+    boolModifier,
+    compareBools,
+    floatModifier,
+    isNumberModifier,
+    modeModifier,
+)
+from .lib import Graph, nodeTypeNames
+
+anyBool = (False, True)
+floatMax = 3.4028234663852886e38
+# any finite value, e.g. a position
+finite = (-floatMax, floatMax)
+# the game computes with 32-bit floats, so inexact results are widened by
+# this much relative to the numbers involved
+slack = 1e-6
+
+
+def checked(interval):
+    if interval is None or math.isnan(interval[0]) or math.isnan(interval[1]):
+        return None
+    low, high = interval
+    return (
+        -math.inf if low < -floatMax else low,
+        math.inf if high > floatMax else high,
+    )
+
+
+def sensorRange(interval):
+    """Sensors are never infinite, even when they are unbounded."""
+    return (max(interval[0], -floatMax), min(interval[1], floatMax))
+
+
+def inexact(interval, *operands):
+    """Widens the result of a rounded operation outwards."""
+    if interval is None:
+        return None
+    scale = max(
+        (
+            abs(bound)
+            for operand in operands
+            for bound in operand
+            if math.isfinite(bound)
+        ),
+        default=0.0,
+    )
+    low, high = interval
+    if math.isfinite(low):
+        low -= slack * (abs(low) + scale)
+    if math.isfinite(high):
+        high += slack * (abs(high) + scale)
+    return checked((low, high))
+
+
+def hull(*intervals):
+    if any(interval is None for interval in intervals):
+        return None
+    return (
+        min(interval[0] for interval in intervals),
+        max(interval[1] for interval in intervals),
+    )
+
+
+def contains(interval, value) -> bool:
+    return interval[0] <= value <= interval[1]
+
+
+def isInfinite(interval) -> bool:
+    return math.isinf(interval[0]) or math.isinf(interval[1])
+
+
+def add(a, b):
+    if a is None or b is None:
+        return None
+    # inf + -inf is nan
+    if (a[1] == math.inf and b[0] == -math.inf) or (
+        a[0] == -math.inf and b[1] == math.inf
+    ):
+        return None
+    return inexact((a[0] + b[0], a[1] + b[1]), a, b)
+
+
+def negate(a):
+    return None if a is None else (-a[1], -a[0])
+
+
+def subtract(a, b):
+    return add(a, negate(b))
+
+
+def multiply(a, b):
+    if a is None or b is None:
+        return None
+    # 0 * inf is nan
+    if (contains(a, 0) and isInfinite(b)) or (contains(b, 0) and isInfinite(a)):
+        return None
+    products = [a[0] * b[0], a[0] * b[1], a[1] * b[0], a[1] * b[1]]
+    return inexact((min(products), max(products)), a, b)
+
+
+def divide(a, b):
+    if a is None or b is None or contains(b, 0):
+        return None
+    # inf / inf is nan
+    if isInfinite(a) and isInfinite(b):
+        return None
+    quotients = [a[0] / b[0], a[0] / b[1], a[1] / b[0], a[1] / b[1]]
+    return inexact((min(quotients), max(quotients)), a, b)
+
+
+def modulo(a, b):
+    if a is None or b is None or contains(b, 0) or isInfinite(a):
+        return None
+    limit = min(max(abs(b[0]), abs(b[1])), max(abs(a[0]), abs(a[1])))
+    if a[0] >= 0:
+        return (0.0, limit)
+    if a[1] <= 0:
+        return (-limit, 0.0)
+    return (-limit, limit)
+
+
+def monotonic(function, interval, increasing=True):
+    if interval is None:
+        return None
+    low, high = function(interval[0]), function(interval[1])
+    return checked((low, high) if increasing else (high, low))
+
+
+def absolute(a):
+    if a is None:
+        return None
+    if a[0] >= 0:
+        return a
+    if a[1] <= 0:
+        return negate(a)
+    return (0.0, max(-a[0], a[1]))
+
+
+def exponential(base):
+    def function(x):
+        try:
+            return base**x
+        except OverflowError:
+            return math.inf
+
+    return function
+
+
+def logarithm(function):
+    def wrapper(x):
+        return -math.inf if x == 0 else function(x)
+
+    return wrapper
+
+
+def operation(mode: str, a):
+    if a is None:
+        return None
+    match mode:
+        case "abs":
+            return absolute(a)
+        case "round" | "floor" | "ceil":
+            function = {"round": round, "floor": math.floor, "ceil": math.ceil}[mode]
+            return monotonic(lambda x: float(function(x)) if math.isfinite(x) else x, a)
+        case "sin" | "cos":
+            return None if isInfinite(a) else (-1.0, 1.0)
+        case "asin" | "acos":
+            if a[0] < -1 or a[1] > 1:
+                return None
+            function = math.asin if mode == "asin" else math.acos
+            return inexact(monotonic(function, a, mode == "asin"), a)
+        case "atan":
+            return inexact(monotonic(math.atan, a), a)
+        case "sqrt":
+            if a[0] < 0:
+                return None
+            return clipLow(inexact(monotonic(math.sqrt, a), a))
+        case "sign":
+            if a[0] >= 0:
+                return (1.0, 1.0)
+            if a[1] < 0:
+                return (-1.0, -1.0)
+            return (-1.0, 1.0)
+        case "ln" | "log10":
+            if a[0] < 0:
+                return None
+            function = logarithm(math.log if mode == "ln" else math.log10)
+            return inexact(monotonic(function, a), a)
+        case "e^" | "10^":
+            function = exponential(math.e if mode == "e^" else 10.0)
+            return clipLow(inexact(monotonic(function, a), a))
+    return None
+
+
+def clipLow(interval, low=0.0):
+    """Undoes widening below a bound that holds exactly."""
+    if interval is None:
+        return None
+    return (max(interval[0], low), interval[1])
+
+
+def clamp(value, low, high):
+    """ClampFloat returns low if value < low, else high if value > high."""
+    if value is None or low is None or high is None:
+        return None
+    candidates = []
+    if value[0] < low[1]:
+        candidates.append(low)
+    if value[1] > high[0]:
+        candidates.append(high)
+    inside = (max(value[0], low[0]), min(value[1], high[1]))
+    if inside[0] <= inside[1]:
+        candidates.append(inside)
+    return hull(*candidates) if candidates else None
+
+
+def compareFloats(mode: str, a, b):
+    if a is None or b is None:
+        return anyBool
+    match mode:
+        case "<":
+            if a[1] < b[0]:
+                return (True, True)
+            if a[0] >= b[1]:
+                return (False, False)
+        case ">":
+            return compareFloats("<", b, a)
+        case "<=":
+            if a[1] <= b[0]:
+                return (True, True)
+            if a[0] > b[1]:
+                return (False, False)
+        case ">=":
+            return compareFloats("<=", b, a)
+        case "==":
+            if a[0] == a[1] == b[0] == b[1]:
+                return (True, True)
+            if a[1] < b[0] or b[1] < a[0]:
+                return (False, False)
+    return anyBool
+
+
+def compareBool(mode: str, a, b):
+    results = {compareBools[mode](x, y) for x in set(a) for y in set(b)}
+    return (min(results), max(results))
+
+
+def magnitude(vector):
+    if vector is None or any(component is None for component in vector):
+        return None
+    # x * x is inf where x ** 2 raises OverflowError
+    squares = [(low * low, high * high) for low, high in vector]
+    highest = sum(max(square) for square in squares)
+    lowest = sum(
+        0.0 if contains(component, 0) else min(square)
+        for component, square in zip(vector, squares)
+    )
+    return clipLow(inexact((math.sqrt(lowest), math.sqrt(highest)), *vector))
+
+
+def componentWise(function, a, b):
+    if a is None or b is None:
+        return None
+    components = tuple(function(x, y) for x, y in zip(a, b))
+    return None if any(component is None for component in components) else components
+
+
+def dot(a, b):
+    if a is None or b is None:
+        return None
+    products = [multiply(x, y) for x, y in zip(a, b)]
+    return add(add(products[0], products[1]), products[2])
+
+
+def cross(a, b):
+    if a is None or b is None:
+        return None
+    components = (
+        subtract(multiply(a[1], b[2]), multiply(a[2], b[1])),
+        subtract(multiply(a[2], b[0]), multiply(a[0], b[2])),
+        subtract(multiply(a[0], b[1]), multiply(a[1], b[0])),
+    )
+    return None if any(component is None for component in components) else components
+
+
+def normalize(vector):
+    if vector is None or any(
+        component is None or isInfinite(component) for component in vector
+    ):
+        return None
+    return ((-1.0, 1.0),) * 3
+
+
+def nodeRange(graph: Graph, index: int, inputs: list):
+    """
+    The range of a node's outputs from the ranges of its inputs. Vector3Split
+    returns its three output ranges as a tuple.
+    """
+    name = nodeTypeNames[graph.nodeTypes[index]]
+    modifier = graph.nodeModifiers[index]
+    match name:
+        case "Float":
+            # a tunable literal can take any value of its parameter's range
+            parameter = graph.tunable(index)
+            if parameter is not None:
+                return (float(parameter["low"]), float(parameter["high"]))
+            if not isNumberModifier(modifier):
+                return None
+            value = floatModifier(modifier)
+            return checked((value, value))
+        case "Bool":
+            value = boolModifier(modifier)
+            return (value, value)
+        case "VolleyballGetFloat":
+            return sensorRange(floatSensorRanges[modeModifier(modifier, floatSensors)])
+        case "VolleyballGetBool":
+            return anyBool
+        case "SlimeGetVector3" | "RelativePosition":
+            return (finite,) * 3
+        case "AddFloats":
+            return add(*inputs)
+        case "SubtractFloats":
+            return subtract(*inputs)
+        case "MultiplyFloats":
+            return multiply(*inputs)
+        case "DivideFloats":
+            return divide(*inputs)
+        case "Modulo":
+            return modulo(*inputs)
+        case "Operation":
+            return operation(modeModifier(modifier, operationModes), inputs[0])
+        case "ClampFloat":
+            return clamp(*inputs)
+        case "RandomFloat":
+            return hull(*inputs)
+        case "CompareFloats":
+            return compareFloats(modeModifier(modifier, compareFloatModes), *inputs)
+        case "CompareBool":
+            if inputs[0] is None or inputs[1] is None:
+                return anyBool
+            return compareBool(modeModifier(modifier, compareBoolModes), *inputs)
+        case "Not":
+            if inputs[0] is None:
+                return anyBool
+            return (not inputs[0][1], not inputs[0][0])
+        case "ConditionalSetFloatV2" | "ConditionalSetVector3":
+            condition, node0, node1 = inputs
+            if condition is not None and condition[0] == condition[1]:
+                return node0 if condition[0] == boolModifier(modifier) else node1
+            if name == "ConditionalSetFloatV2":
+                return hull(node0, node1)
+            return componentWise(hull, node0, node1)
+        case "ConstructVector3":
+            return None if any(x is None for x in inputs) else tuple(inputs)
+        case "Vector3Split":
+            return inputs[0]
+        case "AddVector3":
+            return componentWise(add, *inputs)
+        case "SubtractVector3":
+            return componentWise(subtract, *inputs)
+        case "ScaleVector3":
+            vector, scale = inputs
+            if vector is None:
+                return None
+            return componentWise(multiply, vector, (scale,) * 3)
+        case "DotProduct":
+            return dot(*inputs)
+        case "CrossProduct":
+            return cross(*inputs)
+        case "Magnitude":
+            return magnitude(inputs[0])
+        case "Distance":
+            return magnitude(componentWise(subtract, *inputs))
+        case "Normalize":
+            return normalize(inputs[0])
+    return None
+
+
+def valueRanges(graph: Graph, order: list[int]) -> dict:
+    """The range of every node output, keyed by (node index, output index)."""
+    ranges = {}
+    for index in order:
+        inputs = [
+            None if node is None else ranges.get((node.index, node.outputIndex))
+            for node in graph.inputNodes(index)
+        ]
+        result = nodeRange(graph, index, inputs)
+        if nodeTypeNames[graph.nodeTypes[index]] == "Vector3Split":
+            for outputIndex in (1, 2, 3):
+                ranges[(index, outputIndex)] = (
+                    None if result is None else result[outputIndex - 1]
+                )
+        else:
+            ranges[(index, 1)] = result
+    return ranges
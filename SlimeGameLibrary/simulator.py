@@ -0,0 +1,356 @@
+"""
+A headless approximation of Slime volleyball for playing many bot-vs-bot
+matches at once. Every array has one row per match and all matches advance
+in lockstep; both bots are evaluated for all matches with `evaluateBatch`.
+
+The court runs along z with the net at z = 0. Team 0 spawns on the negative
+side facing +z, team 1 on the positive side facing -z. Slimes are domes
+that move towards their SlimeController target and jump when grounded,
+with speed, acceleration and jump height from the Stat split given to
+`InitializeSlime`. A point is scored when the ball lands on a side, or when
+a team touches it more than `maxTouches` times in a row. The constants are
+an approximation of the game, not a copy of it.
+"""
+
+import numpy as np
+
+from .batch import evaluateBatch
+from .lib import Graph, nodeTypeNames
+
+gravity = -9.81
+fixedDeltaTime = 0.02
+courtWidth = 8.0
+courtLength = 16.0
+netHeight = 1.2
+slimeRadius = 0.6
+ballRadius = 0.3
+# fraction of the ball's speed into a slime, net or wall that it keeps
+restitution = 0.8
+maxTouches = 3
+serveHeight = 3.0
+spawnZ = 4.0
+
+# physical value = base + perStat * stat points
+statScales = {
+    "speed": (3.0, 0.6),
+    "acceleration": (10.0, 4.0),
+    "jump": (5.0, 0.4),
+}
+defaultStats = (4, 3, 3)
+
+forwards = np.array([[0.0, 0.0, 1.0], [0.0, 0.0, -1.0]])
+rights = np.array([[1.0, 0.0, 0.0], [-1.0, 0.0, 0.0]])
+up = np.array([0.0, 1.0, 0.0])
+
+
+def slimeStats(graph: Graph, parameters=None) -> tuple:
+    """
+    (speed, acceleration, jump) of a bot's ConstructSlimeProperties. Stats
+    whose index is in `parameters` take their values from there.
+    """
+    parameters = {} if parameters is None else parameters
+    for index in graph.liveNodes():
+        if nodeTypeNames[graph.nodeTypes[index]] != "ConstructSlimeProperties":
+            continue
+        stats = graph.inputNodes(index)[3:]
+        if all(node is not None for node in stats):
+            return tuple(
+                parameters.get(node.index, int(node.modifier)) for node in stats
+            )
+    return defaultStats
+
+
+def physicalStats(stats: tuple) -> dict:
+    return {
+        name: base + perStat * points
+        for (name, (base, perStat)), points in zip(statScales.items(), stats)
+    }
+
+
+def norm(vectors):
+    return np.sqrt(np.sum(vectors * vectors, axis=-1))
+
+
+class Simulation:
+    """
+    `matches` independent matches of bot0 (team 0) against bot1 (team 1). A
+    match ends when a team has `pointsToWin` points or after `maxDuration`
+    seconds of play. `seed` fixes serves and RandomFloat nodes.
+
+    `parameters` has one dict per team that maps the indexes of Float and
+    Stat literals to one value per match, see `evaluateBatch`.
+    """
+
+    def __init__(
+        self,
+        bot0: Graph,
+        bot1: Graph,
+        matches: int,
+        seed=0,
+        pointsToWin=7,
+        maxDuration=300.0,
+        parameters=(None, None),
+    ):
+        self.bots = (bot0, bot1)
+        self.parameters = parameters
+        self.matches = matches
+        self.pointsToWin = pointsToWin
+        self.maxDuration = maxDuration
+        # Generator.spawn needs numpy 1.25, spawning the seed sequence gives
+        # the same streams
+        self.rng, *self.botRngs = (
+            np.random.default_rng(child)
+            for child in np.random.SeedSequence(seed).spawn(3)
+        )
+        stats = [
+            physicalStats(slimeStats(bot, teamParameters))
+            for bot, teamParameters in zip(self.bots, parameters)
+        ]
+        # per team and match
+        self.maxSpeed, self.acceleration, self.jumpSpeed = (
+            np.array([np.broadcast_to(team[name], matches) for team in stats])
+            for name in ("speed", "acceleration", "jump")
+        )
+        self.spawns = np.array([[0.0, 0.0, -spawnZ], [0.0, 0.0, spawnZ]])
+
+        self.slimePositions = np.zeros((matches, 2, 3))
+        self.slimeVelocities = np.zeros((matches, 2, 3))
+        self.ballPosition = np.zeros((matches, 3))
+        self.ballVelocity = np.zeros((matches, 3))
+        self.scores = np.zeros((matches, 2), dtype=int)
+        self.touchesRemaining = np.full((matches, 2), maxTouches)
+        self.lastTouch = np.full(matches, -1)
+        self.inContact = np.zeros((matches, 2), dtype=bool)
+        self.duration = np.zeros(matches)
+        self.finished = np.zeros(matches, dtype=bool)
+        self.steps = 0
+        self.serve(np.ones(matches, dtype=bool), self.rng.integers(0, 2, matches))
+
+    def serve(self, mask, servers):
+        """Puts the slimes on their spawns and the ball above the server."""
+        count = int(mask.sum())
+        if not count:
+            return
+        self.slimePositions[mask] = self.spawns
+        self.slimeVelocities[mask] = 0.0
+        ball = np.zeros((count, 3))
+        ball[:, 0] = self.rng.uniform(-0.5, 0.5, count)
+        ball[:, 1] = serveHeight
+        ball[:, 2] = self.spawns[servers[mask], 2]
+        self.ballPosition[mask] = ball
+        self.ballVelocity[mask] = 0.0
+        self.touchesRemaining[mask] = maxTouches
+        self.lastTouch[mask] = -1
+        self.inContact[mask] = False
+
+    def grounded(self):
+        return self.slimePositions[:, :, 1] <= 0.0
+
+    def transformStates(self, position, team: int) -> dict:
+        shape = (self.matches, 3)
+        return {
+            "position": np.broadcast_to(position, shape),
+            "forward": np.broadcast_to(forwards[team], shape),
+            "right": np.broadcast_to(rights[team], shape),
+            "up": np.broadcast_to(up, shape),
+        }
+
+    def sensorStates(self, team: int) -> dict:
+        """What the bot of `team` senses in every match."""
+        opponent = 1 - team
+        grounded = self.grounded()
+        size = self.matches
+        return {
+            "Self Position": self.slimePositions[:, team],
+            "Self Velocity": self.slimeVelocities[:, team],
+            "Opponent Position": self.slimePositions[:, opponent],
+            "Opponent Velocity": self.slimeVelocities[:, opponent],
+            "Ball Position": self.ballPosition,
+            "Ball Velocity": self.ballVelocity,
+            "Self Can Jump": grounded[:, team],
+            "Opponent Can Jump": grounded[:, opponent],
+            # each team's own side is behind its forward direction
+            "Ball Is Self Side": self.ballPosition[:, 2] * forwards[team, 2] < 0,
+            "Delta time": np.full(size, fixedDeltaTime),
+            "Fixed delta time": np.full(size, fixedDeltaTime),
+            "Gravity": np.full(size, gravity),
+            "Simulation duration": self.duration,
+            "Team score": self.scores[:, team].astype(float),
+            "Opponent score": self.scores[:, opponent].astype(float),
+            "Ball touches remaining": self.touchesRemaining[:, team].astype(float),
+            "Self": self.transformStates(self.slimePositions[:, team], team),
+            "Opponent": self.transformStates(
+                self.slimePositions[:, opponent], opponent
+            ),
+            "Ball": self.transformStates(self.ballPosition, team),
+            "Self Team Spawn": self.transformStates(self.spawns[team], team),
+            "Opponent Team Spawn": self.transformStates(
+                self.spawns[opponent], opponent
+            ),
+        }
+
+    def controls(self, team: int):
+        """The move target and jump flag of every match."""
+        result = evaluateBatch(
+            self.bots[team],
+            self.sensorStates(team),
+            self.botRngs[team],
+            self.parameters[team],
+        )
+        if result["target"] is None:
+            return self.slimePositions[:, team].copy(), np.zeros(self.matches, bool)
+        target = np.where(
+            np.isfinite(result["target"]),
+            result["target"],
+            self.slimePositions[:, team],
+        )
+        # np.where copied the target, the jump flags may still be a view of
+        # the state that moves before they are used
+        return target, np.array(result["jump"], dtype=bool)
+
+    def moveSlimes(self, dt):
+        # both bots see the same snapshot, neither sees the other's move
+        controls = [self.controls(team) for team in (0, 1)]
+        for team, (target, jump) in enumerate(controls):
+            position = self.slimePositions[:, team]
+            velocity = self.slimeVelocities[:, team]
+
+            offset = target - position
+            offset[:, 1] = 0.0
+            distance = norm(offset)[:, None]
+            speed = np.minimum(self.maxSpeed[team, :, None], distance / fixedDeltaTime)
+            desired = np.where(
+                distance > 1e-6, offset / np.maximum(distance, 1e-6) * speed, 0.0
+            )
+            change = desired - velocity
+            change[:, 1] = 0.0
+            limit = self.acceleration[team, :, None] * fixedDeltaTime
+            length = norm(change)[:, None]
+            change *= np.minimum(1.0, limit / np.maximum(length, 1e-9))
+            velocity += change
+
+            jumping = jump & (position[:, 1] <= 0.0)
+            velocity[jumping, 1] = self.jumpSpeed[team, jumping]
+            velocity[:, 1] += gravity * dt[:, 0]
+            position += velocity * dt
+
+            landed = position[:, 1] < 0.0
+            position[landed, 1] = 0.0
+            velocity[landed, 1] = 0.0
+
+            # stay inside the own half
+            side = -forwards[team, 2]
+            depth = sorted((side * slimeRadius, side * (courtLength / 2 - slimeRadius)))
+            for axis, lowest, highest in (
+                (0, -courtWidth / 2 + slimeRadius, courtWidth / 2 - slimeRadius),
+                (2, *depth),
+            ):
+                outside = (position[:, axis] < lowest) | (position[:, axis] > highest)
+                position[:, axis] = np.clip(position[:, axis], lowest, highest)
+                velocity[outside, axis] = 0.0
+
+    def bounceOff(self, mask, normals, pushOut, surfaceVelocity=0.0):
+        """Pushes the ball out of a surface and reflects its velocity."""
+        self.ballPosition[mask] += normals[mask] * pushOut[mask, None]
+        relative = self.ballVelocity[mask] - surfaceVelocity
+        speed = np.sum(relative * normals[mask], axis=-1)
+        approaching = speed < 0
+        self.ballVelocity[mask] -= (
+            (1 + restitution) * np.where(approaching, speed, 0.0)[:, None]
+        ) * normals[mask]
+
+    def moveBall(self, dt):
+        self.ballVelocity[:, 1] += gravity * dt[:, 0]
+        self.ballPosition += self.ballVelocity * dt
+        position = self.ballPosition
+        velocity = self.ballVelocity
+
+        # side and end walls
+        for axis, half in ((0, courtWidth / 2), (2, courtLength / 2)):
+            limit = half - ballRadius
+            outside = np.abs(position[:, axis]) > limit
+            position[outside, axis] = np.clip(position[outside, axis], -limit, limit)
+            velocity[outside, axis] *= -restitution
+
+        # the net below its top edge is a wall, its top edge a round bar
+        below = (position[:, 1] < netHeight) & (np.abs(position[:, 2]) < ballRadius)
+        sides = np.where(velocity[:, 2] > 0, -1.0, 1.0)
+        position[below, 2] = sides[below] * ballRadius
+        velocity[below, 2] *= -restitution
+        edge = np.stack(
+            [np.zeros(self.matches), position[:, 1] - netHeight, position[:, 2]],
+            axis=-1,
+        )
+        edgeDistance = norm(edge)
+        hitsEdge = ~below & (position[:, 1] >= netHeight) & (edgeDistance < ballRadius)
+        normals = edge / np.maximum(edgeDistance, 1e-9)[:, None]
+        self.bounceOff(hitsEdge, normals, ballRadius - edgeDistance)
+
+        # slimes, counting touches when a contact starts
+        for team in (0, 1):
+            offset = position - self.slimePositions[:, team]
+            distance = norm(offset)
+            contact = (distance < slimeRadius + ballRadius) & (offset[:, 1] >= 0)
+            contact &= ~self.finished
+            normals = offset / np.maximum(distance, 1e-9)[:, None]
+            self.bounceOff(
+                contact,
+                normals,
+                slimeRadius + ballRadius - distance,
+                self.slimeVelocities[contact, team],
+            )
+            touched = contact & ~self.inContact[:, team]
+            again = touched & (self.lastTouch == team)
+            first = touched & (self.lastTouch != team)
+            self.touchesRemaining[again, team] -= 1
+            self.touchesRemaining[first, team] = maxTouches - 1
+            self.touchesRemaining[first, 1 - team] = maxTouches
+            self.lastTouch[touched] = team
+            self.inContact[:, team] = contact
+
+    def awardPoints(self):
+        active = ~self.finished
+        landed = active & (self.ballPosition[:, 1] <= ballRadius)
+        # team 1 scores when the ball lands on team 0's side
+        scorers = np.where(self.ballPosition[:, 2] < 0, 1, 0)
+        faults = active & ~landed & (self.touchesRemaining < 0).any(axis=1)
+        faultingTeam = np.argmin(self.touchesRemaining, axis=1)
+        scorers = np.where(faults, 1 - faultingTeam, scorers)
+        points = landed | faults
+
+        self.scores[points, scorers[points]] += 1
+        won = self.scores.max(axis=1) >= self.pointsToWin
+        self.finished |= won | (self.duration >= self.maxDuration)
+        self.serve(points & ~self.finished, scorers)
+
+    def step(self):
+        """Advances every unfinished match by one fixed time step."""
+        dt = np.where(self.finished, 0.0, fixedDeltaTime)[:, None]
+        self.moveSlimes(dt)
+        self.moveBall(dt)
+        self.duration += dt[:, 0]
+        self.awardPoints()
+        self.steps += 1
+
+    def run(self, maxSteps=None) -> dict:
+        """Steps until every match is over, or for at most `maxSteps` steps."""
+        while not self.finished.all():
+            if maxSteps is not None and self.steps >= maxSteps:
+                break
+            self.step()
+        return self.results()
+
+    def results(self) -> dict:
+        """Scores and winners (0, 1, or -1 for a draw) of every match."""
+        difference = self.scores[:, 0] - self.scores[:, 1]
+        return {
+            "scores": self.scores.copy(),
+            "winners": np.where(difference > 0, 0, np.where(difference < 0, 1, -1)),
+            "finished": self.finished.copy(),
+            "duration": self.duration.copy(),
+        }
+
+
+def playMatches(bot0: Graph, bot1: Graph, matches=100, seed=0, **options) -> dict:
+    """Simulation(...).run() for matches of bot0 against bot1."""
+    return Simulation(bot0, bot1, matches, seed, **options).run()
@@ -0,0 +1,285 @@
+"""
+Round-robin tournaments between the saved bots of a directory. Every pair
+of bots plays `matches` seeded matches with `simulator.Simulation`, half of
+them with the sides swapped. Pairings are spread over a process pool and
+every finished pairing is appended to a JSON lines results file, so a
+tournament that was stopped resumes where it was when run again with the
+same results file.
+
+    python -m SlimeGameLibrary.tournament "SlimeVolleyball/AIComp_Data/Saves"
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from fnmatch import fnmatch
+from itertools import combinations
+
+import numpy as np
+
+from .lib import Graph
+from .simulator import Simulation
+
+# save file path -> Graph, per worker process
+loadedBots = {}
+
+
+def findSaves(directory, pattern="*.txt") -> dict:
+    """File name -> path of every save in `directory`, sorted by name."""
+    return {
+        name: os.path.join(directory, name)
+        for name in sorted(os.listdir(directory))
+        if fnmatch(name, pattern) and os.path.isfile(os.path.join(directory, name))
+    }
+
+
+def loadBot(path) -> Graph:
+    graph = loadedBots.get(path)
+    if graph is None:
+        graph = loadedBots[path] = Graph()
+        graph.LoadData(path)
+    return graph
+
+
+def pairingSeed(seed: int, name0: str, name1: str) -> int:
+    """A seed that only depends on the tournament seed and the two names."""
+    digest = hashlib.sha256(f"{seed}\0{name0}\0{name1}".encode()).digest()
+    return int.from_bytes(digest[:8], "little")
+
+
+def playPairing(names: tuple, paths: tuple, matches: int, seed: int, options: dict):
+    """
+    `matches` matches between two saves, the first half with the first bot
+    as team 0 and the second half with the sides swapped.
+    """
+    bots = [loadBot(path) for path in paths]
+    pairing = pairingSeed(seed, *names)
+    wins = [0, 0]
+    points = [0, 0]
+    draws = 0
+    for side, count in enumerate((matches - matches // 2, matches // 2)):
+        if not count:
+            continue
+        teams = (0, 1) if side == 0 else (1, 0)
+        results = Simulation(
+            bots[teams[0]], bots[teams[1]], count, (pairing, side), **options
+        ).run()
+        for team, bot in enumerate(teams):
+            wins[bot] += int(np.sum(results["winners"] == team))
+            points[bot] += int(np.sum(results["scores"][:, team]))
+        draws += int(np.sum(results["winners"] == -1))
+    return {
+        "bots": list(names),
+        "matches": matches,
+        "wins": wins,
+        "draws": draws,
+        "points": points,
+    }
+
+
+def readResults(resultsPath, settings: dict) -> list[dict]:
+    """
+    The pairings already in a results file. A line that was cut off by a
+    crash is removed from the file, so new results are appended after the
+    last complete one.
+    """
+    if not os.path.exists(resultsPath):
+        with open(resultsPath, "w") as f:
+            f.write(json.dumps({"settings": settings}) + "\n")
+        return []
+
+    records = []
+    with open(resultsPath, "r+b") as f:
+        end = 0
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            if end == 0:
+                if record.get("settings") != settings:
+                    raise ValueError(
+                        f"{resultsPath!r} was written with different settings: "
+                        f"{record.get('settings')} instead of {settings}"
+                    )
+            else:
+                records.append(record)
+            end += len(line)
+        if end == 0:
+            raise ValueError(f"{resultsPath!r} is not a tournament results file")
+        f.truncate(end)
+    return records
+
+
+def bradleyTerry(wins, games, iterations=1000, tolerance=1e-10):
+    """
+    Strengths of the Bradley-Terry model fitted to `wins[i, j]`, the wins of
+    i against j out of `games[i, j]`, with the minorization-maximization
+    updates. Strengths are scaled to a geometric mean of 1.
+    """
+    strengths = np.ones(len(wins))
+    totalWins = wins.sum(axis=1)
+    for _ in range(iterations):
+        pairs = games / (strengths[:, None] + strengths[None, :])
+        updated = totalWins / np.maximum(pairs.sum(axis=1), 1e-300)
+        updated = np.maximum(updated, 1e-300)
+        updated /= np.exp(np.mean(np.log(updated)))
+        if np.max(np.abs(updated - strengths)) < tolerance:
+            return updated
+        strengths = updated
+    return strengths
+
+
+def summarize(names: list, records: list[dict], prior=1.0) -> dict:
+    """
+    The win rate of every bot against every other bot, draws counting as
+    half a win, and Elo-scale ratings (mean 1500) of the Bradley-Terry
+    model. Every played pairing gets `prior` extra drawn matches so that
+    unbeaten bots get finite ratings. Pairings not played yet are NaN.
+    """
+    index = {name: i for i, name in enumerate(names)}
+    size = len(names)
+    wins = np.zeros((size, size))
+    games = np.zeros((size, size))
+    for record in records:
+        if not all(name in index for name in record["bots"]):
+            continue
+        i, j = (index[name] for name in record["bots"])
+        half = record["draws"] / 2
+        wins[i, j] += record["wins"][0] + half
+        wins[j, i] += record["wins"][1] + half
+        games[i, j] += record["matches"]
+        games[j, i] += record["matches"]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        winRates = np.where(games > 0, wins / games, np.nan)
+    played = games > 0
+    strengths = bradleyTerry(wins + played * prior / 2, games + played * prior)
+    ratings = 400 * np.log10(strengths)
+    ratings += 1500 - ratings.mean()
+    return {"bots": list(names), "winRates": winRates, "ratings": ratings}
+
+
+def runTournament(
+    directory,
+    resultsPath=None,
+    matches=100,
+    seed=0,
+    workers=None,
+    pattern="*.txt",
+    **options,
+) -> dict:
+    """
+    Plays every pairing of the saves in `directory` that is not in the
+    results file yet, on `workers` processes (all cores by default), and
+    returns `summarize` of all results. `options` go to `Simulation`, e.g.
+    pointsToWin and maxDuration. The results file defaults to
+    tournament.jsonl in `directory` and must have been written with the
+    same matches, seed and options.
+    """
+    saves = findSaves(directory, pattern)
+    names = list(saves)
+    if resultsPath is None:
+        resultsPath = os.path.join(directory, "tournament.jsonl")
+    settings = {"matches": matches, "seed": seed, "options": options}
+    records = readResults(resultsPath, settings)
+
+    done = {tuple(record["bots"]) for record in records}
+    pending = [pair for pair in combinations(names, 2) if pair not in done]
+    if pending:
+        pool = ProcessPoolExecutor(max_workers=workers or os.cpu_count())
+        try:
+            futures = [
+                pool.submit(
+                    playPairing,
+                    pair,
+                    tuple(saves[name] for name in pair),
+                    matches,
+                    seed,
+                    options,
+                )
+                for pair in pending
+            ]
+            with open(resultsPath, "a") as f:
+                for future in as_completed(futures):
+                    record = future.result()
+                    f.write(json.dumps(record) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+                    records.append(record)
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+    return summarize(names, records)
+
+
+def formatSummary(summary: dict) -> str:
+    """The bots sorted by rating, with their win rate against each other."""
+    names = summary["bots"]
+    order = np.argsort(-summary["ratings"], kind="stable")
+    width = max([len(name) for name in names] + [4])
+    lines = [
+        f"{'':>4} {'bot':<{width}} {'rating':>7}"
+        + "".join(f"{rank:>6}" for rank in range(1, len(names) + 1))
+    ]
+    for rank, i in enumerate(order, 1):
+        rates = [summary["winRates"][i, j] for j in order]
+        lines.append(
+            f"{rank:>4} {names[i]:<{width}} {summary['ratings'][i]:7.0f}"
+            + "".join(
+                f"{'-':>6}" if math.isnan(rate) else f"{rate:6.2f}" for rate in rates
+            )
+        )
+    return "\n".join(lines)
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(
+        description="Round-robin tournament between the saved bots of a directory."
+    )
+    parser.add_argument("directory")
+    parser.add_argument("--results", help="default: DIRECTORY/tournament.jsonl")
+    parser.add_argument("--matches", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, help="default: number of cores")
+    parser.add_argument("--pattern", default="*.txt")
+    parser.add_argument("--points-to-win", type=int, default=7)
+    parser.add_argument("--max-duration", type=float, default=300.0)
+    parser.add_argument("--summary", help="also write the summary as JSON")
+    args = parser.parse_args(arguments)
+
+    summary = runTournament(
+        args.directory,
+        args.results,
+        args.matches,
+        args.seed,
+        args.workers,
+        args.pattern,
+        pointsToWin=args.points_to_win,
+        maxDuration=args.max_duration,
+    )
+    print(formatSummary(summary))
+    if args.summary:
+        with open(args.summary, "w") as f:
+            json.dump(
+                {
+                    "bots": summary["bots"],
+                    "ratings": summary["ratings"].tolist(),
+                    # NaN is not JSON
+                    "winRates": [
+                        [None if math.isnan(rate) else rate for rate in row]
+                        for row in summary["winRates"].tolist()
+                    ],
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""
+Searches for the best values of a bot's tunable literals, the Float and
+Stat nodes built with `Tunable` and `TunableStat`:
+
+    with Graph() as graph:
+        InitializeSlime(
+            "AIA", "Yellow", "United States of America",
+            TunableStat(5, name="speed"),
+            TunableStat(3, name="acceleration"),
+            TunableStat(2, name="jump"),
+        )
+        positionSign = RelativePosition(Self.TeamSpawn, "Backward")
+        moveTo = Ball.Position + positionSign * Tunable(0.4, -1, 1, "offset")
+        ...
+    tune(graph, method="cma", outputPath="AIA tuned.txt")
+
+Candidates are points of the unit cube with one axis per parameter. A whole
+generation of candidates is scored in one `Simulation`: every candidate
+plays its matches against the opponent in its own rows, with its values
+given to `evaluateBatch` as per-match parameters, so each generation walks
+the bot once per step instead of once per candidate.
+"""
+
+import math
+from itertools import product
+
+import numpy as np
+
+from .lib import Graph
+from .nodes import floatText
+from .simulator import Simulation, slimeStats
+
+
+def parameterValues(tunables: dict, unit) -> dict:
+    """name -> the values of the candidates in `unit`, one row per candidate"""
+    values = {}
+    for axis, (name, parameter) in enumerate(tunables.items()):
+        low, high = parameter["low"], parameter["high"]
+        column = low + np.clip(unit[:, axis], 0.0, 1.0) * (high - low)
+        # six decimals keep the saved modifiers short
+        values[name] = np.round(column, 0 if parameter["integer"] else 6)
+    return values
+
+
+def currentValue(graph: Graph, name: str) -> float:
+    return float(graph.nodeModifiers[graph.tunables[name]["index"]])
+
+
+def currentUnit(graph: Graph):
+    """The unit cube point of the bot's current values."""
+    return np.array(
+        [
+            (currentValue(graph, name) - parameter["low"])
+            / max(parameter["high"] - parameter["low"], 1e-12)
+            for name, parameter in graph.tunables.items()
+        ]
+    )
+
+
+def spendStats(graph: Graph, values: dict, statTotal: int):
+    """
+    Rescales the tunable stats of every candidate so that the three stats
+    add up to `statTotal`, giving the rounding remainder to the stats with
+    the largest fractions. Stats that are not tunable keep their value and
+    the total takes precedence over the bounds.
+    """
+    names = [name for name, parameter in graph.tunables.items() if parameter["integer"]]
+    if not names:
+        return
+    fixed = sum(slimeStats(graph)) - sum(currentValue(graph, name) for name in names)
+    budget = max(statTotal - fixed, 0)
+    raw = np.stack([values[name] for name in names], axis=1)
+    sums = raw.sum(axis=1, keepdims=True)
+    scaled = np.where(
+        sums > 0, raw * budget / np.maximum(sums, 1e-12), budget / len(names)
+    )
+    whole = np.floor(scaled)
+    remainder = budget - whole.sum(axis=1, keepdims=True)
+    # rank of every stat's fraction within its candidate, largest first
+    ranks = np.argsort(np.argsort(whole - scaled, axis=1, kind="stable"), axis=1)
+    whole += ranks < remainder
+    for column, name in enumerate(names):
+        values[name] = whole[:, column]
+
+
+def gridCandidates(tunables: dict, count: int, rng):
+    """
+    An even grid with about `count` points, or fewer when an integer
+    parameter has fewer values.
+    """
+    perAxis = max(2, int(count ** (1 / len(tunables)) + 1e-9))
+    axes = [
+        np.linspace(
+            0.0,
+            1.0,
+            (
+                min(perAxis, int(parameter["high"] - parameter["low"]) + 1)
+                if parameter["integer"]
+                else perAxis
+            ),
+        )
+        for parameter in tunables.values()
+    ]
+    return np.array(list(product(*axes)))
+
+
+def randomCandidates(tunables: dict, count: int, rng):
+    return rng.random((count, len(tunables)))
+
+
+class CovarianceSearch:
+    """
+    CMA-ES on the unit cube: candidates are drawn from a normal
+    distribution whose mean, covariance and step size follow the best
+    `populationSize // 2` candidates of every generation. Candidates
+    outside the cube are clipped onto it before they are scored.
+    """
+
+    def __init__(self, mean, sigma=0.3, populationSize=16, rng=None):
+        self.rng = np.random.default_rng() if rng is None else rng
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.sigma = sigma
+        self.populationSize = populationSize
+        dimension = len(self.mean)
+
+        self.parents = max(1, populationSize // 2)
+        weights = np.log(self.parents + 0.5) - np.log(np.arange(1, self.parents + 1))
+        self.weights = weights / weights.sum()
+        self.parentMass = 1 / np.sum(self.weights**2)
+        mass = self.parentMass
+
+        self.cc = (4 + mass / dimension) / (dimension + 4 + 2 * mass / dimension)
+        self.cs = (mass + 2) / (dimension + mass + 5)
+        self.c1 = 2 / ((dimension + 1.3) ** 2 + mass)
+        self.cmu = min(
+            1 - self.c1,
+            2 * (mass - 2 + 1 / mass) / ((dimension + 2) ** 2 + mass),
+        )
+        self.damping = (
+            1 + 2 * max(0.0, math.sqrt((mass - 1) / (dimension + 1)) - 1) + self.cs
+        )
+        self.expectedNorm = math.sqrt(dimension) * (
+            1 - 1 / (4 * dimension) + 1 / (21 * dimension**2)
+        )
+
+        self.covariance = np.eye(dimension)
+        self.covariancePath = np.zeros(dimension)
+        self.stepPath = np.zeros(dimension)
+        self.generation = 0
+
+    def ask(self):
+        """A generation of candidates, one per row."""
+        variances, basis = np.linalg.eigh(self.covariance)
+        deviations = np.sqrt(np.maximum(variances, 1e-20))
+        samples = self.rng.standard_normal((self.populationSize, len(self.mean)))
+        steps = samples @ (basis * deviations).T
+        return np.clip(self.mean + self.sigma * steps, 0.0, 1.0)
+
+    def tell(self, candidates, order):
+        """Updates the distribution from candidates sorted by `order`, best first."""
+        self.generation += 1
+        steps = (candidates[order[: self.parents]] - self.mean) / self.sigma
+        step = self.weights @ steps
+        self.mean = self.mean + self.sigma * step
+
+        variances, basis = np.linalg.eigh(self.covariance)
+        inverseRoot = basis @ np.diag(1 / np.sqrt(np.maximum(variances, 1e-20)))
+        inverseRoot = inverseRoot @ basis.T
+        self.stepPath = (1 - self.cs) * self.stepPath + math.sqrt(
+            self.cs * (2 - self.cs) * self.parentMass
+        ) * (inverseRoot @ step)
+        stepLength = np.linalg.norm(self.stepPath) / math.sqrt(
+            1 - (1 - self.cs) ** (2 * self.generation)
+        )
+        steady = stepLength < (1.4 + 2 / (len(self.mean) + 1)) * self.expectedNorm
+        self.covariancePath = (1 - self.cc) * self.covariancePath + steady * math.sqrt(
+            self.cc * (2 - self.cc) * self.parentMass
+        ) * step
+
+        rankMu = (steps * self.weights[:, None]).T @ steps
+        self.covariance = (
+            (1 - self.c1 - self.cmu) * self.covariance
+            + self.c1
+            * (
+                np.outer(self.covariancePath, self.covariancePath)
+                + (not steady) * self.cc * (2 - self.cc) * self.covariance
+            )
+            + self.cmu * rankMu
+        )
+        self.sigma *= math.exp(
+            (self.cs / self.damping)
+            * (np.linalg.norm(self.stepPath) / self.expectedNorm - 1)
+        )
+
+
+def scoreCandidates(
+    graph: Graph, values: dict, opponent: Graph, matches: int, seed, **options
+) -> dict:
+    """
+    Win rate (draws count half) and mean point difference of every
+    candidate over `matches` matches against `opponent`, all candidates in
+    one Simulation.
+    """
+    count = len(next(iter(values.values())))
+    overrides = {
+        graph.tunables[name]["index"]: np.repeat(column, matches)
+        for name, column in values.items()
+    }
+    results = Simulation(
+        graph,
+        opponent,
+        count * matches,
+        seed,
+        parameters=(overrides, None),
+        **options,
+    ).run()
+    winners = results["winners"].reshape(count, matches)
+    scores = results["scores"].reshape(count, matches, 2)
+    return {
+        "winRate": np.mean((winners == 0) + 0.5 * (winners == -1), axis=1),
+        "pointDifference": np.mean(scores[..., 0] - scores[..., 1], axis=1),
+    }
+
+
+def ranking(scores: dict):
+    """Candidate indexes by win rate, then point difference, best first."""
+    return np.lexsort((-scores["pointDifference"], -scores["winRate"]))
+
+
+def setParameters(graph: Graph, values: dict):
+    """Writes parameter values into the modifiers of their literals."""
+    for name, value in values.items():
+        parameter = graph.tunables[name]
+        graph.nodeModifiers[parameter["index"]] = (
+            str(int(value)) if parameter["integer"] else floatText(float(value))
+        )
+
+
+def tune(
+    graph: Graph,
+    opponent: Graph | None = None,
+    method="cma",
+    candidates=32,
+    generations=10,
+    matches=20,
+    seed=0,
+    statTotal=None,
+    outputPath=None,
+    layout="auto",
+    **options,
+) -> dict:
+    """
+    Finds the values of the bot's tunable literals that do best against
+    `opponent`, by default the bot with its current values, and writes them
+    into the graph. With `outputPath` the tuned bot is saved there with
+    `SaveData`.
+
+    `method` is "grid" (one generation of about `candidates` grid points),
+    "random" or "cma" (`generations` generations of `candidates`). The
+    current values are scored in the first generation, so the result is
+    never worse than them on the matches played. Tunable
+    stats are rescaled to add up to `statTotal`, the bot's current total by
+    default. `options` go to `Simulation`.
+
+    Returns the best values with their win rate and point difference, and
+    the best win rate of every generation.
+    """
+    tunables = graph.tunables
+    if not tunables:
+        raise ValueError("the bot has no Tunable or TunableStat literals")
+    if method not in ("grid", "random", "cma"):
+        raise ValueError(f"unknown search method {method!r}")
+    opponent = graph if opponent is None else opponent
+    if statTotal is None:
+        statTotal = sum(slimeStats(graph))
+
+    rng = np.random.default_rng(seed)
+    start = currentUnit(graph)
+    search = CovarianceSearch(start, populationSize=candidates, rng=rng)
+    best = None
+    history = []
+    evaluated = 0
+
+    for generation in range(1 if method == "grid" else generations):
+        if method == "grid":
+            unit = gridCandidates(tunables, candidates, rng)
+        elif method == "random":
+            unit = randomCandidates(tunables, candidates, rng)
+        else:
+            unit = search.ask()
+        batch = np.vstack([start[None], unit]) if generation == 0 else unit
+
+        values = parameterValues(tunables, batch)
+        spendStats(graph, values, statTotal)
+        scores = scoreCandidates(
+            graph, values, opponent, matches, (seed, generation), **options
+        )
+        order = ranking(scores)
+        evaluated += len(batch)
+
+        top = order[0]
+        candidate = {
+            "parameters": {
+                name: (int if tunables[name]["integer"] else float)(column[top])
+                for name, column in values.items()
+            },
+            "winRate": float(scores["winRate"][top]),
+            "pointDifference": float(scores["pointDifference"][top]),
+        }
+        history.append(candidate["winRate"])
+        if best is None or (candidate["winRate"], candidate["pointDifference"]) > (
+            best["winRate"],
+            best["pointDifference"],
+        ):
+            best = candidate
+
+        if method == "cma":
+            offset = len(batch) - len(unit)
+            sampled = order[order >= offset] - offset
+            search.tell(unit, sampled)
+
+    setParameters(graph, best["parameters"])
+    if outputPath is not None:
+        graph.SaveData(outputPath, layout)
+    return {**best, "evaluated": evaluated, "history": history}
@@ -1,3 +1,5 @@
+import random
+from itertools import count
 from uuid import uuid4
 
 
@@ -5,6 +7,39 @@ def generateId():
     return str(uuid4())
 
 
+class RandomIds:
+    """uuid4 sIDs and random instance ids, different on every build."""
+
+    def sID(self) -> str:
+        return generateId()
+
+    def instanceId(self) -> int:
+        return random.randint(0, 999999)
+
+
+class SeededIds:
+    """
+    Reproducible ids: version 4 UUID-shaped sIDs drawn from a generator seeded
+    with `seed`, and sequential instance ids. Building the same bot with the
+    same seed gives the same ids, so the saved file is identical.
+    """
+
+    def __init__(self, seed=0):
+        self.random = random.Random(seed)
+        self.instanceIds = count(1)
+
+    def sID(self) -> str:
+        bits = f"{self.random.getrandbits(124):031x}"
+        variant = "89ab"[int(bits[15], 16) & 3]
+        return (
+            f"{bits[:8]}-{bits[8:12]}-4{bits[12:15]}-"
+            f"{variant}{bits[16:19]}-{bits[19:31]}"
+        )
+
+    def instanceId(self) -> int:
+        return next(self.instanceIds)
+
+
 def Color(r, g, b, a=1):
     return {"r": r, "g": g, "b": b, "a": a}
 
@@ -0,0 +1,93 @@
+"""
+Benchmark of evaluating the example bot against random game states, one
+state at a time with the reference interpreter and the compiled function,
+and all at once with the NumPy batch evaluator.
+
+    python benchmarks/evaluation.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from SlimeGameLibrary import *
+from SlimeGameLibrary.batch import evaluateBatch
+from SlimeGameLibrary.compiler import compileGraph
+from SlimeGameLibrary.data import vector3Sensors
+from SlimeGameLibrary.evaluation import evaluateGraph
+
+
+def buildGraph() -> Graph:
+    graph = Graph(ids=SeededIds(0))
+    with graph:
+        positionSign = RelativePosition(Self.TeamSpawn, "Backward")
+        moveTo = Ball.Position + positionSign * 0.4
+        distanceToBall = Distance(Ball.Position, Self.Position)
+        SlimeController(moveTo, (distanceToBall < 2.25) & Self.CanJump)
+        Debug(distanceToBall)
+    return graph
+
+
+def randomStates(size: int, seed=0) -> dict:
+    rng = np.random.default_rng(seed)
+    states = {name: rng.uniform(-10, 10, (size, 3)) for name in vector3Sensors}
+    states["Self Can Jump"] = rng.random(size) < 0.5
+    states["Self Team Spawn"] = {
+        "position": rng.uniform(-10, 10, (size, 3)),
+        "forward": np.where(rng.random((size, 1)) < 0.5, -1.0, 1.0)
+        * np.array([0.0, 0.0, 1.0]),
+    }
+    return states
+
+
+def stateAt(states: dict, i: int) -> dict:
+    return {
+        name: (
+            {axis: tuple(array[i].tolist()) for axis, array in value.items()}
+            if isinstance(value, dict)
+            else (tuple(value[i].tolist()) if value.ndim == 2 else value[i].item())
+        )
+        for name, value in states.items()
+    }
+
+
+def timeStates(function, states: list, size: int) -> float:
+    """Time of `function` on every state, extrapolated to `size` states."""
+    start = time.perf_counter()
+    for state in states:
+        function(state)
+    return (time.perf_counter() - start) * size / len(states)
+
+
+def main(sizes=(1000, 100000, 1000000), singleLimit=10000):
+    graph = buildGraph()
+    bot = compileGraph(graph)
+    print(
+        f"{'states':>8}{'per state':>14}{'compiled':>14}{'batch':>14}"
+        f"{'speedups':>16}"
+    )
+    for size in sizes:
+        states = randomStates(size)
+        start = time.perf_counter()
+        evaluateBatch(graph, states)
+        batch = time.perf_counter() - start
+
+        # per-state times are extrapolated from the first singleLimit states
+        singleStates = [stateAt(states, i) for i in range(min(size, singleLimit))]
+        single = timeStates(
+            lambda state: evaluateGraph(graph, state), singleStates, size
+        )
+        compiled = timeStates(bot, singleStates, size)
+
+        print(
+            f"{size:8}{single:13.3f}s{compiled:13.3f}s{batch:13.3f}s"
+            f"{single / compiled:7.0f}x{single / batch:8.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark of reading large save files back into a graph.
+
+Every bot is a chain of subtractions that each read a product of a shared
+sensor and a distinct constant, saved with the grid layout. Parsing the
+JSON and indexing the parsed save with `Graph.loadSave` are timed
+separately; `Graph.LoadData` does both.
+
+    python benchmarks/loading.py
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from SlimeGameLibrary import *
+from SlimeGameLibrary.lib import pausedGarbageCollection
+
+
+def buildGraph(size: int) -> Graph:
+    graph = Graph(ids=SeededIds(0))
+    with graph:
+        shared = GetFloat("Pi")
+        total = shared
+        for i in range(size // 3):
+            total = total - shared * i
+        Debug(total)
+    return graph
+
+
+def timeLoad(path) -> tuple[float, float, int]:
+    with open(path) as f:
+        text = f.read()
+    start = time.perf_counter()
+    with pausedGarbageCollection():
+        save = json.loads(text)
+    parsed = time.perf_counter()
+    graph = Graph()
+    graph.loadSave(save)
+    indexed = time.perf_counter()
+    return parsed - start, indexed - parsed, len(graph)
+
+
+def main(sizes=(10000, 30000, 100000), repeat=3):
+    print(f"{'nodes':>8}{'MB':>8}{'parse':>10}{'index':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            path = os.path.join(directory, f"{size}.txt")
+            buildGraph(size).SaveData(path, "grid")
+            times = [timeLoad(path) for _ in range(repeat)]
+            parse = min(parsed for parsed, _, _ in times)
+            index = min(indexed for _, indexed, _ in times)
+            print(
+                f"{times[0][2]:8}{os.path.getsize(path) / 1e6:8.0f}"
+                f"{parse:9.3f}s{index:9.3f}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
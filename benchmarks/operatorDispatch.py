@@ -0,0 +1,61 @@
+"""
+Micro-benchmark of the `Node` operator overhead.
+
+Every expression is memoized after its first evaluation, so timing it again
+measures the cost of getting from the operator to the cached constructor
+result. The same calls made directly on the constructors are the baseline.
+The library is imported from this checkout, or from the checkout given as
+the first argument, so other versions can be compared on one machine:
+
+    python benchmarks/operatorDispatch.py
+    git worktree add ../before <commit>
+    python benchmarks/operatorDispatch.py ../before
+"""
+
+import os
+import sys
+import timeit
+
+root = (
+    sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), "..")
+)
+sys.path.insert(0, os.path.abspath(root))
+
+from SlimeGameLibrary import *
+
+a = GetFloat("Pi")
+b = GetFloat("Gravity")
+v = Ball.Position
+w = Self.Position
+p = Self.CanJump
+q = Ball.IsSelfSide
+
+cases = {
+    "a + b": (lambda: a + b, lambda: AddFloats(a, b)),
+    "a * 2": (lambda: a * 2, lambda: MultiplyFloats(a, 2)),
+    "2 - a": (lambda: 2 - a, lambda: SubtractFloats(2, a)),
+    "v * a": (lambda: v * a, lambda: ScaleVector3(v, a)),
+    "v - w": (lambda: v - w, lambda: SubtractVector3(v, w)),
+    "a < b": (lambda: a < b, lambda: CompareFloats(a, b, "<")),
+    "p & q": (lambda: p & q, lambda: CompareBool(p, q, "and")),
+    "v @ w": (lambda: v @ w, lambda: DotProduct(v, w)),
+}
+
+
+def main(number=20000, repeat=25):
+    print(f"{'expression':12}{'operator':>12}{'direct':>12}{'overhead':>12}")
+    for name, (operator, direct) in cases.items():
+        operator()
+        direct()
+        operatorTime = min(timeit.repeat(operator, number=number, repeat=repeat))
+        directTime = min(timeit.repeat(direct, number=number, repeat=repeat))
+        print(
+            f"{name:12}"
+            f"{operatorTime / number * 1e9:10.0f}ns"
+            f"{directTime / number * 1e9:10.0f}ns"
+            f"{(operatorTime - directTime) / number * 1e9:10.0f}ns"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Benchmark of the two pruning passes on large graphs.
+
+Every graph has unused nodes that all read the same shared sensor, followed
+by a live chain that ends in a Debug node and reads it too. That is the
+high fan-out case where `removeUnusedNodes` rescans the sensor's outputs
+for every removal. Passes that take longer than `timeLimit` seconds are not
+run on bigger graphs.
+
+    python benchmarks/pruning.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from SlimeGameLibrary import *
+
+
+def buildGraph(size: int) -> Graph:
+    graph = Graph(ids=SeededIds(0))
+    with graph:
+        shared = GetFloat("Pi")
+        for i in range(size // 4):
+            shared + i
+        total = shared
+        for i in range(size // 4):
+            total = total - shared * i
+        Debug(total)
+    return graph
+
+
+def timePass(size: int, name: str) -> tuple[float, int]:
+    graph = buildGraph(size)
+    start = time.perf_counter()
+    getattr(graph, name)()
+    elapsed = time.perf_counter() - start
+    return elapsed, len(graph.liveNodes())
+
+
+def main(sizes=(10000, 30000, 100000), timeLimit=60):
+    passes = ["removeUnusedNodes", "removeUnreachableNodes"]
+    print(f"{'nodes':>8}" + "".join(f"{name:>26}" for name in passes))
+    skipped = set()
+    for size in sizes:
+        row = f"{len(buildGraph(size)):8}"
+        for name in passes:
+            if name in skipped:
+                row += f"{'skipped':>26}"
+                continue
+            elapsed, kept = timePass(size, name)
+            row += f"{elapsed:11.3f}s {kept:8} kept"
+            if elapsed > timeLimit:
+                skipped.add(name)
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from SlimeGameLibrary.data import boolSensors, floatSensors, vector3Sensors
+
+
+def randomState(rng: random.Random) -> dict:
+    """A game state for `evaluation.evaluateGraph` with every sensor set."""
+    state = {
+        name: tuple(rng.uniform(-10, 10) for _ in range(3)) for name in vector3Sensors
+    }
+    state.update({name: rng.random() < 0.5 for name in boolSensors})
+    state.update({name: rng.uniform(0, 5) for name in floatSensors if name != "Pi"})
+    for name, forward in (("Self Team Spawn", 1.0), ("Opponent Team Spawn", -1.0)):
+        state[name] = {
+            "position": (0.0, 0.0, -4.0 * forward),
+            "forward": (0.0, 0.0, forward),
+            "right": (forward, 0.0, 0.0),
+        }
+    return state
+
+
+@pytest.fixture
+def states() -> list[dict]:
+    rng = random.Random(0)
+    return [randomState(rng) for _ in range(50)]
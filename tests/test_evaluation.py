@@ -0,0 +1,150 @@
+import random
+
+import numpy as np
+import pytest
+
+from SlimeGameLibrary import *
+from SlimeGameLibrary.batch import evaluateBatch
+from SlimeGameLibrary.compiler import compiledCode, compileGraph
+from SlimeGameLibrary.data import (
+    compareBoolModes,
+    compareFloatModes,
+    operationModes,
+    relativePositionModes,
+    vector3Sensors,
+)
+from SlimeGameLibrary.evaluation import evaluateGraph
+
+
+def randomGraph(seed: int, size=60) -> Graph:
+    """A bot of `size` random nodes that reads every kind of sensor."""
+    rng = random.Random(seed)
+    graph = Graph(ids=SeededIds(seed))
+    with graph:
+        floats = [
+            GetFloat(rng.choice(["Gravity", "Delta time", "Pi", "Team score"])),
+            Float(rng.choice([0, 1, -1, 0.5, 2, 3.5])),
+        ]
+        vectors = [GetVector3(rng.choice(vector3Sensors)), Vector3(1, 2, 3)]
+        bools = [GetBool("Self Can Jump"), Bool(rng.random() < 0.5)]
+
+        def f():
+            return rng.choice(floats)
+
+        def v():
+            return rng.choice(vectors)
+
+        def b():
+            return rng.choice(bools)
+
+        builders = [
+            lambda: floats.append(AddFloats(f(), f())),
+            lambda: floats.append(SubtractFloats(f(), f())),
+            lambda: floats.append(MultiplyFloats(f(), f())),
+            lambda: floats.append(DivideFloats(f(), f())),
+            lambda: floats.append(Modulo(f(), f())),
+            lambda: floats.append(Operation(f(), rng.choice(operationModes))),
+            lambda: floats.append(ClampFloat(f(), f(), f())),
+            lambda: floats.append(ConditionalSetFloat(b(), f(), f())),
+            lambda: floats.append(DotProduct(v(), v())),
+            lambda: floats.append(Distance(v(), v())),
+            lambda: floats.append(Magnitude(v())),
+            lambda: floats.append(Vector3Split(v()).y),
+            lambda: bools.append(
+                CompareFloats(f(), f(), rng.choice(compareFloatModes))
+            ),
+            lambda: bools.append(CompareBool(b(), b(), rng.choice(compareBoolModes))),
+            lambda: bools.append(Not(b())),
+            lambda: vectors.append(ConditionalSetVector3(b(), v(), v())),
+            lambda: vectors.append(AddVector3(v(), v())),
+            lambda: vectors.append(SubtractVector3(v(), v())),
+            lambda: vectors.append(ScaleVector3(v(), f())),
+            lambda: vectors.append(Normalize(v())),
+            lambda: vectors.append(Vector3(f(), f(), f())),
+            # CrossProduct outputs can only be connected to Debug
+            lambda: Debug(CrossProduct(v(), v())),
+        ]
+        for _ in range(size):
+            rng.choice(builders)()
+
+        SlimeController(vectors[-1], bools[-1])
+        for node in floats[-5:] + vectors[-3:] + bools[-3:]:
+            Debug(node)
+        mode = rng.choice(relativePositionModes)
+        Debug(RelativePosition(GetTransform(rng.choice(["Self", "Ball"])), mode))
+        Debug(RelativePosition(Self.TeamSpawn, mode))
+    return graph
+
+
+def batchStates(states: list[dict]) -> dict:
+    """The per-state dicts of the `states` fixture as arrays for evaluateBatch."""
+    batch = {}
+    for name, value in states[0].items():
+        if isinstance(value, dict):
+            batch[name] = {
+                axis: np.array([state[name][axis] for state in states])
+                for axis in value
+            }
+        else:
+            batch[name] = np.array([state[name] for state in states])
+    return batch
+
+
+def assertSame(expected, actual):
+    if isinstance(expected, bool):
+        assert bool(actual) == expected
+        return
+    expected = np.asarray(expected, dtype=float)
+    actual = np.asarray(actual, dtype=float)
+    assert expected.shape == actual.shape
+    assert np.allclose(actual, expected, rtol=1e-12, atol=1e-12, equal_nan=True)
+
+
+def assertSameResult(expected: dict, actual: dict):
+    assertSame(expected["target"], actual["target"])
+    assertSame(expected["jump"], actual["jump"])
+    assert len(actual["debug"]) == len(expected["debug"])
+    for expectedDebug, actualDebug in zip(expected["debug"], actual["debug"]):
+        if isinstance(expectedDebug, dict):
+            for axis, value in expectedDebug.items():
+                assertSame(value, actualDebug[axis])
+        else:
+            assertSame(expectedDebug, actualDebug)
+
+
+def stateResult(result: dict, i: int) -> dict:
+    """The results of state i from the arrays of evaluateBatch."""
+
+    def row(value):
+        if isinstance(value, dict):
+            return {axis: row(array) for axis, array in value.items()}
+        value = np.asarray(value)
+        return value if value.ndim == 0 else value[i]
+
+    return {
+        "target": row(result["target"]),
+        "jump": bool(row(result["jump"])),
+        "debug": [row(value) for value in result["debug"]],
+    }
+
+
+@pytest.mark.parametrize("seed", range(30))
+def testBatchMatchesReference(seed, states):
+    graph = randomGraph(seed)
+    result = evaluateBatch(graph, batchStates(states))
+    for i, state in enumerate(states):
+        assertSameResult(evaluateGraph(graph, state), stateResult(result, i))
+
+
+@pytest.mark.parametrize("seed", range(30))
+def testCompiledMatchesReference(seed, states):
+    graph = randomGraph(seed)
+    bot = compileGraph(graph)
+    for state in states:
+        assertSameResult(evaluateGraph(graph, state), bot(state))
+
+
+def testCompiledCodeCacheIsBounded():
+    for seed in range(compiledCode.maxSize + 10):
+        compileGraph(randomGraph(seed, size=5))
+    assert len(compiledCode) <= compiledCode.maxSize
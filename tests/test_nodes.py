@@ -0,0 +1,92 @@
+import pytest
+
+from SlimeGameLibrary import *
+from SlimeGameLibrary.lib import nodeTypeNames
+from SlimeGameLibrary.optimize import optimizeGraph
+
+
+def nodeNames(graph: Graph) -> list[str]:
+    return [nodeTypeNames[nodeType] for nodeType in graph.nodeTypes]
+
+
+def testLiteralsAreCreatedAfterTheirNode():
+    with Graph() as graph:
+        a = GetFloat("Pi")
+        a * 2
+        ClampFloat(a, 0, 1)
+    assert nodeNames(graph) == [
+        "VolleyballGetFloat",
+        "MultiplyFloats",
+        "Float",
+        "ClampFloat",
+        "Float",
+        "Float",
+    ]
+
+
+def testLiteralsShareTheirNode():
+    with Graph() as graph:
+        a = GetFloat("Pi")
+        b = GetFloat("Gravity")
+        assert (a * 2).index == (2 * a).index
+        assert AddFloats(a, 2).index == AddFloats(a, Float(2.0)).index
+        assert (a < 1).index == (1 > a).index
+        first = graph.inputNodes((b * 2).index)[1]
+        assert graph.inputNodes((a * 2).index)[1].index == first.index
+    assert nodeNames(graph).count("Float") == 2
+
+
+@pytest.mark.parametrize(
+    "value, text",
+    [
+        (2, "2"),
+        (2.0, "2"),
+        ("2", "2"),
+        (-3.0, "-3"),
+        (0.1, "0.1"),
+        (-0.0, "-0.0"),
+        (2**53 - 1, "9007199254740991"),
+        (1e300, "1e+300"),
+        (True, "True"),
+        ("x", "x"),
+    ],
+)
+def testFloatText(value, text):
+    assert floatText(value) == text
+
+
+def testNegativeZeroKeepsItsSign():
+    with Graph() as graph:
+        Debug(1 / Float(-0.0))
+        Debug(1 / Float(0))
+        Debug(Float(True))
+    assert graph.nodeModifiers.count("-0.0") == 1
+    assert "True" in graph.nodeModifiers
+    # folding must not merge or flip the zeros either
+    optimizeGraph(graph, 3)
+    assert graph.nodeModifiers.count("-0.0") == 1
+
+
+def testSaveDictViews():
+    with Graph(ids=SeededIds(0)) as graph:
+        clamped = ClampFloat(GetFloat("Pi"), 0, 1)
+    (saved,) = [
+        node
+        for node in graph.data["serializableNodes"]
+        if node["sID"] == clamped.data["sID"]
+    ]
+    assert clamped.data == saved
+    assert clamped.data["modifier"] == clamped.modifier
+    assert sorted(clamped.inputPorts) == ["Float1", "Float2", "Float3"]
+    assert list(clamped.outputPorts) == ["Float1"]
+    assert len(graph.data["serializableConnections"]) == 3
+    with pytest.raises(AttributeError):
+        clamped.data = {}
+
+
+def testModuleDataIsTheCurrentGraph():
+    from SlimeGameLibrary import lib
+
+    with Graph(ids=SeededIds(0)) as graph:
+        GetFloat("Pi")
+        assert lib.data == graph.serialize()
@@ -0,0 +1,388 @@
+import math
+
+import pytest
+
+from SlimeGameLibrary import *
+from SlimeGameLibrary.evaluation import evaluateGraph
+from SlimeGameLibrary.lib import nodeTypeNames
+from SlimeGameLibrary.optimize import (
+    PassManager,
+    balanceChains,
+    eliminateCommonSubexpressions,
+    foldConstants,
+    fuseVectors,
+    minimizeBooleans,
+    narrowRanges,
+    nodeCost,
+    optimizationLevels,
+    optimizeGraph,
+    passes,
+    pruneUnreachable,
+    removeSquareRoots,
+    simplify,
+)
+
+
+def buildTunableBot() -> Graph:
+    graph = Graph(ids=SeededIds(0))
+    with graph:
+        offset = Tunable(0.4, -1, 1, "offset")
+        jumpDistance = Tunable(2.25, 0.5, 4, "jumpDistance")
+        positionSign = RelativePosition(Self.TeamSpawn, "Backward")
+        # constant if the literals were ordinary ones
+        scaled = offset * 2 + 1
+        moveTo = Ball.Position + positionSign * scaled
+        distance = Distance(Ball.Position, Self.Position)
+        SlimeController(moveTo, (distance < jumpDistance) & Self.CanJump)
+        Debug(ClampFloat(offset, 0, 1))
+        Debug(offset > 0)
+        Debug(Sqrt(distance) < Sqrt(jumpDistance))
+        Debug(offset * 1)
+    return graph
+
+
+def assertSameBehaviour(reference: Graph, optimized: Graph, states: list[dict]):
+    for state in states:
+        expected = evaluateGraph(reference, state)
+        actual = evaluateGraph(optimized, state)
+        assert actual["target"] == pytest.approx(expected["target"])
+        assert actual["jump"] == expected["jump"]
+        assert actual["debug"] == pytest.approx(expected["debug"])
+
+
+def liveNames(graph: Graph) -> list[str]:
+    return [nodeTypeNames[graph.nodeTypes[index]] for index in graph.liveNodes()]
+
+
+def runPass(build, optimizationPass, states: list[dict], shrinks=True) -> tuple:
+    """
+    Runs a pass on a freshly built bot, which must keep its behaviour and,
+    with `shrinks`, lose nodes. Returns the pass report and the graph.
+    """
+    graph = build()
+    before = len(graph.liveNodes())
+    report = optimizationPass(graph)
+    assert report["changed"]
+    if shrinks:
+        assert len(graph.liveNodes()) < before
+    assertSameBehaviour(build(), graph, states)
+    return report, graph
+
+
+def setTunable(graph: Graph, name: str, value: float):
+    graph.nodeModifiers[graph.tunables[name]["index"]] = floatText(value)
+
+
+@pytest.mark.parametrize("level", [1, 2, 3])
+def testTunableLiteralsAreOpaque(level, states):
+    reference = buildTunableBot()
+    optimized = buildTunableBot()
+    optimizeGraph(optimized, level)
+
+    for name, parameter in optimized.tunables.items():
+        node = Node(optimized, parameter["index"])
+        assert not optimized.nodeRemoved[node.index]
+        assert optimized.consumers(node)
+        assert (
+            optimized.nodeModifiers[node.index]
+            == reference.nodeModifiers[reference.tunables[name]["index"]]
+        )
+
+    # the optimized bot must behave like the original for any tuned value
+    for offset, jumpDistance in [(0.4, 2.25), (-0.7, 3.5), (1.0, 0.5)]:
+        for graph in (reference, optimized):
+            setTunable(graph, "offset", offset)
+            setTunable(graph, "jumpDistance", jumpDistance)
+        assertSameBehaviour(reference, optimized, states)
+
+
+@pytest.mark.parametrize("level", [2, 3])
+def testHugeLiteralsDoNotOverflowRanges(level, states, tmp_path):
+    def build() -> Graph:
+        with Graph(ids=SeededIds(0)) as graph:
+            offset = Vector3(1e200, 0, 0) + Ball.Position
+            SlimeController(Ball.Position, Magnitude(offset) > 1)
+            Debug(Distance(Vector3(1e39, -1e39, 0), Self.Position))
+        return graph
+
+    graph = build()
+    graph.SaveData(str(tmp_path / "bot.txt"), layout=None, optimize=level)
+    assertSameBehaviour(build(), graph, states)
+
+
+def testCancellingNeedsFiniteOperands(states):
+    def build() -> Graph:
+        with Graph(ids=SeededIds(0)) as graph:
+            height = Ball.Position.y
+            # infinite when Delta time is 0
+            rate = 1 / Game.DeltaTime
+            Debug(height - height)
+            Debug(height * 0)
+            Debug(rate - rate)
+            Debug(rate * 0)
+        return graph
+
+    graph = build()
+    report = simplify(graph)
+    assert "subtractSelf" in report and "multiplyZero" in report
+
+    stopped = {**states[0], "Delta time": 0.0}
+    debug = evaluateGraph(graph, stopped)["debug"]
+    assert debug[:2] == [0.0, 0.0]
+    assert all(math.isnan(value) for value in debug[2:])
+    assertSameBehaviour(build(), graph, states)
+
+
+def testPassManagerRepeatsWhileAPassReportsChanges(monkeypatch):
+    # rewires that keep the node count are changes too
+    def rewire(graph: Graph) -> dict:
+        rounds.append(len(rounds))
+        return {"changed": int(len(rounds) < 3)}
+
+    rounds = []
+    monkeypatch.setitem(passes, "rewire", rewire)
+    report = PassManager([["rewire"]]).run(Graph())
+    assert [run["round"] for run in report["runs"]] == [0, 1, 2]
+    rounds.clear()
+    report = PassManager([["rewire"]], maxRounds=2).run(Graph())
+    assert [run["round"] for run in report["runs"]] == [0, 1]
+
+
+def testFoldConstants(states):
+    def build() -> Graph:
+        with Graph(ids=SeededIds(0)) as graph:
+            offset = Float(2) * 3 - 1
+            direction = Vector3(1, 0, 0) * offset
+            SlimeController(
+                Ball.Position + direction, Sqrt(Float(16)) > Ball.Position.y
+            )
+            Debug(offset)
+        return graph
+
+    report, graph = runPass(build, foldConstants, states)
+    assert report["folded"] == 3
+    assert evaluateGraph(graph, states[0])["debug"] == [5.0]
+    names = liveNames(graph)
+    for name in ("MultiplyFloats", "SubtractFloats", "ScaleVector3", "Operation"):
+        assert name not in names
+
+
+def testSimplify(states):
+    def build() -> Graph:
+        with Graph(ids=SeededIds(0)) as graph:
+            height = Ball.Position.y
+            Debug(height * 1 + 0)
+            Debug(-(-height))
+            Debug(height / 1)
+            SlimeController(Ball.Position - Vector3(0, 0, 0), Not(Not(Self.CanJump)))
+        return graph
+
+    report, graph = runPass(build, simplify, states)
+    rules = ("multiplyOne", "addZero", "divideOne", "doubleNot", "subtractZeroVector")
+    for name in rules:
+        assert name in report
+    names = liveNames(graph)
+    for name in (
+        "MultiplyFloats",
+        "AddFloats",
+        "DivideFloats",
+        "Not",
+        "SubtractVector3",
+    ):
+        assert name not in names
+
+
+def testConstantPowersOfLogarithms(states):
+    def build() -> Graph:
+        with Graph(ids=SeededIds(0)) as graph:
+            distance = Distance(Ball.Position, Self.Position)
+            exponent = Float(1) + 2
+            Debug(Exp(exponent * Ln(distance)))
+            # nan for negative heights, which x * x * x is not
+            Debug(Exp(exponent * Ln(Ball.Position.y)))
+        return graph
+
+    graph = build()
+    foldConstants(graph)
+    before = len(graph.liveNodes())
+    report = simplify(graph)
+    assert report["expLnPower"] > 0
+    assert len(graph.liveNodes()) < before
+    assert liveNames(graph).count("Operation") == 2
+    for state in states:
+        expected = evaluateGraph(build(), state)["debug"]
+        actual = evaluateGraph(graph, state)["debug"]
+        assert actual == pytest.approx(expected, nan_ok=True)
+
+
+def testRemoveSquareRoots(states):
+    def build() -> Graph:
+        with Graph(ids=SeededIds(0)) as graph:
+            near = Distance(Ball.Position, Self.Position) < 3
+            SlimeController(Ball.Position, near & Self.CanJump)
+            Debug(Magnitude(Ball.Velocity) > Ball.TouchesRemaining)
+            Debug(Sqrt(Game.DeltaTime) >= 0.5)
+            # the square root of a negative gravity is nan, its square is not
+            Debug(Sqrt(Game.Gravity) <= 2)
+        return graph
+
+    # Distance becomes a subtraction and a dot product, which is one node
+    # more but cheaper to evaluate
+    report, graph = runPass(build, removeSquareRoots, states, shrinks=False)
+    assert report["removed"] == report["changed"] == 3
+    cost = sum(nodeCost(name) for name in liveNames(graph))
+    assert cost < sum(nodeCost(name) for name in liveNames(build()))
+    names = liveNames(graph)
+    assert "Distance" not in names and "Magnitude" not in names
+    assert names.count("Operation") == 1
+
+
+def testFuseVectors(states):
+    def build() -> Graph:
+        with Graph(ids=SeededIds(0)) as graph:
+            ball = Ball.Position
+            rebuilt = Vector3(ball.x, ball.y, ball.z)
+            SlimeController(rebuilt, Self.CanJump)
+            flat = Vector3(Self.Position.x, 1, Self.Position.z)
+            Debug(flat.y)
+            Debug((flat + Vector3(2, 0, 0)).x)
+        return graph
+
+    report, graph = runPass(build, fuseVectors, states)
+    for name in ("constructSplit", "splitConstruct", "fuseComponents"):
+        assert name in report
+    assert "ConstructVector3" not in liveNames(graph)
+
+
+def testMinimizeBooleans(states):
+    def build() -> Graph:
+        with Graph(ids=SeededIds(0)) as graph:
+            canJump, selfSide = Self.CanJump, Ball.IsSelfSide
+            SlimeController(Ball.Position, Not(canJump & selfSide) | Not(canJump))
+            Debug(Not(Not(Opponent.CanJump) & Not(selfSide)))
+        return graph
+
+    report, graph = runPass(build, minimizeBooleans, states)
+    # nand(canJump, selfSide) and or(opponent can jump, selfSide)
+    assert report["booleanNodes"] == (8, 2)
+    assert "Not" not in liveNames(graph)
+
+
+def testPruneUnreachable(states):
+    def build() -> Graph:
+        with Graph(ids=SeededIds(0)) as graph:
+            SlimeController(Ball.Position, Self.CanJump)
+            # used, but only by nodes that never reach a sink
+            unused = Game.Pi * 2
+            (unused + 1) * unused
+            Debug(Game.Gravity)
+        return graph
+
+    report, graph = runPass(build, pruneUnreachable, states)
+    assert report["removed"] == 6
+    assert "MultiplyFloats" not in liveNames(graph)
+
+
+def buildPipelineBot() -> Graph:
+    with Graph(ids=SeededIds(0)) as graph:
+        height = Ball.Position.y * 1 + Float(2) * 3
+        total = height + Self.Position.x + Self.Position.y + Self.Position.z
+        near = Sqrt(Game.DeltaTime) >= 0.5
+        canJump, selfSide = Self.CanJump, Ball.IsSelfSide
+        jump = Not(canJump & selfSide) | Not(canJump)
+        SlimeController(Vector3(total, 1, Ball.Position.z), jump & near)
+        Debug(ClampFloat(Game.Pi, 0, 10))
+        Debug(Vector3(total, 1, 0).y)
+        Game.Gravity * 2 + 1
+    return graph
+
+
+def testLevelsRemoveMoreNodes(states):
+    nodes = []
+    for level in sorted(optimizationLevels):
+        graph = buildPipelineBot()
+        report = optimizeGraph(graph, level)
+        assert report["nodesAfter"] == len(graph.liveNodes())
+        nodes.append(report["nodesAfter"])
+        assertSameBehaviour(buildPipelineBot(), graph, states)
+    assert nodes == sorted(nodes, reverse=True)
+    assert len(set(nodes)) == len(nodes)
+
+
+@pytest.mark.parametrize("level", [1, 2, 3])
+def testLevelsRunToTheirFixpoint(level):
+    graph = buildPipelineBot()
+    report = optimizeGraph(graph, level)
+    for stage in range(len(optimizationLevels[level])):
+        runs = [run for run in report["runs"] if run["stage"] == stage]
+        lastRound = max(run["round"] for run in runs)
+        assert not any(
+            run["result"]["changed"] for run in runs if run["round"] == lastRound
+        )
+    # nothing is left to do
+    again = optimizeGraph(graph, level)
+    assert again["nodesAfter"] == again["nodesBefore"]
+    assert not any(run["result"]["changed"] for run in again["runs"])
+
+
+def testNarrowRanges(states):
+    def build() -> Graph:
+        with Graph(ids=SeededIds(0)) as graph:
+            pi = Game.Pi
+            Debug(ClampFloat(pi, 0, 4))
+            Debug(ClampFloat(pi, 4, 5))
+            alwaysTrue = Game.DeltaTime >= -1
+            SlimeController(Ball.Position, alwaysTrue & Self.CanJump)
+            Debug(ConditionalSetFloat(pi < 5, pi, Game.Gravity))
+            # the gravity sensor is unbounded, so this clamp stays
+            Debug(ClampFloat(Game.Gravity, 0, 1))
+        return graph
+
+    report, graph = runPass(build, narrowRanges, states)
+    assert report["clamps"] == 2
+    assert report["comparisons"] == 2
+    assert report["conditionals"] == 1
+    assert liveNames(graph).count("ClampFloat") == 1
+
+
+def testBalanceChains(states):
+    def build() -> Graph:
+        with Graph(ids=SeededIds(0)) as graph:
+            ball, slime = Ball.Position, Self.Position
+            total = ball.x + ball.y + ball.z + slime.x + slime.y + slime.z
+            Debug(total)
+            target = ball + slime + Ball.Velocity + Self.Velocity
+            SlimeController(target, Self.CanJump & (total > 0))
+        return graph
+
+    # balancing regroups the same number of nodes
+    report, graph = runPass(build, balanceChains, states, shrinks=False)
+    assert len(graph.liveNodes()) == len(build().liveNodes())
+    before, after = report["depth"]
+    assert after < before
+    assert report["balanced"] == report["changed"] == 2
+
+
+def testEliminateCommonSubexpressions(states):
+    def build() -> Graph:
+        with Graph(ids=SeededIds(0)) as graph:
+            distance = Distance(Ball.Position, Self.Position)
+            Debug(distance * 2)
+            # forgetting the memoized nodes builds the same expressions again
+            graph.resetCaches()
+            distance = Distance(Ball.Position, Self.Position)
+            SlimeController(Ball.Position, distance * 2 < 3)
+            Debug(RandomFloat(0, 1) < 2)
+            Debug(RandomFloat(0, 1) < 2)
+        return graph
+
+    save = build().serialize()
+    report = eliminateCommonSubexpressions(save)
+    # the sensors, Distance, the product and its literal, but no RandomFloat
+    assert report["merged"] == 5
+    assert report["nodes"][1] == len(save["serializableNodes"])
+
+    merged = Graph(ids=SeededIds(1))
+    merged.loadSave(save)
+    assert len(merged.liveNodes()) == report["nodes"][1]
+    assertSameBehaviour(build(), merged, states)
@@ -0,0 +1,50 @@
+import math
+
+import pytest
+
+from SlimeGameLibrary import *
+from SlimeGameLibrary.customNodes import additionChain, binaryChain, maxPowerNodes
+from SlimeGameLibrary.data import operationModes
+from SlimeGameLibrary.evaluation import evaluateGraph, modeModifier
+from SlimeGameLibrary.lib import nodeTypeNames
+
+
+@pytest.mark.parametrize("exponent", [2, 3, 15, 64, 65, 100, 100.5, -65])
+def testConstantExponentsOfNegativeBases(exponent):
+    graph = Graph(ids=SeededIds(0))
+    with graph:
+        Debug(GetFloat("Gravity") ** exponent)
+    # built from multiplications and a Sqrt, not e^(y*ln(x))
+    operations = {
+        modeModifier(modifier, operationModes)
+        for code, modifier in zip(graph.nodeTypes, graph.nodeModifiers)
+        if nodeTypeNames[code] == "Operation"
+    }
+    assert operations <= {"sqrt"}
+
+    base = -1.01
+    (value,) = evaluateGraph(graph, {"Gravity": base})["debug"]
+    if float(exponent) % 1:
+        # half-integer powers of negative numbers are nan, like Sqrt
+        assert math.isnan(value)
+    else:
+        assert value == pytest.approx(base**exponent, rel=1e-12)
+
+
+@pytest.mark.parametrize("exponent", [2, 64, 100.5, -65, 127.5, 1000, 1e300])
+def testPowersStayWithinTheNodeBudget(exponent):
+    graph = Graph(ids=SeededIds(0))
+    with graph:
+        Debug(GetFloat("Gravity") ** exponent)
+    # e^(y*ln(x)) takes 3 nodes and the exponent literal
+    assert len(graph) - 2 <= max(maxPowerNodes, 4)
+
+
+@pytest.mark.parametrize("n", [65, 100, 1000, 12345])
+def testBinaryChains(n):
+    chain = additionChain(n)
+    assert chain == binaryChain(n)
+    assert chain[-1] == n
+    for position, exponent in enumerate(chain[1:], 1):
+        earlier = chain[:position]
+        assert any(exponent - a in earlier for a in earlier)
@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from SlimeGameLibrary import *
+from SlimeGameLibrary.evaluation import evaluateGraph
+
+
+def buildBot() -> Graph:
+    graph = Graph(ids=SeededIds(0))
+    with graph:
+        InitializeSlime("AIA", "Yellow", "United States of America", 5, 3, 2)
+        positionSign = RelativePosition(Self.TeamSpawn, "Backward")
+        moveTo = Ball.Position + positionSign * 0.4
+        distance = Distance(Ball.Position, Self.Position)
+        height = Vector3Split(Ball.Position).y
+        SlimeController(moveTo, (distance < 2.25) & Self.CanJump & (height > 1))
+        Debug(height * 2 - 1, "height")
+    return graph
+
+
+@pytest.mark.parametrize("layout", ["auto", "grid", "hidden"])
+def testSavesRoundTrip(layout, tmp_path):
+    first = tmp_path / "first.txt"
+    second = tmp_path / "second.txt"
+    buildBot().SaveData(str(first), layout)
+
+    graph = Graph(ids=SeededIds(1))
+    nodes = graph.LoadData(str(first))
+    assert len(nodes) == len(json.loads(first.read_text())["serializableNodes"])
+    graph.SaveData(str(second), layout=None, pruneUnusedNodes=False)
+    # same sIDs, instance ids, positions, hidden flags and connections
+    assert second.read_text() == first.read_text()
+
+
+def testLoadedBotsBehaveTheSame(states, tmp_path):
+    path = tmp_path / "bot.txt"
+    built = buildBot()
+    built.SaveData(str(path), "grid")
+    loaded = Graph()
+    loaded.LoadData(str(path))
+    for state in states:
+        assert evaluateGraph(loaded, state) == evaluateGraph(built, state)
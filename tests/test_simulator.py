@@ -0,0 +1,62 @@
+import numpy as np
+
+from SlimeGameLibrary import *
+from SlimeGameLibrary.simulator import Simulation, playMatches, slimeStats
+
+
+def aiaBot() -> Graph:
+    graph = Graph(ids=SeededIds(0))
+    with graph:
+        InitializeSlime("AIA", "Yellow", "United States of America", 5, 3, 2)
+        moveTo = Ball.Position + RelativePosition(Self.TeamSpawn, "Backward") * 0.4
+        distanceToBall = Distance(Ball.Position, Self.Position)
+        SlimeController(moveTo, (distanceToBall < 2.25) & Self.CanJump)
+    return graph
+
+
+def idleBot() -> Graph:
+    graph = Graph(ids=SeededIds(1))
+    with graph:
+        SlimeController(Self.Position, Bool(False))
+    return graph
+
+
+def testSlimeStats():
+    assert slimeStats(aiaBot()) == (5, 3, 2)
+    assert slimeStats(idleBot()) == (4, 3, 3)
+
+
+def testSameSeedSameMatches():
+    first = playMatches(aiaBot(), aiaBot(), 16, seed=3, pointsToWin=3)
+    second = playMatches(aiaBot(), aiaBot(), 16, seed=3, pointsToWin=3)
+    for name in first:
+        assert np.array_equal(first[name], second[name])
+    other = playMatches(aiaBot(), aiaBot(), 16, seed=4, pointsToWin=3)
+    assert not np.array_equal(first["duration"], other["duration"])
+
+
+def testMatchesEnd():
+    simulation = Simulation(aiaBot(), idleBot(), 16, seed=0, pointsToWin=3)
+    results = simulation.run()
+    assert results["finished"].all()
+    assert (results["scores"].max(axis=1) == 3).all()
+    # AIA returns the ball, a bot that stands still does not
+    assert (results["winners"] == 0).all()
+
+
+def testBotsSeeTheSameSnapshot():
+    """Team 1 must not see where team 0 moved during the same step."""
+    seen = []
+    simulation = Simulation(aiaBot(), aiaBot(), 4, seed=0)
+    controls = simulation.controls
+
+    def recordingControls(team):
+        seen.append((team, simulation.slimePositions.copy()))
+        return controls(team)
+
+    simulation.controls = recordingControls
+    for _ in range(20):
+        simulation.step()
+    for (team0, positions0), (team1, positions1) in zip(seen[::2], seen[1::2]):
+        assert (team0, team1) == (0, 1)
+        assert np.array_equal(positions0, positions1)
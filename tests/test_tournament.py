@@ -0,0 +1,81 @@
+import json
+
+import numpy as np
+import pytest
+
+from SlimeGameLibrary import *
+from SlimeGameLibrary.tournament import runTournament, summarize
+
+settings = {"matches": 4, "seed": 0, "workers": 1, "pointsToWin": 2}
+
+
+def saveBot(path, offset: float | None):
+    graph = Graph(ids=SeededIds(0))
+    with graph:
+        if offset is None:
+            SlimeController(Self.Position, Bool(False))
+        else:
+            positionSign = RelativePosition(Self.TeamSpawn, "Backward")
+            moveTo = Ball.Position + positionSign * offset
+            distanceToBall = Distance(Ball.Position, Self.Position)
+            SlimeController(moveTo, (distanceToBall < 2.25) & Self.CanJump)
+        graph.SaveData(str(path))
+
+
+@pytest.fixture
+def saves(tmp_path):
+    directory = tmp_path / "saves"
+    directory.mkdir()
+    saveBot(directory / "aia.txt", 0.4)
+    saveBot(directory / "front.txt", -0.4)
+    saveBot(directory / "idle.txt", None)
+    return directory
+
+
+def resultLines(path) -> list[str]:
+    return sorted(path.read_text().splitlines())
+
+
+def testResumeAfterCrash(saves, tmp_path):
+    complete = tmp_path / "complete.jsonl"
+    summary = runTournament(saves, complete, **settings)
+    lines = complete.read_text().splitlines()
+    assert len(lines) == 4
+
+    # a run that was killed while writing its second pairing
+    resumed = tmp_path / "resumed.jsonl"
+    resumed.write_text("\n".join(lines[:2]) + "\n" + lines[2][:20])
+    resumedSummary = runTournament(saves, resumed, **settings)
+
+    assert resultLines(resumed) == resultLines(complete)
+    assert np.array_equal(resumedSummary["ratings"], summary["ratings"])
+    assert np.array_equal(
+        resumedSummary["winRates"], summary["winRates"], equal_nan=True
+    )
+
+
+def testSummary(saves, tmp_path):
+    summary = runTournament(saves, tmp_path / "results.jsonl", **settings)
+    assert summary["bots"] == ["aia.txt", "front.txt", "idle.txt"]
+    winRates = summary["winRates"]
+    assert np.isnan(np.diag(winRates)).all()
+    offDiagonal = ~np.eye(3, dtype=bool)
+    assert np.allclose((winRates + winRates.T)[offDiagonal], 1.0)
+    # the bot that stands still loses every match and is rated last
+    assert (winRates[2, :2] == 0).all()
+    assert np.argmin(summary["ratings"]) == 2
+
+
+def testDifferentSettingsAreRefused(saves, tmp_path):
+    results = tmp_path / "results.jsonl"
+    runTournament(saves, results, **settings)
+    with pytest.raises(ValueError):
+        runTournament(saves, results, **{**settings, "matches": 6})
+
+
+def testUnplayedPairings():
+    records = [{"bots": ["a", "b"], "matches": 2, "wins": [2, 0], "draws": 0}]
+    summary = summarize(["a", "b", "c"], records)
+    assert summary["winRates"][0, 1] == 1.0
+    assert np.isnan(summary["winRates"][0, 2])
+    assert json.dumps(summary["ratings"].tolist())
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from SlimeGameLibrary import *
+from SlimeGameLibrary.simulator import Simulation
+from SlimeGameLibrary.tuner import scoreCandidates, spendStats, tune
+
+
+def aiaBot(stats=(5, 3, 2), offset=0.4, jumpDistance=2.25, tunable=True) -> Graph:
+    graph = Graph(ids=SeededIds(0))
+    with graph:
+        if tunable:
+            stats = [
+                TunableStat(points, name=name)
+                for points, name in zip(stats, ("speed", "acceleration", "jump"))
+            ]
+            offset = Tunable(offset, -1, 1, "offset")
+            jumpDistance = Tunable(jumpDistance, 0.5, 4, "jumpDistance")
+        InitializeSlime("AIA", "Yellow", "United States of America", *stats)
+        moveTo = Ball.Position + RelativePosition(Self.TeamSpawn, "Backward") * offset
+        distanceToBall = Distance(Ball.Position, Self.Position)
+        SlimeController(moveTo, (distanceToBall < jumpDistance) & Self.CanJump)
+    return graph
+
+
+def testCandidatesMatchSeparateBuilds():
+    """A batch of candidates plays like each variant built on its own."""
+    candidates = [((5, 3, 2), 0.4, 2.25), ((8, 2, 0), -0.4, 1.0)]
+    graph = aiaBot()
+    values = {
+        name: np.array([float(value) for value in column])
+        for name, column in zip(
+            ("speed", "acceleration", "jump", "offset", "jumpDistance"),
+            zip(*[(*stats, offset, jump) for stats, offset, jump in candidates]),
+        )
+    }
+    matches = 6
+    scores = scoreCandidates(graph, values, graph, matches, 7, pointsToWin=3)
+
+    for i, (stats, offset, jumpDistance) in enumerate(candidates):
+        variant = aiaBot(stats, offset, jumpDistance, tunable=False)
+        # candidate i plays rows i * matches onwards of the batch
+        simulation = Simulation(
+            variant, aiaBot(tunable=False), len(candidates) * matches, 7, 3
+        )
+        results = simulation.run()
+        rows = slice(i * matches, (i + 1) * matches)
+        winners = results["winners"][rows]
+        points = results["scores"][rows]
+        assert scores["winRate"][i] == pytest.approx(
+            np.mean((winners == 0) + 0.5 * (winners == -1))
+        )
+        assert scores["pointDifference"][i] == pytest.approx(
+            np.mean(points[:, 0] - points[:, 1])
+        )
+
+
+def testStatsKeepTheirTotal():
+    graph = aiaBot()
+    values = {
+        "speed": np.array([10.0, 0.0, 3.0]),
+        "acceleration": np.array([10.0, 0.0, 3.0]),
+        "jump": np.array([1.0, 0.0, 3.0]),
+    }
+    spendStats(graph, values, 10)
+    totals = values["speed"] + values["acceleration"] + values["jump"]
+    assert (totals == 10).all()
+    assert all((column == np.round(column)).all() for column in values.values())
+
+
+@pytest.mark.parametrize("method", ["grid", "random", "cma"])
+def testTuneSavesTheBestVariant(method, tmp_path):
+    graph = aiaBot()
+    path = tmp_path / "tuned.txt"
+    report = tune(
+        graph,
+        method=method,
+        candidates=4,
+        generations=2,
+        matches=2,
+        outputPath=str(path),
+        pointsToWin=2,
+    )
+    assert path.exists()
+    assert report["winRate"] == max(report["history"])
+    assert (
+        sum(report["parameters"][name] for name in ("speed", "acceleration", "jump"))
+        == 10
+    )
+    for name, value in report["parameters"].items():
+        index = graph.tunables[name]["index"]
+        assert float(graph.nodeModifiers[index]) == pytest.approx(value)